@@ -0,0 +1,82 @@
+from datetime import timedelta
+from django.contrib import admin
+from django.db.models import Sum
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from store.models import Collection, Product
+from . import models, rollups
+
+
+#Models
+@admin.register(models.SalesDashboard)
+class SalesDashboardAdmin(admin.ModelAdmin):
+    """Sales of the last days, read from the rollup tables only."""
+    periods = [7, 30, 90, 365]
+    default_period = 30
+    top = 10
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_or_change_permission(request):
+            return super().changelist_view(request, extra_context)
+
+        try:
+            period = int(request.GET.get('days', self.default_period))
+        except ValueError:
+            period = self.default_period
+        if period not in self.periods:
+            period = self.default_period
+        since = timezone.localdate() - timedelta(days=period - 1)
+
+        products = models.DailyProductSales.objects.filter(date__gte=since)
+        collections = models.DailyCollectionSales.objects.filter(date__gte=since)
+
+        days = list(
+            collections
+                .values('date')
+                .annotate(revenue=Sum('revenue'), quantity=Sum('quantity'))
+                .order_by('-date')
+        )
+        totals = collections.aggregate(revenue=Sum('revenue'), quantity=Sum('quantity'))
+        top_products = self.top_rows(products, 'product', Product)
+        top_collections = self.top_rows(collections, 'collection', Collection)
+
+        best_day = max((day['revenue'] for day in days), default=0) or 1
+        for day in days:
+            day['share'] = round(day['revenue'] * 100 / best_day)
+
+        return TemplateResponse(request, 'admin/analytics/dashboard.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Sales dashboard',
+            'opts': self.model._meta,
+            'periods': self.periods,
+            'period': period,
+            'since': since,
+            'totals': totals,
+            'days': days,
+            'top_products': top_products,
+            'top_collections': top_collections,
+            'watermark': rollups.get_watermark(),
+            **(extra_context or {}),
+        })
+
+    def top_rows(self, queryset, key, model):
+        rows = list(
+            queryset
+                .values(key)
+                .annotate(revenue=Sum('revenue'), quantity=Sum('quantity'), order_count=Sum('order_count'))
+                .order_by('-revenue')[:self.top]
+        )
+        # Titles of the few rows shown only, the aggregation never joins.
+        titles = model.objects.only('title').in_bulk([row[key] for row in rows])
+        for row in rows:
+            row['title'] = titles.get(row[key])
+        return rows
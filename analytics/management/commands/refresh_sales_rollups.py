@@ -0,0 +1,30 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from analytics import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Rolls up the completed orders placed since the last run into the daily '
+        'product and collection sales tables, or rebuilds them with --rebuild.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every day.')
+        parser.add_argument('--lookback-days', type=int, default=rollups.LOOKBACK.days,
+                            help='Days before the last run that are recomputed as well.')
+        parser.add_argument('--since', help='Recompute from this date (YYYY-MM-DD) on instead.')
+
+    def handle(self, **options):
+        if options['rebuild']:
+            days, rows = rollups.rebuild_sales()
+        else:
+            since = None
+            if options['since']:
+                try:
+                    since = date.fromisoformat(options['since'])
+                except ValueError:
+                    raise CommandError('--since must be a date like 2022-06-30.')
+            days, rows = rollups.refresh_sales(timedelta(days=options['lookback_days']), since)
+
+        self.stdout.write(f'{rows} rollup rows written for {days} days')
@@ -0,0 +1,82 @@
+# Generated by Django 4.0.5 on 2026-10-18 07:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('store', '0008_upper_name_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('placed_at', models.DateTimeField()),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.product')),
+            ],
+            options={
+                'verbose_name_plural': 'daily product sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCollectionSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('collection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.collection')),
+            ],
+            options={
+                'verbose_name_plural': 'daily collection sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesDashboard',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'sales dashboard',
+                'verbose_name_plural': 'sales dashboard',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('analytics.dailycollectionsales',),
+        ),
+        migrations.AddIndex(
+            model_name='dailyproductsales',
+            index=models.Index(fields=['product', 'date'], name='analytics_d_product_c17914_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('date', 'product'), name='unique_daily_product_sales'),
+        ),
+        migrations.AddIndex(
+            model_name='dailycollectionsales',
+            index=models.Index(fields=['collection', 'date'], name='analytics_d_collect_7a9a22_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycollectionsales',
+            constraint=models.UniqueConstraint(fields=('date', 'collection'), name='unique_daily_collection_sales'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import models
+from store.models import Collection, Product
+
+
+# Maintained by analytics.rollups from completed orders, see refresh_sales_rollups.
+class DailyProductSales(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(to=Product, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date']),
+        ]
+
+
+class DailyCollectionSales(models.Model):
+    date = models.DateField()
+    collection = models.ForeignKey(to=Collection, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily collection sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'collection'], name='unique_daily_collection_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['collection', 'date']),
+        ]
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=64, unique=True)
+    # Orders placed before this have been rolled up.
+    placed_at = models.DateTimeField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class SalesDashboard(DailyCollectionSales):
+    class Meta:
+        proxy = True
+        verbose_name = 'sales dashboard'
+        verbose_name_plural = 'sales dashboard'
@@ -0,0 +1,124 @@
+"""
+Daily sales rollups of completed orders.
+
+DailyProductSales and DailyCollectionSales hold, per day and product or
+collection, the quantity sold, the revenue and the number of orders, so
+reports never scan the order items.
+
+Rows are always recomputed for whole days. refresh_sales() rebuilds the
+days from LOOKBACK before the watermark, the time of the previous refresh,
+up to today, which picks up new orders as well as orders completed or
+edited shortly after they were placed, and running it twice is harmless.
+Orders completed longer than LOOKBACK after being placed need a refresh
+with a larger lookback or a rebuild.
+"""
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from store.models import Order, OrderItem
+from .models import DailyCollectionSales, DailyProductSales, RollupWatermark
+
+BATCH_SIZE = 1000
+DAYS_PER_BATCH = 31
+LOOKBACK = timedelta(days=getattr(settings, 'ANALYTICS_ROLLUP_LOOKBACK_DAYS', 3))
+WATERMARK = 'sales'
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def daily_sales(items, key):
+    """Per day and key totals of items, in the current time zone."""
+    return items \
+        .annotate(day=TruncDate('order__placed_at')) \
+        .values('day', key) \
+        .annotate(
+            units=Sum('quantity'),
+            sales=Sum(F('quantity') * F('unit_price'), output_field=DecimalField()),
+            orders=Count('order', distinct=True),
+        ) \
+        .order_by()
+
+
+def rollup_days(first_day, last_day):
+    """Recompute the rows of first_day to last_day inclusive, returns the number written."""
+    items = OrderItem.objects.filter(
+        order__payment_status=Order.PAYMENT_STATUS_COMPLETE,
+        order__placed_at__gte=day_start(first_day),
+        order__placed_at__lt=day_start(last_day + timedelta(days=1)),
+    )
+
+    with transaction.atomic():
+        products = [
+            DailyProductSales(date=row['day'], product_id=row['product'], quantity=row['units'],
+                              revenue=row['sales'], order_count=row['orders'])
+            for row in daily_sales(items, 'product')
+        ]
+        collections = [
+            DailyCollectionSales(date=row['day'], collection_id=row['product__collection'], quantity=row['units'],
+                                 revenue=row['sales'], order_count=row['orders'])
+            for row in daily_sales(items, 'product__collection')
+        ]
+        DailyProductSales.objects.filter(date__range=(first_day, last_day)).delete()
+        DailyCollectionSales.objects.filter(date__range=(first_day, last_day)).delete()
+        DailyProductSales.objects.bulk_create(products, batch_size=BATCH_SIZE)
+        DailyCollectionSales.objects.bulk_create(collections, batch_size=BATCH_SIZE)
+
+    return len(products) + len(collections)
+
+
+def rollup_range(first_day, last_day, days_per_batch=DAYS_PER_BATCH):
+    """rollup_days() in short transactions, returns (days, rows)."""
+    days = rows = 0
+    while first_day <= last_day:
+        until = min(first_day + timedelta(days=days_per_batch - 1), last_day)
+        rows += rollup_days(first_day, until)
+        days += (until - first_day).days + 1
+        first_day = until + timedelta(days=1)
+    return days, rows
+
+
+def set_watermark(placed_at):
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'placed_at': placed_at})
+
+
+def get_watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('placed_at', flat=True).first()
+
+
+def refresh_sales(lookback=LOOKBACK, since=None):
+    """
+    Roll up the orders placed since the last refresh, or since the given
+    date, returns (days, rows). Without a watermark everything is rebuilt.
+    """
+    now = timezone.now()
+    if since is None:
+        watermark = get_watermark()
+        if watermark is None:
+            return rebuild_sales()
+        since = timezone.localdate(watermark - lookback)
+
+    result = rollup_range(since, timezone.localdate(now))
+    set_watermark(now)
+    return result
+
+
+def rebuild_sales():
+    """Recompute all rows from the first completed order on, returns (days, rows)."""
+    now = timezone.now()
+    first = Order.objects \
+        .filter(payment_status=Order.PAYMENT_STATUS_COMPLETE) \
+        .aggregate(first=Min('placed_at'))['first']
+    today = timezone.localdate(now)
+    first_day = timezone.localdate(first) if first is not None else today
+
+    with transaction.atomic():
+        DailyProductSales.objects.filter(date__lt=first_day).delete()
+        DailyCollectionSales.objects.filter(date__lt=first_day).delete()
+    result = rollup_range(first_day, today)
+    set_watermark(now)
+    return result
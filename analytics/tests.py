@@ -0,0 +1,128 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from store.models import Collection, Customer, Order, OrderItem, Product
+from . import rollups
+from .models import DailyCollectionSales, DailyProductSales
+
+
+class RollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lamps = Collection.objects.create(title='Lamps')
+        cls.desks = Collection.objects.create(title='Desks')
+        cls.lamp, cls.shade = [
+            Product.objects.create(title=title, slug='lamp', description='', unit_price=10, inventory=100,
+                                   collection=cls.lamps)
+            for title in ['Lamp', 'Shade']
+        ]
+        cls.desk = Product.objects.create(title='Desk', slug='desk', description='', unit_price=100,
+                                          inventory=100, collection=cls.desks)
+        cls.customer = Customer.objects.create(first_name='Liz', last_name='Taylor',
+                                               email='liz@example.com', phone='1')
+        cls.today = timezone.localdate()
+
+    def order(self, days_ago, *items, status=Order.PAYMENT_STATUS_COMPLETE):
+        order = Order.objects.create(customer=self.customer, payment_status=status)
+        for product, quantity in items:
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=product.unit_price)
+        placed_at = rollups.day_start(self.today - timedelta(days=days_ago)) + timedelta(hours=12)
+        Order.objects.filter(pk=order.pk).update(placed_at=placed_at)
+        return order
+
+    def day(self, days_ago):
+        return self.today - timedelta(days=days_ago)
+
+    def product_sales(self):
+        return {
+            (row.date, row.product_id): (row.quantity, row.revenue, row.order_count)
+            for row in DailyProductSales.objects.all()
+        }
+
+    def collection_sales(self):
+        return {
+            (row.date, row.collection_id): (row.quantity, row.revenue, row.order_count)
+            for row in DailyCollectionSales.objects.all()
+        }
+
+    def test_rollup_days_sums_completed_orders(self):
+        self.order(1, (self.lamp, 2), (self.shade, 1))
+        self.order(1, (self.lamp, 1), (self.desk, 1))
+        self.order(0, (self.lamp, 5))
+        self.order(1, (self.lamp, 7), status=Order.PAYMENT_STATUS_PENDING)
+
+        self.assertEqual(rollups.rollup_days(self.day(1), self.day(0)), 7)
+        self.assertEqual(self.product_sales(), {
+            (self.day(1), self.lamp.pk): (3, 30, 2),
+            (self.day(1), self.shade.pk): (1, 10, 1),
+            (self.day(1), self.desk.pk): (1, 100, 1),
+            (self.day(0), self.lamp.pk): (5, 50, 1),
+        })
+        self.assertEqual(self.collection_sales(), {
+            (self.day(1), self.lamps.pk): (4, 40, 2),
+            (self.day(1), self.desks.pk): (1, 100, 1),
+            (self.day(0), self.lamps.pk): (5, 50, 1),
+        })
+
+    def test_rollup_days_replaces_the_days(self):
+        order = self.order(1, (self.lamp, 2))
+        self.order(3, (self.desk, 1))
+        rollups.rollup_days(self.day(3), self.day(0))
+        OrderItem.objects.filter(order=order).update(quantity=4)
+        self.order(1, (self.shade, 1), status=Order.PAYMENT_STATUS_FAILED)
+
+        rollups.rollup_days(self.day(1), self.day(1))
+        rollups.rollup_days(self.day(1), self.day(1))
+        self.assertEqual(self.product_sales(), {
+            (self.day(3), self.desk.pk): (1, 100, 1),
+            (self.day(1), self.lamp.pk): (4, 40, 1),
+        })
+
+    def test_rollup_range_in_batches(self):
+        self.order(9, (self.lamp, 1))
+        self.order(0, (self.lamp, 1))
+        self.assertEqual(rollups.rollup_range(self.day(9), self.day(0), days_per_batch=3), (10, 4))
+
+    def test_refresh_without_watermark_rebuilds(self):
+        self.order(5, (self.lamp, 1))
+        self.assertIsNone(rollups.get_watermark())
+        self.assertEqual(rollups.refresh_sales(), (6, 2))
+        self.assertIsNotNone(rollups.get_watermark())
+
+    def test_refresh_recomputes_the_lookback_only(self):
+        old = self.order(5, (self.lamp, 1), status=Order.PAYMENT_STATUS_PENDING)
+        recent = self.order(1, (self.lamp, 1), status=Order.PAYMENT_STATUS_PENDING)
+        rollups.rebuild_sales()
+        self.assertEqual(self.product_sales(), {})
+
+        Order.objects.filter(pk__in=[old.pk, recent.pk]).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        rollups.refresh_sales(lookback=timedelta(days=2))
+        self.assertEqual(self.product_sales(), {(self.day(1), self.lamp.pk): (1, 10, 1)})
+
+        rollups.refresh_sales(since=self.day(5))
+        self.assertEqual(self.product_sales(), {
+            (self.day(5), self.lamp.pk): (1, 10, 1),
+            (self.day(1), self.lamp.pk): (1, 10, 1),
+        })
+
+    def test_rebuild_drops_days_without_completed_orders(self):
+        order = self.order(3, (self.lamp, 1))
+        self.order(1, (self.desk, 1))
+        rollups.rebuild_sales()
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_FAILED)
+
+        self.assertEqual(rollups.rebuild_sales(), (2, 2))
+        self.assertEqual(self.product_sales(), {(self.day(1), self.desk.pk): (1, 100, 1)})
+        self.assertEqual(self.collection_sales(), {(self.day(1), self.desks.pk): (1, 100, 1)})
+
+    def test_command(self):
+        self.order(1, (self.lamp, 1))
+        stdout = StringIO()
+        call_command('refresh_sales_rollups', '--since', self.day(1).isoformat(), stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), '2 rollup rows written for 2 days')
+        with self.assertRaises(CommandError):
+            call_command('refresh_sales_rollups', '--since', 'yesterday')
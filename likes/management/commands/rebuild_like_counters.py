@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from likes.models import LikedItem, LikeCounter
+from storeuz.caching import bump_model_versions
+
+
+class Command(BaseCommand):
+    help = 'Recomputes LikeCounter rows from LikedItem in batches of object ids.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, **options):
+        batch_size = options['batch_size']
+        content_type_ids = list(
+            LikedItem.objects
+                .order_by('content_type')
+                .values_list('content_type', flat=True)
+                .distinct()
+        )
+
+        LikeCounter.objects.exclude(content_type__in=content_type_ids).delete()
+
+        for content_type_id in content_type_ids:
+            rebuilt = self.rebuild_content_type(content_type_id, batch_size)
+            self.stdout.write(f'content type {content_type_id}: {rebuilt} counters rebuilt')
+        bump_model_versions(LikeCounter)
+
+    def rebuild_content_type(self, content_type_id, batch_size):
+        likes = LikedItem.objects.filter(content_type_id=content_type_id)
+        counters = LikeCounter.objects.filter(content_type_id=content_type_id)
+        rebuilt = 0
+        last_id = -1
+
+        while True:
+            object_ids = list(
+                likes.filter(object_id__gt=last_id)
+                     .order_by('object_id')
+                     .values_list('object_id', flat=True)
+                     .distinct()[:batch_size]
+            )
+            if not object_ids:
+                break
+
+            # Counters in the whole id range are replaced, which also drops
+            # the ones for objects that no longer have any likes.
+            with transaction.atomic():
+                id_range = (last_id + 1, object_ids[-1])
+                counts = likes.filter(object_id__range=id_range) \
+                    .values('object_id') \
+                    .annotate(count=Count('id')) \
+                    .order_by()
+                counters.filter(object_id__range=id_range).delete()
+                LikeCounter.objects.bulk_create(
+                    LikeCounter(content_type_id=content_type_id,
+                                object_id=row['object_id'],
+                                count=row['count'])
+                    for row in counts
+                )
+
+            rebuilt += len(object_ids)
+            last_id = object_ids[-1]
+
+        counters.filter(object_id__gt=last_id).delete()
+        return rebuilt
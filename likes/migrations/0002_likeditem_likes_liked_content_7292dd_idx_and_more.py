@@ -0,0 +1,37 @@
+# Generated by Django 4.0.5 on 2026-10-18 06:39
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    LikedItem = apps.get_model('likes', 'LikedItem')
+    duplicates = LikedItem.objects \
+        .values('user', 'content_type', 'object_id') \
+        .annotate(keep_id=Min('id'), likes=Count('id')) \
+        .filter(likes__gt=1)
+    for duplicate in duplicates:
+        LikedItem.objects \
+            .filter(user=duplicate['user'],
+                    content_type=duplicate['content_type'],
+                    object_id=duplicate['object_id']) \
+            .exclude(id=duplicate['keep_id']) \
+            .delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('likes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='likeditem',
+            index=models.Index(fields=['content_type', 'object_id'], name='likes_liked_content_7292dd_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='likeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'content_type', 'object_id'), name='unique_liked_item'),
+        ),
+    ]
@@ -1,10 +1,100 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.auth.models import User
+from storeuz.caching import bump_model_versions
+from storeuz.generic import GenericRelationQuerySet
+
+
+class LikedItemManager(models.Manager.from_queryset(GenericRelationQuerySet)):
+
+    def like(self, user, obj):
+        content_type = ContentType.objects.get_for_model(obj)
+
+        # The counter is bumped by the post_save handler, inside this transaction.
+        with transaction.atomic():
+            _, created = self.get_or_create(user=user,
+                                            content_type=content_type,
+                                            object_id=obj.pk)
+        return created
+
+    def unlike(self, user, obj):
+        content_type = ContentType.objects.get_for_model(obj)
+
+        with transaction.atomic():
+            deleted, _ = self.filter(user=user,
+                                     content_type=content_type,
+                                     object_id=obj.pk).delete()
+        return deleted > 0
+
+
+class LikeCounterManager(models.Manager):
+
+    def increment(self, content_type_id, object_id):
+        counters = self.filter(content_type_id=content_type_id, object_id=object_id)
+        if counters.update(count=F('count') + 1):
+            bump_model_versions(self.model)
+            return
+
+        try:
+            with transaction.atomic():
+                self.create(content_type_id=content_type_id, object_id=object_id, count=1)
+        except IntegrityError:
+            # Somebody else created the counter in the meantime.
+            counters.update(count=F('count') + 1)
+            bump_model_versions(self.model)
+
+    def decrement(self, content_type_id, object_id):
+        self.filter(content_type_id=content_type_id, object_id=object_id, count__gt=0) \
+            .update(count=F('count') - 1)
+        bump_model_versions(self.model)
+
+    def get_count_for(self, obj_type, obj_id):
+        return self.get_counts_for_many(obj_type, [obj_id])[obj_id]
+
+    def get_counts_for_many(self, obj_type, obj_ids):
+        content_type = ContentType.objects.get_for_model(obj_type)
+        counts = {obj_id: 0 for obj_id in obj_ids}
+        counts.update(
+            self.filter(content_type=content_type, object_id__in=counts.keys())
+                .values_list('object_id', 'count')
+        )
+        return counts
+
 
 class LikedItem(models.Model):
+    objects = LikedItemManager()
+
     user = models.ForeignKey(to=User, on_delete=models.CASCADE)
     content_type = models.ForeignKey(to=ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'content_type', 'object_id'],
+                name='unique_liked_item',
+            ),
+        ]
+
+
+class LikeCounter(models.Model):
+    objects = LikeCounterManager()
+
+    content_type = models.ForeignKey(to=ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'],
+                name='unique_like_counter',
+            ),
+        ]
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from likes.models import LikedItem, LikeCounter
+
+
+@receiver(post_save, sender=LikedItem)
+def increment_like_counter(sender, instance, created, **kwargs):
+    if created:
+        LikeCounter.objects.increment(instance.content_type_id, instance.object_id)
+
+
+@receiver(post_delete, sender=LikedItem)
+def decrement_like_counter(sender, instance, **kwargs):
+    LikeCounter.objects.decrement(instance.content_type_id, instance.object_id)
@@ -1,3 +1,61 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
 from django.test import TestCase
+from store.models import Collection, Product
+from .models import LikedItem, LikeCounter
 
-# Create your tests here.
+
+class LikeCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice')
+        cls.bob = User.objects.create_user('bob')
+        collection = Collection.objects.create(title='Lamps')
+        cls.lamp, cls.shade = [
+            Product.objects.create(title=title, slug=title.lower(), description='', unit_price=10,
+                                   inventory=100, collection=collection)
+            for title in ['Lamp', 'Shade']
+        ]
+
+    def count(self, product):
+        return LikeCounter.objects.get_count_for(Product, product.pk)
+
+    def test_like_and_unlike(self):
+        self.assertTrue(LikedItem.objects.like(self.alice, self.lamp))
+        self.assertTrue(LikedItem.objects.like(self.bob, self.lamp))
+        self.assertFalse(LikedItem.objects.like(self.bob, self.lamp))
+        self.assertEqual(self.count(self.lamp), 2)
+        self.assertEqual(self.count(self.shade), 0)
+
+        self.assertTrue(LikedItem.objects.unlike(self.bob, self.lamp))
+        self.assertFalse(LikedItem.objects.unlike(self.bob, self.lamp))
+        self.assertEqual(self.count(self.lamp), 1)
+
+    def test_deleted_likes_are_not_counted(self):
+        LikedItem.objects.like(self.alice, self.lamp)
+        LikedItem.objects.like(self.alice, self.shade)
+        LikedItem.objects.like(self.bob, self.lamp)
+
+        self.bob.delete()
+        self.assertEqual(LikeCounter.objects.get_counts_for_many(Product, [self.lamp.pk, self.shade.pk]),
+                         {self.lamp.pk: 1, self.shade.pk: 1})
+        LikedItem.objects.filter(user=self.alice).delete()
+        self.assertEqual(self.count(self.lamp), 0)
+        self.assertEqual(self.count(self.shade), 0)
+
+    def test_rebuild_repairs_drifted_counters(self):
+        LikedItem.objects.like(self.alice, self.lamp)
+        LikedItem.objects.like(self.bob, self.lamp)
+        LikedItem.objects.like(self.alice, self.shade)
+        LikeCounter.objects.filter(object_id=self.lamp.pk).update(count=7)
+        LikeCounter.objects.filter(object_id=self.shade.pk).delete()
+        LikeCounter.objects.create(content_type=ContentType.objects.get_for_model(Product),
+                                   object_id=self.shade.pk + 100, count=3)
+
+        call_command('rebuild_like_counters', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(LikeCounter.objects.get_counts_for_many(Product, [self.lamp.pk, self.shade.pk]),
+                         {self.lamp.pk: 2, self.shade.pk: 1})
+        self.assertEqual(LikeCounter.objects.count(), 2)
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import homeview
+from .views import homeview, homeview_async, homeview_object
 
 urlpatterns = [
-    path('home/', homeview)
-]
\ No newline at end of file
+    path('home/', homeview),
+    path('home/async/', homeview_async),
+    path('home/<str:app_label>/<str:model_name>/<int:obj_id>/', homeview_object),
+]
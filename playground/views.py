@@ -1,11 +1,42 @@
+from django.http import Http404
 from django.shortcuts import render
 from django.contrib.contenttypes.models import ContentType
 from store.models import Product, Collection, Customer, Address, Promotion, Cart, CartItem
-from tags.models import TaggedItem
+from storeuz.async_db import db_sync_to_async
+from storeuz.caching import cache_view, model_version
+from tags.models import Tag, TaggedItem
 import random
 
+OBJ_TYPES = [Product, Collection, Customer, Address, Promotion, Cart, CartItem]
+OBJ_TYPES_BY_LABEL = {obj_type._meta.label_lower: obj_type for obj_type in OBJ_TYPES}
+
+
+def _render_home(request, obj_type, obj_id):
+    # Lazy, only evaluated when the template's tag list fragment is not cached.
+    result = TaggedItem.objects.get_tags_for(obj_type, obj_id).with_content_objects()
+
+    return render(request, 'index.html', {
+        'result': result,
+        'obj_label': obj_type._meta.label_lower,
+        'obj_id': obj_id,
+        'tags_version': model_version(Tag, TaggedItem, obj_type),
+    })
+
+
 def homeview(request):
-    obj_type = random.choice([Product, Collection, Customer, Address, Promotion, Cart, CartItem])
-    result = TaggedItem.objects.get_tags_for(obj_type, random.randint(0, 1000))
-    
-    return render(request, 'index.html', {'result': result})
\ No newline at end of file
+    # A random object per request, only the tag list fragment is cached.
+    return _render_home(request, random.choice(OBJ_TYPES), random.randint(0, 1000))
+
+
+@cache_view(Tag, TaggedItem, *OBJ_TYPES)
+def homeview_object(request, app_label, model_name, obj_id):
+    obj_type = OBJ_TYPES_BY_LABEL.get(f'{app_label}.{model_name}')
+    if obj_type is None:
+        raise Http404('No such object type.')
+    return _render_home(request, obj_type, obj_id)
+
+
+async def homeview_async(request):
+    # Rendered in a database thread, the template may query.
+    render_home = db_sync_to_async(_render_home)
+    return await render_home(request, random.choice(OBJ_TYPES), random.randint(0, 1000))
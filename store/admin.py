@@ -1,9 +1,16 @@
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.db import DatabaseError
+from django.template.response import TemplateResponse
 from django.utils.html import format_html, urlencode
 from django.urls import reverse
-from . import models
-from django.db.models import Count
+from . import models, search
 from tags.models import TaggedItem
+from .exports import streaming_export_response
+from .forms import InventoryAdjustmentForm
+from .inventory import adjust_inventory, set_inventory_levels
+from .pagination import KeysetPaginationMixin
+from .search import PrefixSearchMixin
 
 #Filters
 class InventoryFilter(admin.SimpleListFilter):
@@ -19,10 +26,21 @@ class InventoryFilter(admin.SimpleListFilter):
     def queryset(self, request, queryset):
         if self.value() == '<10':
             return queryset.filter(inventory__lt=10)
-        else:
+        if self.value() == '>10':
             return queryset.filter(inventory__gte=10)
 
 
+#Actions
+@admin.action(description='Export selected as CSV')
+def export_csv(modeladmin, request, queryset):
+    return streaming_export_response(queryset, 'csv')
+
+
+@admin.action(description='Export selected as JSON Lines')
+def export_jsonl(modeladmin, request, queryset):
+    return streaming_export_response(queryset, 'jsonl')
+
+
 #Inlines
 class OrderItemInline(admin.TabularInline):
     model = models.OrderItem
@@ -32,16 +50,28 @@ class OrderItemInline(admin.TabularInline):
 
 #Models
 @admin.register(models.Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(KeysetPaginationMixin, admin.ModelAdmin):
     list_display = ['title', 'unit_price', 'inventory_status', 'collection_title']
     list_editable = ['unit_price']
     list_per_page = 10
     list_filter = ['collection', 'last_update', InventoryFilter]
-    actions = ['clear_inventory']
+    actions = ['clear_inventory', 'adjust_inventory']
     prepopulated_fields = {'slug': ('title',)}
     autocomplete_fields = ['collection']
     search_fields = ['title']
+    autocomplete_text_fields = ['title']
+
 
+    def get_search_results(self, request, queryset, search_term):
+        # Served from the search index instead of LIKE '%term%' over all products.
+        ranking = search.rank_products(search_term)
+        if ranking is None:
+            return super().get_search_results(request, queryset, search_term)
+        queryset = search.filter_products(queryset, ranking)
+        if getattr(request.resolver_match, 'url_name', None) == 'autocomplete':
+            # The changelist applies its own ordering, autocomplete lists the best matches first.
+            queryset = search.order_by_rank(queryset, ranking)
+        return queryset, False
 
     @admin.display(ordering='collection')
     def collection_title(self, product):
@@ -57,26 +87,54 @@ class ProductAdmin(admin.ModelAdmin):
     @admin.action(description='Clear inventory')
     def clear_inventory(self, request, queryset):
         try:
-            updated_count = queryset.update(inventory=0)
+            updated_count = set_inventory_levels(dict.fromkeys(queryset.values_list('pk', flat=True), 0))
             self.message_user(
                 request,
                 f'{updated_count} products were successfully updated.'
             )
-        except:
+        except DatabaseError:
             self.message_user(
                 request,
                 'Could not update inventory. Something is wrong.',
                 messages.ERROR
             )
 
+    @admin.action(description='Adjust inventory')
+    def adjust_inventory(self, request, queryset):
+        form = InventoryAdjustmentForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            updated_count = adjust_inventory(queryset, form.cleaned_data['delta'])
+            self.message_user(
+                request,
+                f'{updated_count} products were successfully updated.'
+            )
+            return None
+
+        return TemplateResponse(request, 'admin/store/product/adjust_inventory.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Adjust inventory',
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            'action': 'adjust_inventory',
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        })
+
 
 @admin.register(models.Customer)
-class CustomerAdmin(admin.ModelAdmin):
-    list_display = ['first_name', 'last_name', 'membership', 'orders_count']
+class CustomerAdmin(PrefixSearchMixin, KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ['first_name', 'last_name', 'membership', 'orders_count',
+                    'lifetime_value', 'last_order_at', 'eligible_membership']
     list_editable = ['membership']
     list_per_page = 10
+    list_select_related = ['summary']
+    list_filter = ['membership', 'summary__eligible_membership']
     ordering = ['first_name', 'last_name']
+    actions = [export_csv, export_jsonl]
     search_fields = ['first_name__istartswith', 'last_name__istartswith']
+    autocomplete_text_fields = ['first_name', 'last_name']
 
 
 
@@ -88,16 +146,37 @@ class CustomerAdmin(admin.ModelAdmin):
             + urlencode({'customer__id__exact': str(customer.id)})
         )
         return format_html('<a href={}>{} orders</a>', url, customer.orders_count)
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(orders_count=Count('order'))
+
+    # Read from CustomerSummary, kept up to date by the order signals.
+    def customer_summary(self, customer):
+        try:
+            return customer.summary
+        except models.CustomerSummary.DoesNotExist:
+            return None
+
+    @admin.display(ordering='summary__lifetime_value', empty_value='-')
+    def lifetime_value(self, customer):
+        summary = self.customer_summary(customer)
+        return summary and summary.lifetime_value
+
+    @admin.display(ordering='summary__last_order_at', empty_value='-')
+    def last_order_at(self, customer):
+        summary = self.customer_summary(customer)
+        return summary and summary.last_order_at
+
+    @admin.display(ordering='summary__eligible_membership', empty_value='-')
+    def eligible_membership(self, customer):
+        summary = self.customer_summary(customer)
+        return summary and summary.get_eligible_membership_display()
 
 
 @admin.register(models.Collection)
-class CollectionAdmin(admin.ModelAdmin):
+class CollectionAdmin(PrefixSearchMixin, admin.ModelAdmin):
     list_display = ['title', 'featured_product', 'products_count']
+    list_select_related = ['featured_product']
     list_per_page = 10
     search_fields = ['title__istartswith']
+    autocomplete_text_fields = ['title']
 
     @admin.display(ordering='products_count')
     def products_count(self, collection):
@@ -107,18 +186,16 @@ class CollectionAdmin(admin.ModelAdmin):
             + urlencode({"collection__id__exact": str(collection.id)})
         )
         return format_html('<a href={}>{}</a>', url, collection.products_count)
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(products_count=Count('product'))
 
 
 @admin.register(models.Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'customer_fullname', 'payment_status', 'placed_at']
+class OrderAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ['id', 'customer_fullname', 'payment_status', 'placed_at', 'item_count', 'total']
     ordering = ['id']
     list_per_page = 10
     autocomplete_fields = ['customer']
     inlines = [OrderItemInline]
+    actions = [export_csv, export_jsonl]
 
     def customer_fullname(self, order):
         return f'{order.customer.first_name} {order.customer.last_name}'
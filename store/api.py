@@ -0,0 +1,145 @@
+"""
+Projections and conditional responses for the read-only JSON API.
+
+Rows are read with values() for the requested fields only, and every
+response carries an ETag and Last-Modified derived from cheap validator
+queries, so an unchanged resource is answered with 304 before any row is
+loaded or serialized. Changes to a product's tags or promotions touch its
+last_update (see store.signals.handlers), which keeps it a valid validator.
+"""
+import hashlib
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from tags.models import TaggedItem
+from .models import Product
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+PRODUCT_FIELDS = [
+    'id', 'title', 'slug', 'description', 'unit_price', 'inventory',
+    'last_update', 'collection', 'tags', 'promotions',
+]
+PRODUCT_DEFAULT_FIELDS = ['id', 'title', 'slug', 'unit_price', 'inventory', 'last_update', 'collection']
+COLLECTION_FIELDS = ['id', 'title', 'featured_product', 'products_count']
+
+# API field -> column, for foreign keys that are returned as plain ids.
+COLUMNS = {
+    'collection': 'collection_id',
+    'featured_product': 'featured_product_id',
+}
+RELATED_FIELDS = {'tags', 'promotions'}
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+def parse_fields(value, allowed, default=None):
+    """The fields named in a comma separated ?fields= value, in the order of allowed."""
+    if not value:
+        return list(default or allowed)
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise InvalidParameter(f'Unknown fields: {", ".join(sorted(unknown))}.')
+    return [field for field in allowed if field in requested]
+
+
+def parse_int(value, name, default=None, minimum=0, maximum=None):
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidParameter(f'{name} must be an integer.')
+    if maximum is None and value < minimum:
+        raise InvalidParameter(f'{name} must be at least {minimum}.')
+    if maximum is not None and not minimum <= value <= maximum:
+        raise InvalidParameter(f'{name} must be between {minimum} and {maximum}.')
+    return value
+
+
+def make_etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def page_validators(queryset, after, limit):
+    """
+    ([(pk, last_update), ...], etag, last_modified) for the next keyset page
+    of products. This is the only query a 304 response costs.
+    """
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    page = list(queryset.order_by('pk').values_list('pk', 'last_update')[:limit])
+    last_modified = max((last_update for _, last_update in page), default=None)
+    return page, make_etag(page), last_modified
+
+
+def project(queryset, fields):
+    """values() for the scalar fields, with foreign keys renamed to the API field."""
+    columns = ['id'] + [COLUMNS.get(field, field) for field in fields
+                        if field != 'id' and field not in RELATED_FIELDS]
+    reverse = {column: field for field, column in COLUMNS.items()}
+    return [
+        {reverse.get(column, column): value for column, value in row.items()}
+        for row in queryset.values(*columns)
+    ]
+
+
+def product_rows(product_ids, fields):
+    """Rows for the given products in id order, with tags and promotions batched per page."""
+    rows = project(Product.objects.filter(pk__in=product_ids).order_by('pk'), fields)
+    ids = [row['id'] for row in rows]
+
+    if 'tags' in fields:
+        tags = TaggedItem.objects.get_tags_for_many(Product, ids)
+        for row in rows:
+            row['tags'] = sorted(tag.label for tag in tags[row['id']])
+
+    if 'promotions' in fields:
+        promotions = {product_id: [] for product_id in ids}
+        links = Product.promotions.through.objects \
+            .filter(product_id__in=ids) \
+            .order_by('promotion_id') \
+            .values_list('product_id', 'promotion_id', 'promotion__description', 'promotion__discount')
+        for product_id, promotion_id, description, discount in links:
+            promotions[product_id].append(
+                {'id': promotion_id, 'description': description, 'discount': discount}
+            )
+        for row in rows:
+            row['promotions'] = promotions[row['id']]
+
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def collection_rows(queryset, fields):
+    """(rows, last id) for the collections of queryset, the id is kept for paging."""
+    rows = project(queryset, fields)
+    last_id = rows[-1]['id'] if rows else None
+    return [{field: row[field] for field in fields} for row in rows], last_id
+
+
+def conditional_json_response(request, etag, last_modified, build):
+    """
+    304 when the client's validators still match, otherwise JsonResponse(build()).
+    Clients are asked to revalidate on every use.
+    """
+    etag = quote_etag(etag)
+    # HTTP dates have whole seconds, so does the comparison with If-Modified-Since.
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = JsonResponse(build())
+        response.headers['ETag'] = etag
+        if timestamp is not None:
+            response.headers['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def next_url(request, last_id):
+    query = request.GET.copy()
+    query['after'] = last_id
+    return f'{request.path}?{query.urlencode()}'
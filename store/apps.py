@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self) -> None:
+        import store.signals.handlers
+        from storeuz.caching import connect_receivers
+        connect_receivers()
@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+from storeuz.caching import bump_model_versions
+from .models import Cart, CartItem
+
+BATCH_SIZE = 1000
+# Largest PositiveSmallIntegerField value on every backend, quantities
+# added up beyond it are capped.
+MAX_QUANTITY = 32767
+
+
+def _lock_carts(cart_ids):
+    """Lock the cart rows in id order so that concurrent merges cannot deadlock."""
+    locked = list(
+        Cart.objects
+            .select_for_update()
+            .filter(pk__in=cart_ids)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+    )
+    missing = set(cart_ids) - set(locked)
+    if missing:
+        raise Cart.DoesNotExist(f'Carts {sorted(missing)} do not exist.')
+
+
+def _touch_carts(cart_ids):
+    Cart.objects.filter(pk__in=cart_ids).update(updated_at=timezone.now())
+
+
+def _add_items(cart_id, quantities):
+    existing = set(
+        CartItem.objects
+            .filter(cart_id=cart_id, product_id__in=quantities)
+            .values_list('product_id', flat=True)
+    )
+    if existing:
+        CartItem.objects \
+            .filter(cart_id=cart_id, product_id__in=existing) \
+            .update(quantity=Least(F('quantity') + Case(
+                *[When(product_id=product_id, then=Value(min(quantities[product_id], MAX_QUANTITY)))
+                  for product_id in existing],
+                output_field=IntegerField(),
+            ), MAX_QUANTITY))
+    CartItem.objects.bulk_create([
+        CartItem(cart_id=cart_id, product_id=product_id, quantity=min(quantity, MAX_QUANTITY))
+        for product_id, quantity in quantities.items()
+        if product_id not in existing
+    ])
+    _touch_carts([cart_id])
+
+
+def add_items(cart_id, quantities):
+    """
+    Add {product_id: quantity} to the cart. Products already in the cart
+    are incremented with one UPDATE, the rest are inserted with one
+    bulk INSERT, all while the cart row is locked. Quantities stop at
+    MAX_QUANTITY.
+    """
+    if any(quantity <= 0 for quantity in quantities.values()):
+        raise ValueError('Quantities must be positive.')
+    if not quantities:
+        return
+
+    with transaction.atomic():
+        _lock_carts([cart_id])
+        _add_items(cart_id, quantities)
+        bump_model_versions(CartItem)
+
+
+def remove_items(cart_id, product_ids):
+    with transaction.atomic():
+        removed = CartItem.objects.filter(cart_id=cart_id, product_id__in=product_ids).delete()[0]
+        _touch_carts([cart_id])
+        bump_model_versions(CartItem)
+    return removed
+
+
+def merge_carts(target_cart_id, source_cart_ids):
+    """
+    Move the items of all source carts into the target cart, adding up the
+    quantities of products that appear more than once, and delete the
+    source carts.
+    """
+    source_cart_ids = [cart_id for cart_id in source_cart_ids if cart_id != target_cart_id]
+    if not source_cart_ids:
+        return
+
+    with transaction.atomic():
+        _lock_carts([target_cart_id, *source_cart_ids])
+        quantities = dict(
+            CartItem.objects
+                .filter(cart_id__in=source_cart_ids)
+                .values('product_id')
+                .annotate(total=Sum('quantity'))
+                .order_by()
+                .values_list('product_id', 'total')
+        )
+        if quantities:
+            _add_items(target_cart_id, quantities)
+        Cart.objects.filter(pk__in=source_cart_ids).delete()
+        bump_model_versions(Cart, CartItem)
+
+
+def purge_carts(inactive_since, batch_size=BATCH_SIZE):
+    """
+    Delete carts that have not changed since the given time together with
+    their items. Every batch is its own short transaction so the tables
+    are never locked for long. Yields the number of carts deleted per batch.
+    """
+    while True:
+        cart_ids = list(
+            Cart.objects
+                .filter(updated_at__lt=inactive_since)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+        )
+        if not cart_ids:
+            return
+
+        with transaction.atomic():
+            # Skip carts that were used since they were picked.
+            cart_ids = list(
+                Cart.objects
+                    .select_for_update()
+                    .filter(pk__in=cart_ids, updated_at__lt=inactive_since)
+                    .values_list('pk', flat=True)
+            )
+            CartItem.objects.filter(cart_id__in=cart_ids).delete()
+            deleted, _ = Cart.objects.filter(pk__in=cart_ids).delete()
+            bump_model_versions(Cart, CartItem)
+        yield deleted
@@ -0,0 +1,170 @@
+"""
+Read-through cache for catalog reads.
+
+Every cached value is keyed by the version of what it depends on, so
+invalidation only bumps a version number (see store.signals.handlers) and
+stale entries simply stop being read until the backend evicts them.
+Versions are bumped once the writing transaction commits, before that a
+reader would cache the old rows under the new version.
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from storeuz.caching import CacheStats
+from storeuz.routers import use_primary
+from .models import Collection, Product
+
+TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+LOCK_TIMEOUT = 5
+LOCK_POLL_INTERVAL = 0.05
+MISSING = object()
+
+
+stats = CacheStats()
+
+
+def _version_key(name):
+    return f'catalog:version:{name}'
+
+
+def _versions(*names):
+    keys = [_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock so that a version key evicted by the
+            # backend never restarts below a value that is still cached.
+            cache.add(key, time.time_ns() // 1000, None)
+            versions[key] = cache.get(key)
+    return ':'.join(str(versions[key]) for key in keys)
+
+
+def product_versions(product_ids):
+    """{product_id: version} covering the product itself and all promotions."""
+    names = [f'product:{product_id}' for product_id in product_ids]
+    keys = {_version_key(name): name for name in names + ['promotions']}
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        for key in keys.keys() - versions.keys():
+            versions[key] = _versions(keys[key])
+    promotions = versions[_version_key('promotions')]
+    return {
+        product_id: f'{versions[_version_key(name)]}:{promotions}'
+        for product_id, name in zip(product_ids, names)
+    }
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns() // 1000, None)
+
+
+def _bump(*names):
+    keys = [_version_key(name) for name in names]
+
+    def bump():
+        for key in keys:
+            _incr(key)
+    transaction.on_commit(bump)
+
+
+def _read_through(key, build):
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        stats.incr('hits')
+        return value
+    stats.incr('misses')
+
+    # Only one process rebuilds a missing key, the others wait for its result.
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            # A replica may not have the change that caused the rebuild yet.
+            with use_primary():
+                value = build()
+            cache.set(key, value, TIMEOUT)
+            stats.incr('builds')
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    stats.incr('lock_waits')
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+    stats.incr('lock_timeouts')
+    with use_primary():
+        return build()
+
+
+def _products():
+    return Product.objects.select_related('collection').prefetch_related('promotions')
+
+
+def get_product(product_id):
+    """Product with its collection and promotions loaded, or None."""
+    version = _versions(f'product:{product_id}', 'promotions')
+    return _read_through(
+        f'catalog:product:{product_id}:{version}',
+        lambda: _products().filter(pk=product_id).first(),
+    )
+
+
+def get_collection(collection_id):
+    """Collection with its featured product loaded, or None."""
+    version = _versions(f'collection:{collection_id}')
+    return _read_through(
+        f'catalog:collection:{collection_id}:{version}',
+        lambda: Collection.objects.select_related('featured_product').filter(pk=collection_id).first(),
+    )
+
+
+def get_collection_products(collection_id):
+    """List of the collection's products, loaded like get_product()."""
+    version = _versions(f'collection-products:{collection_id}', 'promotions')
+    return _read_through(
+        f'catalog:collection-products:{collection_id}:{version}',
+        lambda: list(_products().filter(collection_id=collection_id)),
+    )
+
+
+def invalidate_product(product_id):
+    _bump(f'product:{product_id}')
+
+
+def invalidate_products(product_ids):
+    """
+    Invalidate the products and the listings of their collections, for
+    queryset updates, which send no post_save.
+    """
+    product_ids = list(product_ids)
+    collection_ids = Product.objects \
+        .filter(pk__in=product_ids) \
+        .values_list('collection_id', flat=True) \
+        .order_by() \
+        .distinct()
+    _bump(
+        *[f'collection-products:{collection_id}' for collection_id in collection_ids],
+        *[f'product:{product_id}' for product_id in product_ids],
+    )
+
+
+def invalidate_collection(collection_id):
+    # Cached products include their collection.
+    product_ids = Product.objects.filter(collection_id=collection_id).values_list('pk', flat=True)
+    _bump(f'collection:{collection_id}', *[f'product:{product_id}' for product_id in product_ids])
+
+
+def invalidate_collection_products(collection_id):
+    _bump(f'collection-products:{collection_id}')
+
+
+def invalidate_promotions():
+    _bump('promotions')
@@ -0,0 +1,115 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from .models import Customer, Order, OrderItem
+
+CHUNK_SIZE = 2000
+
+ORDER_COLUMNS = [
+    'order_id', 'placed_at', 'payment_status', 'total',
+    'customer_id', 'customer_first_name', 'customer_last_name', 'customer_email',
+    'product_id', 'product_title', 'quantity', 'unit_price',
+]
+CUSTOMER_COLUMNS = [
+    'customer_id', 'first_name', 'last_name', 'email', 'phone',
+    'birth_date', 'membership', 'orders_count',
+]
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield the objects of queryset as lists of chunk_size, walking the
+    primary key instead of using OFFSET. Every chunk is one query plus one
+    query per prefetch_related lookup, so memory stays bounded by the chunk.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def order_rows(queryset, chunk_size=CHUNK_SIZE):
+    """One row per order item, orders without items get a single row."""
+    items = OrderItem.objects.select_related('product').only(
+        'order_id', 'quantity', 'unit_price', 'product__id', 'product__title'
+    )
+    queryset = queryset \
+        .select_related('customer') \
+        .prefetch_related(Prefetch('orderitem_set', queryset=items))
+
+    for chunk in iter_chunks(queryset, chunk_size):
+        for order in chunk:
+            customer = order.customer
+            order_columns = [
+                order.id, order.placed_at, order.payment_status, order.total,
+                customer.id, customer.first_name, customer.last_name, customer.email,
+            ]
+            order_items = order.orderitem_set.all()
+            if not order_items:
+                yield order_columns + [None, None, None, None]
+            for item in order_items:
+                yield order_columns + [item.product.id, item.product.title, item.quantity, item.unit_price]
+
+
+def customer_rows(queryset, chunk_size=CHUNK_SIZE):
+    for chunk in iter_chunks(queryset, chunk_size):
+        for customer in chunk:
+            yield [
+                customer.id, customer.first_name, customer.last_name, customer.email,
+                customer.phone, customer.birth_date, customer.membership, customer.orders_count,
+            ]
+
+
+EXPORTERS = {
+    Order: (ORDER_COLUMNS, order_rows),
+    Customer: (CUSTOMER_COLUMNS, customer_rows),
+}
+
+
+class Echo:
+    """File-like object that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson'),
+}
+
+
+def export_lines(queryset, format, chunk_size=CHUNK_SIZE):
+    columns, rows = EXPORTERS[queryset.model]
+    lines, _ = FORMATS[format]
+    return lines(columns, rows(queryset, chunk_size))
+
+
+def streaming_export_response(queryset, format, chunk_size=CHUNK_SIZE):
+    _, content_type = FORMATS[format]
+    response = StreamingHttpResponse(
+        export_lines(queryset, format, chunk_size),
+        content_type=content_type,
+    )
+    filename = f'{queryset.model._meta.model_name}s.{format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,8 @@
+from django import forms
+
+
+class InventoryAdjustmentForm(forms.Form):
+    delta = forms.IntegerField(
+        help_text='Added to the inventory of every selected product, use a negative number to remove stock '
+                  '(inventory stops at 0).'
+    )
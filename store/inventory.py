@@ -0,0 +1,98 @@
+import csv
+import json
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from . import catalog
+from .models import Product
+
+BATCH_SIZE = 500
+
+
+def _batches(items, batch_size):
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def apply_inventory_deltas(deltas, batch_size=BATCH_SIZE):
+    """
+    Add {product_id: delta} to the inventory of each product. Every batch is
+    one UPDATE ... SET inventory = inventory + CASE id WHEN ... END in its own
+    transaction, so concurrent orders never lose a decrement. Inventory
+    never goes below 0. Returns the number of products updated.
+    """
+    updated = 0
+    for batch in _batches(sorted(deltas.items()), batch_size):
+        delta = Case(
+            *[When(pk=product_id, then=Value(value)) for product_id, value in batch],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        with transaction.atomic():
+            updated += Product.objects \
+                .filter(pk__in=[product_id for product_id, _ in batch]) \
+                .update(inventory=Greatest(F('inventory') + delta, 0), last_update=timezone.now())
+            catalog.invalidate_products([product_id for product_id, _ in batch])
+    return updated
+
+
+def set_inventory_levels(levels, batch_size=BATCH_SIZE):
+    """Overwrite the inventory with {product_id: level}, batched like apply_inventory_deltas."""
+    if any(level < 0 for level in levels.values()):
+        raise ValueError('Inventory levels cannot be negative.')
+    updated = 0
+    for batch in _batches(sorted(levels.items()), batch_size):
+        level = Case(
+            *[When(pk=product_id, then=Value(value)) for product_id, value in batch],
+            output_field=IntegerField(),
+        )
+        with transaction.atomic():
+            updated += Product.objects \
+                .filter(pk__in=[product_id for product_id, _ in batch]) \
+                .update(inventory=level, last_update=timezone.now())
+            catalog.invalidate_products([product_id for product_id, _ in batch])
+    return updated
+
+
+def adjust_inventory(queryset, delta, batch_size=BATCH_SIZE):
+    """
+    Add the same delta to every product in queryset, batch_size products
+    per UPDATE, never going below 0.
+    """
+    product_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    updated = 0
+    for batch in _batches(product_ids, batch_size):
+        with transaction.atomic():
+            updated += Product.objects \
+                .filter(pk__in=batch) \
+                .update(inventory=Greatest(F('inventory') + delta, 0), last_update=timezone.now())
+            catalog.invalidate_products(batch)
+    return updated
+
+
+def read_inventory_rows(file, format, column='delta'):
+    """
+    Parse CSV (with a header row) or JSON Lines records holding product_id
+    and `column` into {product_id: value}. Deltas for the same product are
+    summed, absolute levels are overwritten by the last record.
+    """
+    if format == 'csv':
+        records = csv.DictReader(file)
+    elif format == 'jsonl':
+        records = (json.loads(line) for line in file if line.strip())
+    else:
+        raise ValueError(f'Unknown inventory file format: {format}')
+
+    values = {}
+    for line, record in enumerate(records, start=1):
+        try:
+            product_id = int(record['product_id'])
+            value = int(record[column])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Record {line} needs integer product_id and {column}: {record}')
+        if column == 'delta':
+            value += values.get(product_id, 0)
+        values[product_id] = value
+    return values
+
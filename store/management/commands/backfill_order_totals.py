@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Order.total and Order.item_count from the order items in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, **options):
+        last_id = 0
+        updated = 0
+
+        while True:
+            order_ids = list(
+                Order.objects
+                    .filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .values_list('pk', flat=True)[:options['chunk_size']]
+            )
+            if not order_ids:
+                break
+
+            with transaction.atomic():
+                updated += Order.objects.refresh_totals(order_ids)
+            last_id = order_ids[-1]
+
+        self.stdout.write(f'{updated} orders updated')
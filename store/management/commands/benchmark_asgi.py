@@ -0,0 +1,218 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from storeuz.async_db import DB_THREADS
+from storeuz.metrics import percentile
+from store.models import Product
+
+CLIENT_ADDR = '10.0.0.1'
+HOST = 'localhost'
+
+# Middleware that only exists for local development and has no async
+# implementation. Left in, it forces Django to run every async view through
+# async_to_sync in a thread, which is what the ASGI setup is meant to avoid.
+# RequestMetricsMiddleware stays, it is what production profiles with.
+DEV_MIDDLEWARE = [
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires the same requests at the WSGI and the ASGI application in this '
+        'process, with an artificial delay on every query, and compares '
+        'throughput and latency.'
+    )
+
+    DEFAULT_PATHS = [
+        '/store/catalog/products/{product}/',
+        '/tags/store/product/?ids={products}',
+        '/home/async/',
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request, may be repeated. {product} and {products} '
+                                 'are replaced with random product ids.')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='Number of clients sending requests back to back.')
+        parser.add_argument('--wsgi-workers', type=int, default=8,
+                            help='Requests the WSGI server handles at once.')
+        parser.add_argument('--db-latency', type=float, default=50,
+                            help='Milliseconds added to every query, 0 to disable.')
+        parser.add_argument('--all-middleware', action='store_true',
+                            help='Keep the sync-only development middleware.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, **options):
+        product_ids = list(Product.objects.values_list('pk', flat=True))
+        if not product_ids:
+            raise CommandError('There are no products, run seed_store first.')
+
+        rng = random.Random(options['seed'])
+        paths = [
+            rng.choice(options['paths'] or self.DEFAULT_PATHS).format(
+                product=rng.choice(product_ids),
+                products=','.join(str(pk) for pk in rng.sample(product_ids, min(20, len(product_ids)))),
+            )
+            for _ in range(options['requests'])
+        ]
+
+        middleware = settings.MIDDLEWARE
+        if not options['all_middleware']:
+            middleware = [name for name in middleware if name not in DEV_MIDDLEWARE]
+
+        self.latency = options['db_latency'] / 1000
+        connection_created.connect(self.add_latency)
+        try:
+            with override_settings(MIDDLEWARE=middleware):
+                wsgi = get_wsgi_application()
+                asgi = get_asgi_application()
+                results = {}
+                cache.clear()
+                results['wsgi'] = self.run_wsgi(wsgi, paths, options['concurrency'], options['wsgi_workers'])
+                cache.clear()
+                results['asgi'] = asyncio.run(self.run_asgi(asgi, paths, options['concurrency']))
+        finally:
+            connection_created.disconnect(self.add_latency)
+
+        self.stdout.write(
+            f'{len(paths)} requests, {options["concurrency"]} clients, '
+            f'{options["db_latency"]:g}ms per query, {options["wsgi_workers"]} WSGI workers, '
+            f'{DB_THREADS} ASGI database threads'
+        )
+        self.stdout.write(f'{"":6}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name, (elapsed, latencies, errors) in results.items():
+            latencies.sort()
+            self.stdout.write(
+                f'{name:6}{len(latencies) / elapsed:>10.1f}'
+                f'{percentile(latencies, 0.5):>10.1f}'
+                f'{percentile(latencies, 0.95):>10.1f}'
+                f'{percentile(latencies, 0.99):>10.1f}'
+                f'{errors:>8}'
+            )
+        if any(errors for _, _, errors in results.values()):
+            raise CommandError('Some requests did not return 200.')
+
+    def add_latency(self, sender, connection, **kwargs):
+        if self.latency and self.delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.delay)
+
+    def delay(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+    def run_wsgi(self, application, paths, concurrency, workers):
+        """Every client waits for its request to go through a fixed pool of workers."""
+        queue = iter(paths)
+        lock = threading.Lock()
+        latencies = []
+        errors = 0
+
+        def call(path):
+            url = urlsplit(path)
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'SCRIPT_NAME': '',
+                'PATH_INFO': url.path,
+                'QUERY_STRING': url.query,
+                'SERVER_NAME': HOST,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'REMOTE_ADDR': CLIENT_ADDR,
+                'HTTP_HOST': HOST,
+                'wsgi.version': (1, 0),
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            body = application(environ, lambda status_line, headers: status.append(status_line))
+            try:
+                b''.join(body)
+            finally:
+                body.close()
+            return status[0].startswith('200')
+
+        def client(pool):
+            nonlocal errors
+            while True:
+                with lock:
+                    path = next(queue, None)
+                if path is None:
+                    return
+                start = time.perf_counter()
+                ok = pool.submit(call, path).result()
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    errors += not ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool, \
+                ThreadPoolExecutor(max_workers=concurrency) as clients:
+            for future in [clients.submit(client, pool) for _ in range(concurrency)]:
+                future.result()
+        return time.perf_counter() - start, latencies, errors
+
+    async def run_asgi(self, application, paths, concurrency):
+        """All clients share one event loop, like a single ASGI worker process."""
+        queue = iter(paths)
+        latencies = []
+        errors = 0
+
+        async def call(path):
+            url = urlsplit(path)
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': url.path,
+                'raw_path': url.path.encode(),
+                'query_string': url.query.encode(),
+                'root_path': '',
+                'headers': [(b'host', HOST.encode())],
+                'client': (CLIENT_ADDR, 50000),
+                'server': (HOST, 80),
+            }
+            status = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            await application(scope, receive, send)
+            return status[0] == 200
+
+        async def client():
+            nonlocal errors
+            for path in queue:
+                start = time.perf_counter()
+                ok = await call(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+        return time.perf_counter() - start, latencies, errors
@@ -0,0 +1,142 @@
+import threading
+import time
+from unittest import mock
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from storeuz.db import pool
+from storeuz.metrics import percentile
+from .benchmark_asgi import CLIENT_ADDR, DEV_MIDDLEWARE, HOST
+
+
+class Command(BaseCommand):
+    help = (
+        'Serves the same requests through the WSGI handler with connections '
+        'opened per request, kept persistent (with and without health checks) '
+        'and pooled, and compares throughput and connections opened.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/home/')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--pool-size', type=int, default=4)
+        parser.add_argument('--connect-latency', type=float, default=0,
+                            help='Milliseconds added to opening a connection, to mimic a '
+                                 'network database when running against SQLite.')
+
+    def handle(self, **options):
+        wrapper = connections[DEFAULT_DB_ALIAS]
+        if not hasattr(wrapper, 'health_check_done'):
+            raise CommandError('The default database must use a storeuz.db.backends engine.')
+
+        modes = {
+            'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+            'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+            'persistent+checks': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+            'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True,
+                     'POOL': {'MAX_SIZE': options['pool_size'], 'TIMEOUT': 30}},
+        }
+
+        # The stock backend class below the storeuz mixin opens the DB-API connection.
+        backend = next(cls for cls in type(wrapper).__mro__
+                       if cls.__module__.startswith('django.') and 'get_new_connection' in vars(cls))
+        connect = backend.get_new_connection
+        latency = options['connect_latency'] / 1000
+
+        def slow_connect(self, conn_params):
+            time.sleep(latency)
+            return connect(self, conn_params)
+
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        original = {key: settings_dict.get(key) for key in ['CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'POOL']}
+        middleware = [name for name in settings.MIDDLEWARE if name not in DEV_MIDDLEWARE]
+        connections.close_all()
+
+        results = {}
+        try:
+            with override_settings(MIDDLEWARE=middleware), \
+                    mock.patch.object(backend, 'get_new_connection', slow_connect):
+                application = get_wsgi_application()
+                for name, mode in modes.items():
+                    settings_dict.pop('POOL', None)
+                    settings_dict.update(mode)
+                    pool.stats.reset()
+                    elapsed, latencies, errors = self.run(application, options)
+                    counters = pool.stats.snapshot().get(DEFAULT_DB_ALIAS, {})
+                    pool.close_pools()
+                    results[name] = (elapsed, latencies, errors, counters)
+        finally:
+            settings_dict.pop('POOL', None)
+            settings_dict.update({key: value for key, value in original.items() if value is not None})
+
+        self.stdout.write(
+            f'{options["requests"]} requests to {options["path"]}, {options["threads"]} threads, '
+            f'pool of {options["pool_size"]}, {options["connect_latency"]:g}ms per connect'
+        )
+        self.stdout.write(
+            f'{"":18}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}'
+            f'{"created":>9}{"checkouts":>11}{"waits":>7}{"reconnects":>12}{"errors":>8}'
+        )
+        for name, (elapsed, latencies, errors, counters) in results.items():
+            latencies.sort()
+            self.stdout.write(
+                f'{name:18}{len(latencies) / elapsed:>9.1f}'
+                f'{percentile(latencies, 0.5):>9.2f}{percentile(latencies, 0.95):>9.2f}'
+                f'{counters.get("created", 0):>9}{counters.get("checkouts", 0):>11}'
+                f'{counters.get("waits", 0):>7}{counters.get("reconnects", 0):>12}{errors:>8}'
+            )
+        if any(result[2] for result in results.values()):
+            raise CommandError('Some requests did not return 200.')
+
+    def run(self, application, options):
+        url = urlsplit(options['path'])
+        remaining = iter(range(options['requests']))
+        lock = threading.Lock()
+        latencies = []
+        errors = 0
+
+        def call():
+            environ = {
+                'PATH_INFO': url.path,
+                'QUERY_STRING': url.query,
+                'REMOTE_ADDR': CLIENT_ADDR,
+                'HTTP_HOST': HOST,
+            }
+            setup_testing_defaults(environ)
+            status = []
+            body = application(environ, lambda status_line, headers: status.append(status_line))
+            try:
+                b''.join(body)
+            finally:
+                body.close()
+            return status[0].startswith('200')
+
+        def worker():
+            nonlocal errors
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    start = time.perf_counter()
+                    ok = call()
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        errors += not ok
+            finally:
+                # Persistent connections belong to this thread, close them with it.
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, errors
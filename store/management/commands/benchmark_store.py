@@ -0,0 +1,127 @@
+import json
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from store.models import Product, Collection, Customer, Order, OrderItem
+from tags.cache import tag_cache
+from tags.models import TaggedItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Times admin changelists, the playground homeview and tag lookups '
+        'against the current database and writes the results as JSON.'
+    )
+
+    ADMIN_PAGES = {
+        'admin.product_changelist': '/admin/store/product/',
+        'admin.product_changelist_search': '/admin/store/product/?q=lamp',
+        'admin.customer_changelist': '/admin/store/customer/',
+        'admin.customer_changelist_by_orders': '/admin/store/customer/?o=4',
+        'admin.collection_changelist': '/admin/store/collection/',
+        'admin.order_changelist': '/admin/store/order/',
+        'admin.order_changelist_last_page': '/admin/store/order/?p={last_order_page}',
+        'homeview': '/home/',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--tag-lookup-size', type=int, default=100,
+                            help='Number of products per get_tags_for_many call.')
+        parser.add_argument('--label', default='', help='Free text stored with the results.')
+        parser.add_argument('--output', help='Write JSON results to this file instead of stdout.')
+        parser.add_argument('--compare', help='Previous JSON results to print the difference against.')
+
+    def handle(self, **options):
+        self.repeat = options['repeat']
+        client = self.get_client()
+        last_order_page = max(1, -(-Order.objects.count() // 10) - 1)
+
+        results = {}
+        for name, url in self.ADMIN_PAGES.items():
+            url = url.format(last_order_page=last_order_page)
+            results[name] = self.measure(lambda: self.get(client, url))
+
+        product_ids = list(Product.objects.order_by('id')
+                                          .values_list('id', flat=True)[:options['tag_lookup_size']])
+        results['tags.get_tags_for'] = self.measure(
+            lambda: [list(TaggedItem.objects.get_tags_for(Product, product_id))
+                     for product_id in product_ids]
+        )
+        results['tags.get_tags_for_many.cold'] = self.measure(
+            lambda: (tag_cache.clear(), TaggedItem.objects.get_tags_for_many(Product, product_ids))
+        )
+        results['tags.get_tags_for_many.warm'] = self.measure(
+            lambda: TaggedItem.objects.get_tags_for_many(Product, product_ids)
+        )
+
+        report = {
+            'label': options['label'],
+            'vendor': connection.vendor,
+            'repeat': self.repeat,
+            'rows': {
+                model._meta.label: model.objects.count()
+                for model in [Product, Collection, Customer, Order, OrderItem, TaggedItem]
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def get_client(self):
+        user, _ = User.objects.get_or_create(
+            username='benchmark',
+            defaults={'is_staff': True, 'is_superuser': True},
+        )
+        # Keep debug_toolbar out of the measurements, it only shows for INTERNAL_IPS.
+        client = Client(SERVER_NAME='localhost', REMOTE_ADDR='10.0.0.1')
+        client.force_login(user)
+        return client
+
+    def get(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+
+    def measure(self, func):
+        timings = []
+        queries = 0
+        for _ in range(self.repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = len(context)
+
+        timings.sort()
+        return {
+            'min_ms': round(timings[0], 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': queries,
+        }
+
+    def compare(self, path, results):
+        with open(path) as file:
+            previous = json.load(file)['results']
+
+        self.stderr.write(f'{"benchmark":<40} {"before":>10} {"after":>10} {"change":>8}')
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]['median_ms']
+            after = result['median_ms']
+            change = (after - before) / before * 100 if before else 0
+            self.stderr.write(f'{name:<40} {before:>10.2f} {after:>10.2f} {change:>+7.1f}%')
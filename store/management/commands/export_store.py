@@ -0,0 +1,29 @@
+import sys
+from django.core.management.base import BaseCommand
+from store.exports import CHUNK_SIZE, FORMATS, export_lines
+from store.models import Customer, Order
+
+MODELS = {
+    'orders': Order,
+    'customers': Customer,
+}
+
+
+class Command(BaseCommand):
+    help = 'Streams all orders (one row per item) or customers as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=MODELS)
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help='Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, **options):
+        queryset = MODELS[options['kind']].objects.all()
+        lines = export_lines(queryset, options['format'], options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+                file.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from store.inventory import apply_inventory_deltas, read_inventory_rows, set_inventory_levels
+
+
+class Command(BaseCommand):
+    help = (
+        'Applies inventory changes from a CSV or JSON Lines file with '
+        'product_id and delta (or inventory, with --set) per record.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, '-' reads stdin.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Defaults to the file extension.')
+        parser.add_argument('--set', action='store_true',
+                            help='Overwrite inventory with the "inventory" column instead of adding "delta".')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, **options):
+        path = options['path']
+        format = options['format'] or Path(path).suffix.lstrip('.').lower()
+        if format not in ('csv', 'jsonl'):
+            raise CommandError('Use --format csv or --format jsonl.')
+        column = 'inventory' if options['set'] else 'delta'
+
+        try:
+            if path == '-':
+                values = read_inventory_rows(sys.stdin, format, column)
+            else:
+                with open(path, newline='', encoding='utf-8') as file:
+                    values = read_inventory_rows(file, format, column)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        apply = set_inventory_levels if options['set'] else apply_inventory_deltas
+        try:
+            updated = apply(values, batch_size=options['batch_size'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.stdout.write(f'{updated} products updated')
+        if updated < len(values):
+            self.stderr.write(f'{len(values) - updated} product ids were not found')
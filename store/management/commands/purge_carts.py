@@ -0,0 +1,25 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from store.carts import purge_carts
+
+
+class Command(BaseCommand):
+    help = 'Deletes carts (and their items) unchanged for more than --older-than days in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30, metavar='DAYS')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches.')
+
+    def handle(self, **options):
+        inactive_since = timezone.now() - timedelta(days=options['older_than'])
+        deleted = 0
+        for batch in purge_carts(inactive_since, options['batch_size']):
+            deleted += batch
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f'{deleted} carts deleted')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from store.models import Product
+from store.search import BATCH_SIZE, index_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product search index in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, **options):
+        last_id = 0
+        indexed = 0
+        while True:
+            ids = list(
+                Product.objects
+                    .filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            indexed += index_products(ids, options['batch_size'])
+            last_id = ids[-1]
+
+        self.stdout.write(f'{indexed} products indexed')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store.models import Collection, Customer
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Customer.orders_count and Collection.products_count in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, **options):
+        counters = [
+            (Customer, Customer.objects.refresh_orders_count),
+            (Collection, Collection.objects.refresh_products_count),
+        ]
+        for model, refresh in counters:
+            last_id = 0
+            updated = 0
+            while True:
+                ids = list(
+                    model.objects
+                        .filter(pk__gt=last_id)
+                        .order_by('pk')
+                        .values_list('pk', flat=True)[:options['chunk_size']]
+                )
+                if not ids:
+                    break
+
+                with transaction.atomic():
+                    updated += refresh(ids)
+                last_id = ids[-1]
+
+            self.stdout.write(f'{updated} {model._meta.verbose_name_plural} updated')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from store.models import Customer, CustomerSummary
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the customer summaries from the orders in chunks and moves '
+        'customers up to the membership tier their lifetime spend qualifies for.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--keep-memberships', action='store_true',
+                            help='Only refresh the summaries.')
+
+    def handle(self, **options):
+        last_id = 0
+        refreshed = 0
+        moved = 0
+
+        while True:
+            customer_ids = list(
+                Customer.objects
+                    .filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .values_list('pk', flat=True)[:options['chunk_size']]
+            )
+            if not customer_ids:
+                break
+
+            with transaction.atomic():
+                refreshed += CustomerSummary.objects.refresh(customer_ids)
+                if not options['keep_memberships']:
+                    moved += Customer.objects.refresh_memberships(customer_ids)
+            last_id = customer_ids[-1]
+
+        self.stdout.write(f'{refreshed} customer summaries refreshed, {moved} customers promoted')
@@ -0,0 +1,207 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from likes.models import LikedItem
+from store.models import Collection, Product, Promotion, Customer, Order, OrderItem, Cart, CartItem
+from tags.models import Tag, TaggedItem
+
+
+ADJECTIVES = ['Fresh', 'Smart', 'Classic', 'Compact', 'Deluxe', 'Organic', 'Rustic', 'Sleek', 'Vintage', 'Wireless']
+NOUNS = ['Lamp', 'Chair', 'Kettle', 'Speaker', 'Backpack', 'Notebook', 'Jacket', 'Blender', 'Watch', 'Mug']
+FIRST_NAMES = ['Aziz', 'Dilnoza', 'Jasur', 'Malika', 'Otabek', 'Sevara', 'Timur', 'Zarina', 'Bekzod', 'Nodira']
+LAST_NAMES = ['Karimov', 'Rashidova', 'Yusupov', 'Aliyeva', 'Tursunov', 'Saidova', 'Ergashev', 'Nazarova']
+TAG_LABELS = ['new', 'sale', 'popular', 'eco', 'gift', 'premium', 'limited', 'bestseller']
+
+
+class Command(BaseCommand):
+    help = 'Fills the store with deterministic synthetic data for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--collections', type=int, help='Defaults to one per 100 products.')
+        parser.add_argument('--carts', type=int, help='Defaults to half the number of orders.')
+        parser.add_argument('--users', type=int, default=100, help='Users that like products.')
+        parser.add_argument('--likes', type=int, help='Defaults to two per product.')
+        parser.add_argument('--days', type=int, default=365, help='Orders are spread over this many past days.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        products = options['products']
+        collections = options['collections'] or max(1, products // 100)
+        carts = options['carts'] if options['carts'] is not None else options['orders'] // 2
+        likes = options['likes'] if options['likes'] is not None else products * 2
+
+        collection_ids = self.seed_collections(collections)
+        products = self.seed_products(products, collection_ids)
+        customer_ids = self.seed_customers(options['customers'])
+        self.seed_orders(options['orders'], options['days'], customer_ids, products)
+        self.seed_carts(carts, products)
+        self.seed_tags(products)
+        self.seed_likes(options['users'], likes, products)
+
+        # bulk_create skips the signals that maintain denormalized data.
+        call_command('backfill_order_totals', stdout=self.stdout)
+        call_command('rebuild_store_counters', stdout=self.stdout)
+        call_command('refresh_customer_summaries', stdout=self.stdout)
+        call_command('rebuild_like_counters', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('refresh_sales_rollups', rebuild=True, stdout=self.stdout)
+
+    def bulk_create(self, model, objs):
+        """Insert objs in chunks and return the ids of the new rows."""
+        last_id = model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        objs = iter(objs)
+        created = 0
+        while True:
+            chunk = list(islice(objs, self.chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            created += len(chunk)
+
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {created} created')
+        return list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True))
+
+    def seed_collections(self, count):
+        start = Collection.objects.count()
+        return self.bulk_create(Collection, (
+            Collection(title=f'Collection {start + i}') for i in range(count)
+        ))
+
+    def seed_products(self, count, collection_ids):
+        rng = self.rng
+        start = Product.objects.count()
+
+        def products():
+            for i in range(count):
+                title = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {start + i}'
+                yield Product(
+                    title=title,
+                    slug=title.lower().replace(' ', '-'),
+                    description=f'{title} for everyday use.',
+                    unit_price=Decimal(rng.randint(100, 99999)) / 100,
+                    inventory=rng.randint(0, 100),
+                    collection_id=rng.choice(collection_ids),
+                )
+
+        product_ids = self.bulk_create(Product, products())
+
+        promotion_ids = self.bulk_create(Promotion, (
+            Promotion(description=f'{percent}% off', discount=percent / 100)
+            for percent in (5, 10, 15, 20, 30)
+        ))
+        Through = Product.promotions.through
+        self.bulk_create(Through, (
+            Through(product_id=product_id, promotion_id=rng.choice(promotion_ids))
+            for product_id in product_ids
+            if rng.random() < 0.1
+        ))
+
+        return dict(Product.objects.filter(id__in=product_ids).order_by('id').values_list('id', 'unit_price'))
+
+    def seed_customers(self, count):
+        rng = self.rng
+        start = Customer.objects.count()
+        return self.bulk_create(Customer, (
+            Customer(
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'customer{start + i}@seed.storeuz.uz',
+                phone=f'+998{rng.randint(900000000, 999999999)}',
+                birth_date=date(1960, 1, 1) + timedelta(days=rng.randint(0, 16000)),
+                membership=rng.choice([Customer.MEMBERSHIP_BRONZE] * 6 +
+                                      [Customer.MEMBERSHIP_SILVER] * 3 +
+                                      [Customer.MEMBERSHIP_GOLD]),
+            )
+            for i in range(count)
+        ))
+
+    def seed_orders(self, count, days, customer_ids, products):
+        rng = self.rng
+        statuses = [Order.PAYMENT_STATUS_COMPLETE] * 8 + \
+                   [Order.PAYMENT_STATUS_PENDING] + \
+                   [Order.PAYMENT_STATUS_FAILED]
+        order_ids = self.bulk_create(Order, (
+            Order(customer_id=rng.choice(customer_ids), payment_status=rng.choice(statuses))
+            for _ in range(count)
+        ))
+
+        # placed_at is auto_now_add, so it can only be spread out afterwards.
+        now = timezone.now()
+        for start in range(0, len(order_ids), self.chunk_size):
+            orders = [
+                Order(id=order_id, placed_at=now - timedelta(seconds=rng.randint(0, days * 86400)))
+                for order_id in order_ids[start:start + self.chunk_size]
+            ]
+            with transaction.atomic():
+                Order.objects.bulk_update(orders, ['placed_at'])
+
+        product_ids = list(products)
+
+        def order_items():
+            for order_id in order_ids:
+                for product_id in rng.sample(product_ids, min(len(product_ids), rng.randint(1, 5))):
+                    yield OrderItem(order_id=order_id,
+                                    product_id=product_id,
+                                    quantity=rng.randint(1, 5),
+                                    unit_price=products[product_id])
+
+        self.bulk_create(OrderItem, order_items())
+
+    def seed_carts(self, count, products):
+        rng = self.rng
+        cart_ids = self.bulk_create(Cart, (Cart() for _ in range(count)))
+        product_ids = list(products)
+        self.bulk_create(CartItem, (
+            CartItem(cart_id=cart_id, product_id=product_id, quantity=rng.randint(1, 3))
+            for cart_id in cart_ids
+            for product_id in rng.sample(product_ids, min(len(product_ids), rng.randint(1, 3)))
+        ))
+
+    def seed_tags(self, products):
+        rng = self.rng
+        existing = dict(Tag.objects.filter(label__in=TAG_LABELS).values_list('label', 'id'))
+        self.bulk_create(Tag, (Tag(label=label) for label in TAG_LABELS if label not in existing))
+        tag_ids = list(Tag.objects.filter(label__in=TAG_LABELS).values_list('id', flat=True))
+
+        content_type = ContentType.objects.get_for_model(Product)
+        self.bulk_create(TaggedItem, (
+            TaggedItem(tag_id=tag_id, content_type=content_type, object_id=product_id)
+            for product_id in products
+            for tag_id in rng.sample(tag_ids, rng.randint(0, 3))
+        ))
+
+    def seed_likes(self, users, count, products):
+        rng = self.rng
+        start = User.objects.filter(username__startswith='seed-user-').count()
+        user_ids = self.bulk_create(User, (User(username=f'seed-user-{start + i}') for i in range(users)))
+
+        content_type = ContentType.objects.get_for_model(Product)
+        product_ids = list(products)
+        existing = set()
+        count = min(count, len(user_ids) * len(product_ids))
+
+        def liked_items():
+            created = 0
+            while created < count:
+                like = (rng.choice(user_ids), rng.choice(product_ids))
+                if like in existing:
+                    continue
+                existing.add(like)
+                created += 1
+                yield LikedItem(user_id=like[0], content_type=content_type, object_id=like[1])
+
+        self.bulk_create(LikedItem, liked_items())
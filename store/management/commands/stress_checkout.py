@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from store.models import Collection, Customer, Order, OrderItem, Product
+from store.orders import InsufficientInventory, place_order
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs many simultaneous checkouts against a few scarce products and '
+        'verifies that no stock is lost or oversold.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--products', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=200, help='Initial inventory per product.')
+        parser.add_argument('--max-retries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated data.')
+
+    def handle(self, **options):
+        collection = Collection.objects.create(title='Stress test')
+        products = [
+            Product.objects.create(title=f'Stress product {i}', slug=f'stress-product-{i}',
+                                   description='', unit_price=Decimal('10.00'),
+                                   inventory=options['stock'], collection=collection)
+            for i in range(options['products'])
+        ]
+        customer = Customer.objects.create(first_name='Stress', last_name='Test',
+                                           email=f'stress-{time.time_ns()}@storeuz.uz', phone='')
+        product_ids = [product.pk for product in products]
+
+        rng = random.Random(options['seed'])
+        baskets = [
+            {product_id: rng.randint(1, 5)
+             for product_id in rng.sample(product_ids, rng.randint(1, len(product_ids)))}
+            for _ in range(options['orders'])
+        ]
+
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def checkout(basket):
+            try:
+                for attempt in range(options['max_retries']):
+                    try:
+                        place_order(customer.pk, basket)
+                        result = 'placed'
+                        break
+                    except InsufficientInventory:
+                        result = 'rejected'
+                        break
+                    except OperationalError:
+                        # Lock timeouts and deadlocks are retried, SQLite
+                        # reports concurrent writers as "database is locked".
+                        with lock:
+                            outcomes['retries'] += 1
+                        time.sleep(0.01 * (attempt + 1) * rng.random())
+                else:
+                    result = 'failed'
+                with lock:
+                    outcomes[result] += 1
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            list(executor.map(checkout, baskets))
+        elapsed = time.perf_counter() - start
+
+        sold = Counter()
+        for product_id, quantity in OrderItem.objects \
+                .filter(product_id__in=product_ids) \
+                .values_list('product_id', 'quantity'):
+            sold[product_id] += quantity
+        inventory = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'inventory'))
+
+        self.stdout.write(
+            f'{len(baskets)} checkouts in {elapsed:.2f}s ({len(baskets) / elapsed:.1f}/s) '
+            f'with {options["workers"]} workers: {outcomes["placed"]} placed, '
+            f'{outcomes["rejected"]} rejected for stock, {outcomes["failed"]} failed, '
+            f'{outcomes["retries"]} retries'
+        )
+        errors = [
+            f'product {product_id}: {options["stock"]} stock, {sold[product_id]} sold, '
+            f'{inventory[product_id]} left'
+            for product_id in product_ids
+            if inventory[product_id] < 0 or sold[product_id] + inventory[product_id] != options['stock']
+        ]
+        orders_placed = Order.objects.filter(customer=customer).count()
+        if orders_placed != outcomes['placed']:
+            errors.append(f'{outcomes["placed"]} checkouts succeeded but {orders_placed} orders exist')
+
+        if not options['keep']:
+            OrderItem.objects.filter(order__customer=customer).delete()
+            Order.objects.filter(customer=customer).delete()
+            customer.delete()
+            Product.objects.filter(pk__in=product_ids).delete()
+            collection.delete()
+
+        if errors:
+            raise CommandError('Inventory is inconsistent:\n' + '\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Inventory is consistent.'))
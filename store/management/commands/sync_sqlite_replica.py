@@ -0,0 +1,40 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies the SQLite primary into the SQLite replica databases, once or '
+        'every --interval seconds, to try replica routing and lag locally.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Seconds between copies, 0 copies once.')
+
+    def handle(self, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replicas = [settings.DATABASES[alias] for alias in settings.REPLICA_DATABASES]
+        if not primary['ENGINE'].endswith('sqlite3') or not replicas:
+            raise CommandError('Needs STOREUZ_DB=sqlite and STOREUZ_SQLITE_REPLICA_NAME.')
+
+        while True:
+            start = time.perf_counter()
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for replica in replicas:
+                    target = sqlite3.connect(replica['NAME'])
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(f'Copied to {len(replicas)} replicas in {time.perf_counter() - start:.2f}s')
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
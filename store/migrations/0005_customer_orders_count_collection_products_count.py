@@ -0,0 +1,41 @@
+# Generated by Django 4.0.5 on 2026-10-18 06:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Collection = apps.get_model('store', 'Collection')
+    Customer = apps.get_model('store', 'Customer')
+    Order = apps.get_model('store', 'Order')
+    Product = apps.get_model('store', 'Product')
+
+    products = Product.objects.filter(collection=OuterRef('pk')) \
+        .values('collection').annotate(count=Count('id')).values('count')
+    Collection.objects.update(products_count=Coalesce(Subquery(products), 0))
+
+    orders = Order.objects.filter(customer=OuterRef('pk')) \
+        .values('customer').annotate(count=Count('id')).values('count')
+    Customer.objects.update(orders_count=Coalesce(Subquery(orders), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_order_total_item_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='products_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='orders_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.5 on 2026-10-18 06:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    CartItem = apps.get_model('store', 'CartItem')
+    duplicates = CartItem.objects \
+        .values('cart', 'product') \
+        .annotate(keep_id=Min('id'), quantity=Sum('quantity'), items=Count('id')) \
+        .filter(items__gt=1)
+    for duplicate in duplicates:
+        CartItem.objects \
+            .filter(id=duplicate['keep_id']) \
+            .update(quantity=min(duplicate['quantity'], 32767))
+        CartItem.objects \
+            .filter(cart=duplicate['cart'], product=duplicate['product']) \
+            .exclude(id=duplicate['keep_id']) \
+            .delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_customer_orders_count_collection_products_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
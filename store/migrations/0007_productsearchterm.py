@@ -0,0 +1,27 @@
+# Generated by Django 4.0.5 on 2026-10-18 06:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_cart_created_at_index_unique_cart_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='store.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productsearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'product'), name='unique_product_search_term'),
+        ),
+    ]
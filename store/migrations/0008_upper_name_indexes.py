@@ -0,0 +1,26 @@
+# Generated by Django 4.0.5 on 2026-10-18 06:58
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_productsearchterm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(django.db.models.functions.text.Upper('title'), name='store_collection_title_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Upper('first_name'), name='store_customer_first_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Upper('last_name'), name='store_customer_last_upper'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.5 on 2026-10-18 07:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_upper_name_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='store.customer')),
+                ('lifetime_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('completed_orders', models.PositiveIntegerField(default=0)),
+                ('last_order_at', models.DateTimeField(null=True)),
+                ('eligible_membership', models.CharField(choices=[('B', 'Bronze'), ('S', 'Silver'), ('G', 'Gold')], default='B', max_length=1)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'customer summaries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='customersummary',
+            index=models.Index(fields=['lifetime_value'], name='store_custo_lifetim_00572b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customersummary',
+            index=models.Index(fields=['last_order_at'], name='store_custo_last_or_4ba607_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.5 on 2026-10-18 07:28
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def set_cart_updated_at(apps, schema_editor):
+    # The latest activity known so far is the cart's creation.
+    Cart = apps.get_model('store', 'Cart')
+    last_id = Cart.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    for start in range(0, last_id, 1000):
+        Cart.objects \
+            .filter(id__gt=start, id__lte=start + 1000) \
+            .update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_customersummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(set_cart_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
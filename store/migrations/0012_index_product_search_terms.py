@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+def index_products(apps, schema_editor):
+    # Databases that had products before 0007 would search an empty index.
+    from store.search import product_terms
+
+    Product = apps.get_model('store', 'Product')
+    ProductSearchTerm = apps.get_model('store', 'ProductSearchTerm')
+    TaggedItem = apps.get_model('tags', 'TaggedItem')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    content_type = ContentType.objects.filter(app_label='store', model='product').first()
+
+    product_ids = list(
+        Product.objects
+            .filter(search_terms__isnull=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+    )
+    for start in range(0, len(product_ids), 500):
+        batch = product_ids[start:start + 500]
+        tags = {product_id: [] for product_id in batch}
+        if content_type is not None:
+            for object_id, label in TaggedItem.objects \
+                    .filter(content_type=content_type, object_id__in=batch) \
+                    .values_list('object_id', 'tag__label'):
+                tags[object_id].append(label)
+        ProductSearchTerm.objects.bulk_create([
+            ProductSearchTerm(term=term, product_id=product_id, weight=weight)
+            for product_id, title, description in Product.objects
+                .filter(pk__in=batch)
+                .values_list('pk', 'title', 'description')
+            for term, weight in product_terms(title, description, tags[product_id]).items()
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('store', '0011_keyset_indexes'),
+        ('tags', '0004_unique_tagged_item'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_products, migrations.RunPython.noop),
+    ]
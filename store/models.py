@@ -1,21 +1,102 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import Count, DecimalField, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Upper
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+class MaintainedFieldsMixin:
+    """
+    save() of an existing row leaves out maintained_fields, which are kept
+    up to date with queryset updates (see store.signals.handlers) and would
+    otherwise be written back with whatever value the instance was loaded.
+    """
+    maintained_fields = ()
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        if update_fields is None and not force_insert and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.maintained_fields
+            ]
+        super().save(force_insert=force_insert, force_update=force_update, using=using,
+                     update_fields=update_fields)
+
+
+class PreviousValuesMixin:
+    """
+    save() reads the values of tracked_fields (attnames) the row had
+    before the write, locked with SELECT ... FOR UPDATE in the same
+    transaction, so that the receivers in store.signals.handlers move the
+    counters away from the right rows even when the instance is stale or
+    was built by hand with a primary key. delete() reloads them the same
+    way first.
+    """
+    tracked_fields = ()
+
+    def _read_tracked_values(self, using):
+        if self.pk is None:
+            return {}
+        return type(self)._base_manager \
+            .using(using) \
+            .select_for_update() \
+            .filter(pk=self.pk) \
+            .values(*self.tracked_fields) \
+            .first() or {}
+
+    def previous_value(self, name, default=None):
+        return getattr(self, '_previous_values', {}).get(name, default)
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            self._previous_values = {} if force_insert else self._read_tracked_values(using)
+            super().save(force_insert=force_insert, force_update=force_update, using=using,
+                         update_fields=update_fields)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            for name, value in self._read_tracked_values(using).items():
+                setattr(self, name, value)
+            return super().delete(using=using, keep_parents=keep_parents)
+
 
 class Promotion(models.Model):
     description = models.CharField(max_length=255)
     discount = models.FloatField()
 
-class Collection(models.Model):
+class CollectionManager(models.Manager):
+
+    def refresh_products_count(self, collection_ids):
+        products = Product.objects \
+            .filter(collection=OuterRef('pk')) \
+            .values('collection') \
+            .annotate(count=Count('id')) \
+            .values('count')
+        return self.filter(pk__in=collection_ids) \
+            .update(products_count=Coalesce(Subquery(products), 0))
+
+
+class Collection(MaintainedFieldsMixin, models.Model):
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey(to='Product', on_delete=models.SET_NULL, null=True, related_name='+')
+    # Maintained by store.signals.handlers, see rebuild_store_counters.
+    products_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+
+    objects = CollectionManager()
+    maintained_fields = ('products_count',)
     
     def __str__(self) -> str:
         return self.title
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(Upper('title'), name='store_collection_title_upper'),
+        ]
 
-class Product(models.Model):
+class Product(PreviousValuesMixin, models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField()
     description = models.TextField()
@@ -25,13 +106,60 @@ class Product(models.Model):
     collection = models.ForeignKey(to=Collection, on_delete=models.PROTECT)
     promotions = models.ManyToManyField(to=Promotion)
 
+    tracked_fields = ('collection_id',)
+
     def __str__(self) -> str:
         return self.title
     
     class Meta:
         ordering = ['title']
-    
-class Customer(models.Model):
+        indexes = [
+            # The admin changelist pages through (title, id), see store.pagination.
+            models.Index(fields=['title', 'id']),
+        ]
+
+
+class ProductSearchTerm(models.Model):
+    """
+    Inverted index over product title, description and tags, maintained
+    by store.search. One row per distinct term of a product.
+    """
+    term = models.CharField(max_length=64)
+    product = models.ForeignKey(to=Product, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'product'], name='unique_product_search_term'),
+        ]
+
+class CustomerManager(models.Manager):
+
+    def refresh_orders_count(self, customer_ids):
+        orders = Order.objects \
+            .filter(customer=OuterRef('pk')) \
+            .values('customer') \
+            .annotate(count=Count('id')) \
+            .values('count')
+        return self.filter(pk__in=customer_ids) \
+            .update(orders_count=Coalesce(Subquery(orders), 0))
+
+    def refresh_memberships(self, customer_ids):
+        """
+        Promote customers to the tier their summary qualifies for, returns
+        the number moved. Nobody is moved down, so a tier staff granted by
+        hand is kept.
+        """
+        tiers = [membership for membership, _ in Customer.MEMBERSHIP_CHOICES]
+        moved = 0
+        for index, membership in enumerate(tiers[1:], 1):
+            moved += self.filter(pk__in=customer_ids, summary__eligible_membership=membership,
+                                 membership__in=tiers[:index]) \
+                .update(membership=membership)
+        return moved
+
+
+class Customer(MaintainedFieldsMixin, models.Model):
     MEMBERSHIP_BRONZE = 'B'
     MEMBERSHIP_SILVER = 'S'
     MEMBERSHIP_GOLD = 'G'
@@ -47,11 +175,41 @@ class Customer(models.Model):
     phone = models.CharField(max_length=255)
     birth_date = models.DateField(null=True)
     membership = models.CharField(max_length=1, choices=MEMBERSHIP_CHOICES, default=MEMBERSHIP_BRONZE)
+    # Maintained by store.signals.handlers, see rebuild_store_counters.
+    orders_count = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+
+    objects = CustomerManager()
+    maintained_fields = ('orders_count',)
 
     def __str__(self) -> str:
         return f'{self.first_name} {self.last_name}'
 
-class Order(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(Upper('first_name'), name='store_customer_first_upper'),
+            models.Index(Upper('last_name'), name='store_customer_last_upper'),
+            # The admin changelist pages through (first_name, last_name, id).
+            models.Index(fields=['first_name', 'last_name', 'id']),
+        ]
+
+class OrderManager(models.Manager):
+
+    def refresh_totals(self, order_ids):
+        items = OrderItem.objects \
+            .filter(order=OuterRef('pk')) \
+            .values('order')
+        line_totals = items.annotate(
+            total=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
+        ).values('total')
+        quantities = items.annotate(quantity=Sum('quantity')).values('quantity')
+
+        return self.filter(pk__in=order_ids).update(
+            total=Coalesce(Subquery(line_totals), 0, output_field=DecimalField()),
+            item_count=Coalesce(Subquery(quantities), 0),
+        )
+
+
+class Order(MaintainedFieldsMixin, PreviousValuesMixin, models.Model):
     PAYMENT_STATUS_PENDING = 'P'
     PAYMENT_STATUS_COMPLETE = 'C'
     PAYMENT_STATUS_FAILED = 'F'
@@ -64,13 +222,107 @@ class Order(models.Model):
     placed_at = models.DateTimeField(auto_now_add=True)
     payment_status = models.CharField(max_length=1, choices=PAYMENT_STATUS_CHOICES, default=PAYMENT_STATUS_PENDING)
     customer = models.ForeignKey(to=Customer, on_delete=models.PROTECT)
+    # Materialized from the order items by OrderManager.refresh_totals().
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = OrderManager()
+    maintained_fields = ('total', 'item_count')
+    tracked_fields = ('customer_id', 'payment_status')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'total']),
+            models.Index(fields=['placed_at', 'total']),
+        ]
+
+class CustomerSummaryManager(models.Manager):
+
+    def refresh(self, customer_ids):
+        """
+        Recompute the summaries of the given customers from their orders,
+        creating missing ones. Returns the number of summaries written.
+        """
+        customer_ids = list(customer_ids)
+        completed = Q(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        totals = {
+            row['customer']: row
+            for row in Order.objects
+                .filter(customer__in=customer_ids)
+                .values('customer')
+                .annotate(
+                    spent=Sum('total', filter=completed),
+                    completed=Count('id', filter=completed),
+                    last_order=Max('placed_at'),
+                )
+                .order_by()
+        }
+
+        now = timezone.now()
+        summaries = []
+        for customer_id in Customer.objects.filter(pk__in=customer_ids).values_list('pk', flat=True):
+            row = totals.get(customer_id, {})
+            lifetime_value = row.get('spent') or 0
+            summaries.append(CustomerSummary(
+                customer_id=customer_id,
+                lifetime_value=lifetime_value,
+                completed_orders=row.get('completed', 0),
+                last_order_at=row.get('last_order'),
+                eligible_membership=membership_for_spend(lifetime_value),
+                refreshed_at=now,
+            ))
 
-class OrderItem(models.Model):
+        existing = set(self.filter(pk__in=customer_ids).values_list('pk', flat=True))
+        self.bulk_update(
+            [summary for summary in summaries if summary.pk in existing],
+            ['lifetime_value', 'completed_orders', 'last_order_at', 'eligible_membership', 'refreshed_at'],
+            batch_size=500,
+        )
+        # A concurrent refresh may have created some meanwhile, with the same values.
+        self.bulk_create([summary for summary in summaries if summary.pk not in existing], ignore_conflicts=True)
+        return len(summaries)
+
+
+def membership_for_spend(lifetime_value):
+    """The highest tier whose spend threshold lifetime_value reaches."""
+    thresholds = [
+        (Customer.MEMBERSHIP_GOLD, getattr(settings, 'MEMBERSHIP_GOLD_SPEND', 25000)),
+        (Customer.MEMBERSHIP_SILVER, getattr(settings, 'MEMBERSHIP_SILVER_SPEND', 10000)),
+    ]
+    for membership, threshold in thresholds:
+        if lifetime_value >= threshold:
+            return membership
+    return Customer.MEMBERSHIP_BRONZE
+
+
+# Maintained by store.signals.handlers, see refresh_customer_summaries.
+class CustomerSummary(models.Model):
+    customer = models.OneToOneField(to=Customer, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    # Totals of completed orders.
+    lifetime_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    completed_orders = models.PositiveIntegerField(default=0)
+    last_order_at = models.DateTimeField(null=True)
+    eligible_membership = models.CharField(max_length=1, choices=Customer.MEMBERSHIP_CHOICES,
+                                           default=Customer.MEMBERSHIP_BRONZE)
+    refreshed_at = models.DateTimeField()
+
+    objects = CustomerSummaryManager()
+
+    class Meta:
+        verbose_name_plural = 'customer summaries'
+        indexes = [
+            models.Index(fields=['lifetime_value']),
+            models.Index(fields=['last_order_at']),
+        ]
+
+class OrderItem(PreviousValuesMixin, models.Model):
     order = models.ForeignKey(to=Order, on_delete=models.PROTECT)
     product = models.ForeignKey(to=Product, on_delete=models.PROTECT)
     quantity = models.PositiveSmallIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
 
+    tracked_fields = ('order_id',)
+
 class Address(models.Model):
     street = models.CharField(max_length=255)
     city = models.CharField(max_length=255)
@@ -78,9 +330,16 @@ class Address(models.Model):
 
 class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
+    # Last change to the cart or its items, see store.carts.purge_carts().
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 class CartItem(models.Model):
     cart = models.ForeignKey(to=Cart, on_delete=models.CASCADE)
     product = models.ForeignKey(to=Product, on_delete=models.CASCADE)
     quantity = models.PositiveSmallIntegerField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
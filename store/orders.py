@@ -0,0 +1,84 @@
+from django.db import transaction
+from .inventory import apply_inventory_deltas
+from .models import Cart, CartItem, Order, OrderItem, Product
+
+
+class InsufficientInventory(Exception):
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        details = ', '.join(
+            f'product {product_id}: {requested} requested, {available} available'
+            for product_id, (requested, available) in sorted(shortages.items())
+        )
+        super().__init__(f'Not enough inventory ({details}).')
+
+
+def place_order(customer_id, quantities, payment_status=Order.PAYMENT_STATUS_PENDING):
+    """
+    Create an order for {product_id: quantity} and take the items out of
+    stock, all or nothing.
+
+    Only the ordered products are locked, always in id order so that
+    concurrent checkouts with overlapping products cannot deadlock. Unit
+    prices are copied from the locked rows, the items are inserted with one
+    bulk INSERT and the inventory is decremented with one UPDATE.
+    Raises InsufficientInventory when any product is short.
+    """
+    if not quantities or any(quantity <= 0 for quantity in quantities.values()):
+        raise ValueError('An order needs at least one product with a positive quantity.')
+
+    with transaction.atomic():
+        products = list(
+            Product.objects
+                .select_for_update()
+                .filter(pk__in=quantities)
+                .order_by('pk')
+                .only('id', 'unit_price', 'inventory')
+        )
+        missing = quantities.keys() - {product.pk for product in products}
+        if missing:
+            raise Product.DoesNotExist(f'Products {sorted(missing)} do not exist.')
+
+        shortages = {
+            product.pk: (quantities[product.pk], product.inventory)
+            for product in products
+            if product.inventory < quantities[product.pk]
+        }
+        if shortages:
+            raise InsufficientInventory(shortages)
+
+        items = [
+            OrderItem(product_id=product.pk,
+                      quantity=quantities[product.pk],
+                      unit_price=product.unit_price)
+            for product in products
+        ]
+        # bulk_create skips the OrderItem signals, so the totals are set here.
+        order = Order.objects.create(
+            customer_id=customer_id,
+            payment_status=payment_status,
+            total=sum(item.quantity * item.unit_price for item in items),
+            item_count=sum(item.quantity for item in items),
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+
+        apply_inventory_deltas({
+            product_id: -quantity for product_id, quantity in quantities.items()
+        })
+
+    return order
+
+
+def place_order_from_cart(cart_id, customer_id, payment_status=Order.PAYMENT_STATUS_PENDING):
+    """place_order() with the cart's items, the cart is deleted on success."""
+    with transaction.atomic():
+        Cart.objects.select_for_update().get(pk=cart_id)
+        quantities = dict(
+            CartItem.objects.filter(cart_id=cart_id).values_list('product_id', 'quantity')
+        )
+        order = place_order(customer_id, quantities, payment_status)
+        Cart.objects.filter(pk=cart_id).delete()
+    return order
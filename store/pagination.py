@@ -0,0 +1,191 @@
+import base64
+import json
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction, DatabaseError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_VAR = 'cursor'
+
+
+def estimate_row_count(model, using):
+    """
+    Row count of the model's table from the database statistics,
+    or None if the backend has no (usable) statistics for it.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'mysql': (
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+            [table],
+        ),
+        'postgresql': (
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(table)],
+        ),
+        # Only filled in after ANALYZE has been run.
+        'sqlite': (
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+            [table],
+        ),
+    }
+    if connection.vendor not in queries:
+        return None
+
+    sql, params = queries[connection.vendor]
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the table statistics instead of COUNT(*) for unfiltered querysets
+    over big tables. Filtered querysets are still counted exactly.
+    """
+    estimate_threshold = 100000
+
+    _estimate = None
+
+    @property
+    def is_estimate(self):
+        return self.count is not None and self._estimate is not None
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where and not queryset.query.distinct:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                self._estimate = estimate
+                return estimate
+        return super().count
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=DjangoJSONEncoder).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise IncorrectLookupParameters
+
+
+def keyset_filter(ordering, values):
+    """
+    Q object selecting the rows that come after `values` in `ordering`, i.e.
+    (a > x) OR (a = x AND b > y) OR ... with the comparison flipped for
+    descending fields. The redundant a >= x in front lets the database
+    read the index on the ordering as one range instead of merging the
+    branches of the OR and sorting them.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    if len(equal) > 1:
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        condition = Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+    return condition
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Pages through the changelist by remembering the ordering values of the
+    last row instead of using OFFSET. Only active for the default ordering;
+    sorting by a column falls back to the regular paginator.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        new_params = new_params or {}
+        if CURSOR_VAR not in new_params:
+            remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_keyset_ordering(self, request):
+        if ORDER_VAR in self.params:
+            return None
+        ordering = list(
+            self.model_admin.get_ordering(request) or self._get_default_ordering()
+        )
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            return None
+        pk_name = self.lookup_opts.pk.name
+        if not {'pk', pk_name, '-pk', f'-{pk_name}'} & set(ordering):
+            ordering.append('pk')
+        return ordering
+
+    def get_results(self, request):
+        self.keyset_ordering = self.get_keyset_ordering(request)
+        self.cursor = self.params.get(CURSOR_VAR)
+        self.next_cursor = None
+        if not self.keyset_ordering:
+            return super().get_results(request)
+
+        paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        queryset = self.queryset.order_by(*self.keyset_ordering)
+        if self.cursor:
+            values = decode_cursor(self.cursor)
+            if len(values) != len(self.keyset_ordering):
+                raise IncorrectLookupParameters
+            queryset = queryset.filter(keyset_filter(self.keyset_ordering, values))
+
+        # The keys of the last row of this page and of the first row of the next one.
+        names = [field.lstrip('-') for field in self.keyset_ordering]
+        boundary = list(
+            queryset.values_list(*names)[self.list_per_page - 1:self.list_per_page + 1]
+        )
+        if len(boundary) == 2:
+            self.next_cursor = encode_cursor(list(boundary[0]))
+
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = queryset[:self.list_per_page]
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.next_cursor)
+        self.paginator = paginator
+
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+
+    @property
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+class KeysetPaginationMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,77 @@
+"""
+Effective prices: the unit price reduced by the product's best promotion.
+
+Promotion.discount is a fraction of the unit price (0.15 is 15% off).
+Promotions do not stack, only the biggest discount applies.
+"""
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import DecimalField, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least, Round
+from storeuz.routers import use_primary
+from . import catalog
+from .models import Product, Promotion
+
+CENT = Decimal('0.01')
+TIMEOUT = catalog.TIMEOUT
+
+
+def with_effective_prices(queryset):
+    """
+    Annotate best_discount and effective_price on a Product queryset. Both
+    are computed by the database in the same query as the products.
+    """
+    best_discount = Promotion.objects \
+        .filter(product=OuterRef('pk')) \
+        .order_by('-discount') \
+        .values('discount')[:1]
+    return queryset.annotate(
+        best_discount=Greatest(
+            Least(Coalesce(Subquery(best_discount), Value(0.0)), Value(1.0)),
+            Value(0.0),
+            output_field=FloatField(),
+        ),
+    ).annotate(
+        effective_price=Round(
+            F('unit_price') * (Value(1.0) - F('best_discount')),
+            2,
+            output_field=DecimalField(max_digits=8, decimal_places=2),
+        ),
+    )
+
+
+def effective_prices(product_ids):
+    """
+    {product_id: effective price} for the given products. Prices are cached
+    per product and keyed by the catalog versions, so editing a product, its
+    promotions or any promotion invalidates them. Uncached prices are loaded
+    with one query.
+    """
+    versions = catalog.product_versions(list(product_ids))
+    keys = {
+        f'pricing:product:{product_id}:{version}': product_id
+        for product_id, version in versions.items()
+    }
+    prices = {keys[key]: price for key, price in cache.get_many(keys).items()}
+
+    missing = [product_id for product_id in versions if product_id not in prices]
+    if missing:
+        with use_primary():
+            loaded = {
+                product_id: price.quantize(CENT)
+                for product_id, price in with_effective_prices(Product.objects.filter(pk__in=missing))
+                    .order_by()
+                    .values_list('pk', 'effective_price')
+            }
+        cache.set_many(
+            {f'pricing:product:{product_id}:{versions[product_id]}': price
+             for product_id, price in loaded.items()},
+            TIMEOUT,
+        )
+        prices.update(loaded)
+
+    return prices
+
+
+def effective_price(product):
+    return effective_prices([product.pk]).get(product.pk)
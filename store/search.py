@@ -0,0 +1,186 @@
+"""
+Product search over the ProductSearchTerm inverted index.
+
+Every distinct word of a product's title, description and tags is stored
+once per product with a weight for where it occurs. A query matches a
+product when each of its words is a prefix of one of the product's
+terms. Prefixes are looked up with the prefix lookup below, a range on
+the (term, product) index, so the cost depends on the number of matching
+terms, not on the size of the product table.
+
+prefix_search() applies the same lookup to plain name columns through
+Upper() expression indexes.
+"""
+import operator
+import re
+from functools import reduce
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import (
+    Case, CharField, F, IntegerField, Lookup, Max, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Upper
+from django.db.models.lookups import StartsWith
+from storeuz.caching import bump_model_versions
+from tags.models import TaggedItem
+from .models import Product, ProductSearchTerm
+
+BATCH_SIZE = 500
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = ProductSearchTerm._meta.get_field('term').max_length
+MAX_QUERY_TERMS = 8
+
+WEIGHTS = {
+    'title': 4,
+    'tags': 2,
+    'description': 1,
+}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text, min_length=MIN_TERM_LENGTH):
+    """Distinct lower case words of text, in order of appearance."""
+    words = (word[:MAX_TERM_LENGTH] for word in WORD_RE.findall(text.casefold()))
+    return list(dict.fromkeys(word for word in words if len(word) >= min_length))
+
+
+def product_terms(title, description, tags):
+    terms = {}
+    for field, text in [('title', title), ('description', description), ('tags', ' '.join(tags))]:
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + WEIGHTS[field]
+    return terms
+
+
+def index_products(product_ids, batch_size=BATCH_SIZE):
+    """
+    Rebuild the index rows of the given products. Ids of deleted products
+    are fine, their rows are removed by the cascade already.
+    """
+    product_ids = sorted(set(product_ids))
+    content_type = ContentType.objects.get_for_model(Product)
+    indexed = 0
+
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        tags = {product_id: [] for product_id in batch}
+        # Read directly instead of through the tag cache, which is
+        # invalidated by receivers that may run after this one.
+        for object_id, label in TaggedItem.objects \
+                .filter(content_type=content_type, object_id__in=batch) \
+                .values_list('object_id', 'tag__label'):
+            tags[object_id].append(label)
+
+        rows = [
+            ProductSearchTerm(term=term, product_id=product_id, weight=weight)
+            for product_id, title, description in Product.objects
+                .filter(pk__in=batch)
+                .values_list('pk', 'title', 'description')
+            for term, weight in product_terms(title, description, tags[product_id]).items()
+        ]
+        with transaction.atomic():
+            ProductSearchTerm.objects.filter(product_id__in=batch).delete()
+            ProductSearchTerm.objects.bulk_create(rows, batch_size=batch_size)
+            bump_model_versions(ProductSearchTerm)
+        indexed += len(batch)
+
+    return indexed
+
+
+@CharField.register_lookup
+class Prefix(StartsWith):
+    """
+    field__prefix=value, the rows where field starts with value, compared
+    in the column's collation.
+
+    MySQL turns LIKE 'value%' into a range scan of the index itself, in
+    the column's collation (plain LIKE, its startswith is LIKE BINARY and
+    cannot use the index). PostgreSQL only does that for a database in
+    the C collation or with an index using varchar_pattern_ops, which
+    this project does not create, so there the lookup is correct but
+    scans. SQLite only does it with case_sensitive_like on, so there the
+    range is written out, with the largest code point as upper bound,
+    which is exact under SQLite's default binary collation.
+    """
+    lookup_name = 'prefix'
+
+    def get_rhs_op(self, connection, rhs):
+        name = 'istartswith' if connection.vendor == 'mysql' else 'startswith'
+        if hasattr(self.rhs, 'as_sql') or self.bilateral_transforms:
+            return connection.pattern_ops[name].format(connection.pattern_esc).format(rhs)
+        return connection.operators[name] % rhs
+
+    def as_sqlite(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        # The value as is, without the LIKE escaping and wildcard.
+        rhs, rhs_params = Lookup.process_rhs(self, compiler, connection)
+        params = [*lhs_params, *rhs_params]
+        return f'({lhs} >= {rhs} AND {lhs} < ({rhs} || char(1114111)))', params * 2
+
+
+def prefix_filter(prefix):
+    return Q(term__prefix=prefix)
+
+
+def rank_products(query):
+    """
+    Values queryset of (product_id, score) for the products matching every
+    word of query, or None when query has no searchable words. Exact term
+    matches count double. Single letters are looked up as prefixes too,
+    the first keystroke of an autocomplete is served from the index.
+    """
+    words = tokenize(query, min_length=1)[:MAX_QUERY_TERMS]
+    if not words:
+        return None
+
+    prefixes = [prefix_filter(word) for word in words]
+    matched = reduce(operator.add, [
+        Max(Case(When(prefix, then=1), default=0, output_field=IntegerField()))
+        for prefix in prefixes
+    ])
+    exact = Sum(Case(When(term__in=words, then=F('weight')), default=0, output_field=IntegerField()))
+    return ProductSearchTerm.objects \
+        .filter(reduce(operator.or_, prefixes)) \
+        .values('product_id') \
+        .annotate(matched=matched, score=Sum('weight') + exact) \
+        .filter(matched=len(words)) \
+        .order_by()
+
+
+def filter_products(queryset, ranking):
+    return queryset.filter(pk__in=ranking.values('product_id'))
+
+
+def order_by_rank(queryset, ranking):
+    """queryset ordered by best match first, for callers that keep our ordering."""
+    score = ranking.filter(product_id=OuterRef('pk')).values('score')[:1]
+    return queryset.annotate(search_rank=Subquery(score)).order_by(F('search_rank').desc(nulls_last=True), 'pk')
+
+
+def prefix_search(queryset, fields, term):
+    """
+    Rows where every word of term starts one of fields, ignoring case.
+    Compares Upper(field) prefixes, which the Upper() expression indexes on
+    Customer and Collection serve, unlike istartswith on most backends.
+    The words are upper cased by the database too, SQLite's UPPER() leaves
+    non-ASCII letters alone where str.upper() would not.
+    """
+    aliases = {f'{field}_upper': Upper(field) for field in fields}
+    queryset = queryset.alias(**aliases)
+    for word in term.split()[:MAX_QUERY_TERMS]:
+        queryset = queryset.filter(reduce(operator.or_, [
+            Q(**{f'{alias}__prefix': Upper(Value(word))}) for alias in aliases
+        ]))
+    return queryset
+
+
+class PrefixSearchMixin:
+    """ModelAdmin mixin that serves its field__istartswith search_fields with prefix_search()."""
+
+    def get_search_results(self, request, queryset, search_term):
+        suffix = '__istartswith'
+        fields = [field[:-len(suffix)] for field in self.get_search_fields(request) if field.endswith(suffix)]
+        if not fields or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return prefix_search(queryset, fields, search_term), False
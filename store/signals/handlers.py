@@ -0,0 +1,223 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from store import catalog, search
+from store.models import Cart, CartItem, Collection, Customer, CustomerSummary, Order, OrderItem, Product, Promotion
+from tags.models import Tag, TaggedItem
+from tags.signals import objects_retagged
+
+
+def adjust_counter(model, pk, field, delta):
+    counters = model.objects.filter(pk=pk)
+    if delta < 0:
+        counters = counters.filter(**{f'{field}__gt': 0})
+    counters.update(**{field: F(field) + delta})
+
+
+def remember_previous(instance, field):
+    # Read by save() inside its transaction, see PreviousValuesMixin.
+    instance._previous = instance.previous_value(field)
+
+
+def touch_products(product_ids):
+    """
+    Bump last_update of products whose tags or promotions changed, it is
+    what the JSON API derives its ETag and Last-Modified from.
+    """
+    Product.objects.filter(pk__in=product_ids).update(last_update=timezone.now())
+    catalog.invalidate_products(product_ids)
+
+
+def promoted_product_ids(promotion):
+    # Evaluated first, MySQL cannot UPDATE a table it selects from in a subquery.
+    return list(promotion.product_set.values_list('pk', flat=True))
+
+
+def move_counter(instance, created, model, field, counter):
+    current = getattr(instance, field)
+    previous = None if created else getattr(instance, '_previous', current)
+    if previous == current:
+        return
+    if previous is not None:
+        adjust_counter(model, previous, counter, -1)
+    adjust_counter(model, current, counter, 1)
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_item_order(sender, instance, **kwargs):
+    remember_previous(instance, 'order_id')
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def refresh_order_totals(sender, instance, **kwargs):
+    # An item moved to another order changes the totals of both.
+    order_ids = {instance.order_id, getattr(instance, '_previous', None)} - {None}
+    Order.objects.refresh_totals(order_ids)
+    # Only completed orders count towards their customers' spend.
+    customer_ids = list(
+        Order.objects
+            .filter(pk__in=order_ids, payment_status=Order.PAYMENT_STATUS_COMPLETE)
+            .values_list('customer_id', flat=True)
+            .distinct()
+    )
+    if customer_ids:
+        CustomerSummary.objects.refresh(customer_ids)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_customer(sender, instance, **kwargs):
+    remember_previous(instance, 'customer_id')
+
+
+@receiver(post_save, sender=Order)
+def count_customer_orders(sender, instance, created, **kwargs):
+    move_counter(instance, created, Customer, 'customer_id', 'orders_count')
+
+
+@receiver(post_delete, sender=Order)
+def uncount_customer_order(sender, instance, **kwargs):
+    adjust_counter(Customer, instance.customer_id, 'orders_count', -1)
+
+
+@receiver(post_save, sender=Order)
+def refresh_customer_summary(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_previous', None)
+    # A new order changes last_order_at, otherwise only a different
+    # customer or payment status changes a summary.
+    status = instance.previous_value('payment_status')
+    if not created and previous == instance.customer_id and status == instance.payment_status:
+        return
+    CustomerSummary.objects.refresh({instance.customer_id, previous} - {None})
+
+
+@receiver(post_delete, sender=Order)
+def refresh_deleted_order_customer_summary(sender, instance, **kwargs):
+    CustomerSummary.objects.refresh([instance.customer_id])
+
+
+# No post_delete receiver, it would turn off the fast deletes of cart
+# items. store.carts touches the cart itself when it removes items.
+@receiver(post_save, sender=CartItem)
+def touch_cart(sender, instance, **kwargs):
+    Cart.objects.filter(pk=instance.cart_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_collection(sender, instance, **kwargs):
+    remember_previous(instance, 'collection_id')
+
+
+@receiver(post_save, sender=Product)
+def count_collection_products(sender, instance, created, **kwargs):
+    move_counter(instance, created, Collection, 'collection_id', 'products_count')
+
+
+@receiver(post_delete, sender=Product)
+def uncount_collection_product(sender, instance, **kwargs):
+    adjust_counter(Collection, instance.collection_id, 'products_count', -1)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_cached_product(sender, instance, **kwargs):
+    catalog.invalidate_product(instance.pk)
+    catalog.invalidate_collection_products(instance.collection_id)
+    previous = getattr(instance, '_previous', None)
+    if previous and previous != instance.collection_id:
+        catalog.invalidate_collection_products(previous)
+    featured_in = Collection.objects.filter(featured_product=instance.pk).values_list('pk', flat=True)
+    for collection_id in featured_in:
+        catalog.invalidate_collection(collection_id)
+
+
+@receiver([post_save, post_delete], sender=Collection)
+def invalidate_cached_collection(sender, instance, **kwargs):
+    catalog.invalidate_collection(instance.pk)
+    catalog.invalidate_collection_products(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Promotion)
+def invalidate_cached_promotions(sender, instance, **kwargs):
+    catalog.invalidate_promotions()
+
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def invalidate_cached_product_promotions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # promotion.product_set changed, possibly for many products at once.
+        catalog.invalidate_promotions()
+    else:
+        catalog.invalidate_product(instance.pk)
+        catalog.invalidate_collection_products(instance.collection_id)
+
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def touch_product_promotions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_products([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        touch_products(pk_set)
+    elif action == 'pre_clear':
+        touch_products(promoted_product_ids(instance))
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(pre_delete, sender=Promotion)
+def touch_promotion_products(sender, instance, **kwargs):
+    touch_products(promoted_product_ids(instance))
+
+
+@receiver([post_save, post_delete], sender=TaggedItem)
+def touch_tagged_product(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(Product).id:
+        touch_products([instance.object_id])
+
+
+def tagged_product_ids(tag):
+    return list(
+        TaggedItem.objects
+            .filter(tag=tag, content_type=ContentType.objects.get_for_model(Product))
+            .values_list('object_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_products(sender, instance, **kwargs):
+    touch_products(tagged_product_ids(instance))
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        search.index_products([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=TaggedItem)
+def index_tagged_product(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(Product).id:
+        search.index_products([instance.object_id])
+
+
+@receiver(objects_retagged, sender=Product)
+def reindex_retagged_products(sender, object_ids, **kwargs):
+    touch_products(object_ids)
+    search.index_products(object_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_products(sender, instance, **kwargs):
+    instance._tagged_product_ids = tagged_product_ids(instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def index_tag_products(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_tagged_product_ids', None)
+    if product_ids is None:
+        product_ids = tagged_product_ids(instance)
+    search.index_products(product_ids)
@@ -1,3 +1,721 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
+from django.apps import apps
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from . import api, carts, catalog, exports, inventory, pagination, pricing, search
+from .models import (Cart, CartItem, Collection, Customer, CustomerSummary, Order, OrderItem, Product,
+                     ProductSearchTerm, Promotion)
+from .signals.handlers import touch_products
 
-# Create your tests here.
+
+class PrefixLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        product = Product.objects.create(title='Lamp', slug='lamp', description='', unit_price=10,
+                                         inventory=1, collection=collection)
+        ProductSearchTerm.objects.filter(product=product).delete()
+        ProductSearchTerm.objects.bulk_create(
+            ProductSearchTerm(term=term, product=product, weight=1)
+            for term in ['liz', 'lizard', 'lizz', 'lj', 'x9', 'x99', 'y', 'zzz', '99', 'ab%c', 'ab_c', 'abxc', 'żółw']
+        )
+
+    def terms(self, prefix):
+        return sorted(ProductSearchTerm.objects.filter(search.prefix_filter(prefix)).values_list('term', flat=True))
+
+    def test_prefixes_ending_in_the_last_letter_or_digit(self):
+        self.assertEqual(self.terms('liz'), ['liz', 'lizard', 'lizz'])
+        self.assertEqual(self.terms('lizz'), ['lizz'])
+        self.assertEqual(self.terms('x9'), ['x9', 'x99'])
+        self.assertEqual(self.terms('zz'), ['zzz'])
+        self.assertEqual(self.terms('9'), ['99'])
+
+    def test_wildcards_match_literally(self):
+        self.assertEqual(self.terms('ab%'), ['ab%c'])
+        self.assertEqual(self.terms('ab_'), ['ab_c'])
+
+    def test_non_ascii_prefix(self):
+        self.assertEqual(self.terms('żó'), ['żółw'])
+
+    def sql(self):
+        return str(ProductSearchTerm.objects.filter(search.prefix_filter('liz')).query)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+    def test_sqlite_compares_a_range(self):
+        sql, params = ProductSearchTerm.objects.filter(search.prefix_filter('liz')).query.sql_with_params()
+        self.assertIn('char(1114111)', sql)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('USING INDEX', plan)
+
+    @skipUnless(connection.vendor == 'mysql', 'MySQL only')
+    def test_mysql_uses_like_in_the_column_collation(self):
+        self.assertIn('LIKE', self.sql())
+        self.assertNotIn('BINARY', self.sql())
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_postgresql_uses_like(self):
+        self.assertIn('LIKE', self.sql())
+
+
+class PrefixSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for index, (first_name, last_name) in enumerate([
+            ('Liz', 'Taylor'),
+            ('zoe', 'ångström'),
+            ('Émile', 'Zola'),
+        ]):
+            Customer.objects.create(first_name=first_name, last_name=last_name,
+                                    email=f'customer{index}@example.com', phone='1')
+
+    def search(self, term):
+        customers = search.prefix_search(Customer.objects.all(), ['first_name', 'last_name'], term)
+        return sorted(customers.values_list('last_name', flat=True))
+
+    def test_any_field_ignoring_case(self):
+        self.assertEqual(self.search('liz'), ['Taylor'])
+        self.assertEqual(self.search('ZO'), ['Zola', 'ångström'])
+        self.assertEqual(self.search('z'), ['Zola', 'ångström'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search('zo zol'), ['Zola'])
+        self.assertEqual(self.search('liz zola'), [])
+
+    def test_non_ascii_names(self):
+        self.assertEqual(self.search('ång'), ['ångström'])
+        self.assertEqual(self.search('Émi'), ['Zola'])
+
+    def test_admin_search(self):
+        model_admin = site._registry[Customer]
+        request = RequestFactory().get('/admin/store/customer/', {'q': 'ång'})
+        queryset, may_have_duplicates = model_admin.get_search_results(request, Customer.objects.all(), 'ång')
+        self.assertEqual([customer.last_name for customer in queryset], ['ångström'])
+        self.assertFalse(may_have_duplicates)
+
+
+class ProductSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        cls.lamp, cls.desk = [
+            Product.objects.create(title=title, slug='lamp', description='', unit_price=10,
+                                   inventory=1, collection=collection)
+            for title in ['Reading lamp', 'Oak desk']
+        ]
+
+    def search(self, query):
+        return sorted(search.rank_products(query).values_list('product_id', flat=True))
+
+    def test_every_word_is_a_prefix(self):
+        self.assertEqual(self.search('read la'), [self.lamp.pk])
+        self.assertEqual(self.search('desk lamp'), [])
+
+    def test_single_letters_use_the_index(self):
+        self.assertEqual(self.search('o'), [self.desk.pk])
+        self.assertEqual(self.search('L'), [self.lamp.pk])
+        self.assertIsNone(search.rank_products('%'))
+
+    def test_migration_indexes_the_products(self):
+        migration = import_module('store.migrations.0012_index_product_search_terms')
+        indexed = set(ProductSearchTerm.objects.values_list('product_id', 'term', 'weight'))
+        ProductSearchTerm.objects.all().delete()
+        migration.index_products(apps, None)
+        self.assertEqual(set(ProductSearchTerm.objects.values_list('product_id', 'term', 'weight')), indexed)
+
+
+class KeysetPaginationTests(TestCase):
+    ordering = ['first_name', 'last_name', 'id']
+
+    @classmethod
+    def setUpTestData(cls):
+        for index, (first_name, last_name) in enumerate([
+            ('Ann', 'Lee'), ('Ann', 'Lee'), ('Ann', 'Moss'), ('Bob', 'Adams'), ('Bob', 'Lee'), ('Cid', 'Ray'),
+        ]):
+            Customer.objects.create(first_name=first_name, last_name=last_name,
+                                    email=f'customer{index}@example.com', phone='1')
+
+    def rows(self, queryset):
+        return list(queryset.order_by(*self.ordering).values_list(*self.ordering))
+
+    def test_rows_after_the_cursor(self):
+        rows = self.rows(Customer.objects.all())
+        for index, row in enumerate(rows):
+            with self.subTest(row=row):
+                after = Customer.objects.filter(pagination.keyset_filter(self.ordering, row))
+                self.assertEqual(self.rows(after), rows[index + 1:])
+
+    def test_descending_fields(self):
+        ordering = ['-first_name', 'id']
+        rows = list(Customer.objects.order_by(*ordering).values_list('first_name', 'id'))
+        after = Customer.objects.filter(pagination.keyset_filter(ordering, rows[2])).order_by(*ordering)
+        self.assertEqual(list(after.values_list('first_name', 'id')), rows[3:])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+    def test_pages_are_read_from_the_index(self):
+        queryset = Customer.objects \
+            .filter(pagination.keyset_filter(self.ordering, ['Ann', 'Moss', 0])) \
+            .order_by(*self.ordering)[:10]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.collection = Collection.objects.create(title='Lamps')
+        cls.product = Product.objects.create(title='Lamp', slug='lamp', description='', unit_price=10,
+                                             inventory=1, collection=cls.collection)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_are_cached(self):
+        catalog.get_product(self.product.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog.get_product(self.product.pk).title, 'Lamp')
+
+    def test_versions_are_bumped_on_commit(self):
+        catalog.get_product(self.product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(title='Desk lamp')
+            Product.objects.get(pk=self.product.pk).save()
+            # A reader before the commit still gets the old version.
+            self.assertEqual(catalog.get_product(self.product.pk).title, 'Lamp')
+        self.assertEqual(catalog.get_product(self.product.pk).title, 'Desk lamp')
+
+    def test_renamed_collection_invalidates_its_products(self):
+        catalog.get_product(self.product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.collection.title = 'Lights'
+            self.collection.save()
+        self.assertEqual(catalog.get_product(self.product.pk).collection.title, 'Lights')
+
+    def test_touched_products_are_invalidated(self):
+        catalog.get_product(self.product.pk)
+        catalog.get_collection_products(self.collection.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            touch_products([self.product.pk])
+        last_update = Product.objects.get(pk=self.product.pk).last_update
+        self.assertEqual(catalog.get_product(self.product.pk).last_update, last_update)
+        self.assertEqual(catalog.get_collection_products(self.collection.pk)[0].last_update, last_update)
+
+
+class PricingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        cls.lamp, cls.shade = [
+            Product.objects.create(title=title, slug=title.lower(), description='', unit_price=unit_price,
+                                   inventory=1, collection=collection)
+            for title, unit_price in [('Lamp', '19.99'), ('Shade', 10)]
+        ]
+        cls.small = Promotion.objects.create(description='Small', discount=0.1)
+        cls.big = Promotion.objects.create(description='Big', discount=0.25)
+        cls.lamp.promotions.add(cls.small, cls.big)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_best_discount_applies(self):
+        products = pricing.with_effective_prices(Product.objects.order_by('pk'))
+        with self.assertNumQueries(1):
+            self.assertEqual([(product.best_discount, product.effective_price) for product in products],
+                             [(0.25, Decimal('14.99')), (0.0, Decimal('10.00'))])
+
+    def test_discounts_are_clamped(self):
+        self.shade.promotions.create(description='Broken', discount=1.5)
+        self.assertEqual(pricing.effective_price(self.shade), Decimal('0.00'))
+
+    def test_prices_are_cached(self):
+        ids = [self.lamp.pk, self.shade.pk]
+        expected = {self.lamp.pk: Decimal('14.99'), self.shade.pk: Decimal('10.00')}
+        self.assertEqual(pricing.effective_prices(ids), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(pricing.effective_prices(ids), expected)
+
+    def test_changed_promotion_invalidates_the_prices(self):
+        pricing.effective_prices([self.lamp.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.small.discount = 0.5
+            self.small.save()
+        self.assertEqual(pricing.effective_price(self.lamp), Decimal('10.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.small.delete()
+        self.assertEqual(pricing.effective_price(self.lamp), Decimal('14.99'))
+
+    def test_changed_product_promotions_invalidate_the_prices(self):
+        pricing.effective_prices([self.lamp.pk, self.shade.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.promotions.remove(self.big)
+            self.big.product_set.add(self.shade)
+        self.assertEqual(pricing.effective_prices([self.lamp.pk, self.shade.pk]),
+                         {self.lamp.pk: Decimal('17.99'), self.shade.pk: Decimal('7.50')})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.promotions.clear()
+        self.assertEqual(pricing.effective_price(self.lamp), Decimal('19.99'))
+
+
+class OrderTotalsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        cls.product = Product.objects.create(title='Lamp', slug='lamp', description='', unit_price=10,
+                                             inventory=100, collection=collection)
+        cls.customer = Customer.objects.create(first_name='Liz', last_name='Taylor',
+                                               email='liz@example.com', phone='1')
+
+    def add_item(self, order, quantity, unit_price=10):
+        return OrderItem.objects.create(order=order, product=self.product, quantity=quantity, unit_price=unit_price)
+
+    def test_items_refresh_the_totals(self):
+        order = Order.objects.create(customer=self.customer)
+        item = self.add_item(order, 2)
+        self.add_item(order, 1, unit_price=5)
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (25, 3))
+
+        item.quantity = 4
+        item.unit_price = 2
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (13, 5))
+
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count), (5, 1))
+
+    def test_refresh_totals_repairs_drifted_orders(self):
+        order = Order.objects.create(customer=self.customer)
+        empty = Order.objects.create(customer=self.customer)
+        self.add_item(order, 2)
+        Order.objects.filter(pk__in=[order.pk, empty.pk]).update(total=99, item_count=9)
+
+        self.assertEqual(Order.objects.refresh_totals([order.pk, empty.pk]), 2)
+        self.assertEqual(
+            list(Order.objects.filter(pk__in=[order.pk, empty.pk]).order_by('pk').values_list('total', 'item_count')),
+            [(20, 2), (0, 0)],
+        )
+
+    def test_saving_a_stale_order_keeps_the_totals(self):
+        order = Order.objects.create(customer=self.customer)
+        self.add_item(order, 2)
+        order.payment_status = Order.PAYMENT_STATUS_COMPLETE
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual((order.total, order.item_count, order.payment_status),
+                         (20, 2, Order.PAYMENT_STATUS_COMPLETE))
+
+    def test_moving_an_item_refreshes_both_orders(self):
+        source = Order.objects.create(customer=self.customer)
+        target = Order.objects.create(customer=self.customer)
+        item = self.add_item(source, 2)
+        item = OrderItem.objects.get(pk=item.pk)
+        item.order = target
+        item.save()
+        source.refresh_from_db()
+        target.refresh_from_db()
+        self.assertEqual((source.total, source.item_count), (0, 0))
+        self.assertEqual((target.total, target.item_count), (20, 2))
+
+
+@override_settings(MEMBERSHIP_SILVER_SPEND=100, MEMBERSHIP_GOLD_SPEND=200)
+class CustomerSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        cls.product = Product.objects.create(title='Lamp', slug='lamp', description='', unit_price=10,
+                                             inventory=100, collection=collection)
+        cls.customer = Customer.objects.create(first_name='Liz', last_name='Taylor',
+                                               email='liz@example.com', phone='1')
+
+    def add_item(self, order, quantity):
+        return OrderItem.objects.create(order=order, product=self.product, quantity=quantity, unit_price=10)
+
+    def summary(self):
+        summary = CustomerSummary.objects.get(pk=self.customer.pk)
+        return summary.lifetime_value, summary.completed_orders, summary.eligible_membership
+
+    def test_summary_counts_completed_orders(self):
+        order = Order.objects.create(customer=self.customer)
+        self.add_item(order, 12)
+        self.assertEqual(self.summary(), (0, 0, Customer.MEMBERSHIP_BRONZE))
+
+        order.payment_status = Order.PAYMENT_STATUS_COMPLETE
+        order.save()
+        self.assertEqual(self.summary(), (120, 1, Customer.MEMBERSHIP_SILVER))
+
+        self.add_item(order, 10)
+        self.assertEqual(self.summary(), (220, 1, Customer.MEMBERSHIP_GOLD))
+
+    def test_unrelated_saves_do_not_refresh_the_summary(self):
+        order = Order.objects.create(customer=self.customer)
+        with mock.patch.object(CustomerSummary.objects, 'refresh') as refresh:
+            self.add_item(order, 1)
+            order = Order.objects.get(pk=order.pk)
+            order.save()
+        refresh.assert_not_called()
+
+    def test_memberships_only_move_up(self):
+        gold = Customer.objects.create(first_name='Ann', last_name='Lee', email='ann@example.com',
+                                       phone='2', membership=Customer.MEMBERSHIP_GOLD)
+        for customer in [self.customer, gold]:
+            order = Order.objects.create(customer=customer, payment_status=Order.PAYMENT_STATUS_COMPLETE)
+            self.add_item(order, 15)
+
+        call_command('refresh_customer_summaries', stdout=StringIO())
+        self.assertEqual(Customer.objects.get(pk=self.customer.pk).membership, Customer.MEMBERSHIP_SILVER)
+        self.assertEqual(Customer.objects.get(pk=gold.pk).membership, Customer.MEMBERSHIP_GOLD)
+
+
+class CounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lamps = Collection.objects.create(title='Lamps')
+        cls.desks = Collection.objects.create(title='Desks')
+        cls.customer = Customer.objects.create(first_name='Liz', last_name='Taylor',
+                                               email='liz@example.com', phone='1')
+
+    def create_product(self, collection):
+        return Product.objects.create(title='Lamp', slug='lamp', description='', unit_price=10,
+                                      inventory=1, collection=collection)
+
+    def counts(self):
+        return dict(Collection.objects.values_list('title', 'products_count'))
+
+    def test_products_count_follows_the_products(self):
+        product = self.create_product(self.lamps)
+        self.create_product(self.lamps)
+        self.assertEqual(self.counts(), {'Lamps': 2, 'Desks': 0})
+
+        product = Product.objects.get(pk=product.pk)
+        product.collection = self.desks
+        product.save()
+        self.assertEqual(self.counts(), {'Lamps': 1, 'Desks': 1})
+
+        product.delete()
+        self.assertEqual(self.counts(), {'Lamps': 1, 'Desks': 0})
+
+    def test_saving_a_stale_instance_keeps_the_counters(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        collection = Collection.objects.get(pk=self.lamps.pk)
+        Order.objects.create(customer=self.customer)
+        self.create_product(self.lamps)
+
+        customer.membership = Customer.MEMBERSHIP_GOLD
+        customer.save()
+        collection.title = 'Lights'
+        collection.save()
+        self.assertEqual(Customer.objects.get(pk=self.customer.pk).orders_count, 1)
+        self.assertEqual(Collection.objects.get(pk=self.lamps.pk).products_count, 1)
+
+    def test_stale_instances_move_the_right_counters(self):
+        product = self.create_product(self.lamps)
+        stale = Product.objects.get(pk=product.pk)
+        Product.objects.filter(pk=product.pk).update(collection=self.desks)
+        Collection.objects.filter(pk=self.lamps.pk).update(products_count=0)
+        Collection.objects.filter(pk=self.desks.pk).update(products_count=1)
+
+        # Saved back into Lamps, although it was loaded before the move.
+        stale.title = 'Desk lamp'
+        stale.save()
+        self.assertEqual(self.counts(), {'Lamps': 1, 'Desks': 0})
+
+        Product.objects.filter(pk=product.pk).update(collection=self.desks)
+        Collection.objects.filter(pk=self.lamps.pk).update(products_count=0)
+        Collection.objects.filter(pk=self.desks.pk).update(products_count=1)
+        stale.delete()
+        self.assertEqual(self.counts(), {'Lamps': 0, 'Desks': 0})
+
+    def test_order_built_with_a_pk(self):
+        other = Customer.objects.create(first_name='Ann', last_name='Lee', email='ann@example.com', phone='2')
+        order = Order.objects.create(customer=self.customer)
+        Order(id=order.pk, customer=other, placed_at=order.placed_at).save()
+        self.assertEqual(dict(Customer.objects.values_list('last_name', 'orders_count')), {'Taylor': 0, 'Lee': 1})
+
+
+class InventoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.collection = Collection.objects.create(title='Lamps')
+        cls.products = [
+            Product.objects.create(title=f'Lamp {index}', slug='lamp', description='', unit_price=10,
+                                   inventory=5, collection=cls.collection)
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def levels(self):
+        return list(Product.objects.order_by('pk').values_list('inventory', flat=True))
+
+    def test_deltas_in_batches(self):
+        first, second, third = self.products
+        updated = inventory.apply_inventory_deltas({first.pk: 2, second.pk: -3, third.pk: 0}, batch_size=2)
+        self.assertEqual(updated, 3)
+        self.assertEqual(self.levels(), [7, 2, 5])
+
+    def test_deltas_stop_at_zero(self):
+        inventory.apply_inventory_deltas({self.products[0].pk: -10})
+        inventory.adjust_inventory(Product.objects.filter(pk=self.products[1].pk), -6)
+        self.assertEqual(self.levels(), [0, 0, 5])
+
+    def test_negative_levels_are_rejected(self):
+        with self.assertRaises(ValueError):
+            inventory.set_inventory_levels({self.products[0].pk: -1})
+        inventory.set_inventory_levels({self.products[0].pk: 9})
+        self.assertEqual(self.levels(), [9, 5, 5])
+
+    def test_cached_product_and_listing_are_invalidated(self):
+        product = self.products[0]
+        catalog.get_product(product.pk)
+        catalog.get_collection_products(self.collection.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.apply_inventory_deltas({product.pk: 1})
+        self.assertEqual(catalog.get_product(product.pk).inventory, 6)
+        listed = {item.pk: item.inventory for item in catalog.get_collection_products(self.collection.pk)}
+        self.assertEqual(listed[product.pk], 6)
+
+    def test_clear_inventory_action(self):
+        first, second, _ = self.products
+        catalog.get_product(first.pk)
+        model_admin = site._registry[Product]
+        request = RequestFactory().post('/admin/store/product/')
+        with mock.patch.object(model_admin, 'message_user') as message_user, \
+                self.captureOnCommitCallbacks(execute=True):
+            model_admin.clear_inventory(request, Product.objects.filter(pk__in=[first.pk, second.pk]))
+        message_user.assert_called_once_with(request, '2 products were successfully updated.')
+        self.assertEqual(self.levels(), [0, 0, 5])
+        self.assertEqual(catalog.get_product(first.pk).inventory, 0)
+
+    def test_read_inventory_rows(self):
+        rows = ['product_id,delta', '1,2', '2,-1', '1,3']
+        self.assertEqual(inventory.read_inventory_rows(rows, 'csv'), {1: 5, 2: -1})
+        with self.assertRaises(ValueError):
+            inventory.read_inventory_rows(['product_id,delta', '1,x'], 'csv')
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        cls.lamp = Product.objects.create(title='Lamp', slug='lamp', description='', unit_price=10,
+                                          inventory=100, collection=collection)
+        cls.customer = Customer.objects.create(first_name='Liz', last_name='Taylor',
+                                               email='liz@example.com', phone='1')
+        cls.order = Order.objects.create(customer=cls.customer)
+        OrderItem.objects.create(order=cls.order, product=cls.lamp, quantity=2, unit_price=10)
+        OrderItem.objects.create(order=cls.order, product=cls.lamp, quantity=1, unit_price='7.50')
+        cls.empty = Order.objects.create(customer=cls.customer)
+
+    def test_order_rows_in_chunks(self):
+        # Orders and their items per chunk, and the empty chunk at the end.
+        with self.assertNumQueries(5):
+            rows = list(exports.order_rows(Order.objects.all(), chunk_size=1))
+        self.assertEqual([(row[0], row[9:]) for row in rows], [
+            (self.order.pk, ['Lamp', 2, Decimal('10.00')]),
+            (self.order.pk, ['Lamp', 1, Decimal('7.50')]),
+            (self.empty.pk, [None, None, None]),
+        ])
+
+    def test_csv(self):
+        lines = list(exports.export_lines(Customer.objects.all(), 'csv'))
+        self.assertEqual(lines[0], ','.join(exports.CUSTOMER_COLUMNS) + '\r\n')
+        self.assertEqual(lines[1], f'{self.customer.pk},Liz,Taylor,liz@example.com,1,,B,2\r\n')
+
+    def test_jsonl(self):
+        lines = list(exports.export_lines(Order.objects.filter(pk=self.empty.pk), 'jsonl'))
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual((row['order_id'], row['customer_email'], row['product_id']),
+                         (self.empty.pk, 'liz@example.com', None))
+
+    def test_streaming_response(self):
+        response = exports.streaming_export_response(Order.objects.all(), 'jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders.jsonl"')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+
+    def test_command(self):
+        stdout = StringIO()
+        with mock.patch('sys.stdout', stdout):
+            call_command('export_store', 'orders', '--chunk-size', '1')
+        self.assertEqual(len(stdout.getvalue().splitlines()), 4)
+
+
+class SeedStoreTests(TestCase):
+
+    # The benchmark client requests localhost, which DEBUG allows outside of tests.
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_seed_and_benchmark(self):
+        call_command('seed_store', '--products', '20', '--customers', '5', '--orders', '10', '--users', '3',
+                     stdout=StringIO())
+        self.assertEqual((Product.objects.count(), Customer.objects.count(), Order.objects.count()), (20, 5, 10))
+        # The denormalized data bulk_create skipped is backfilled.
+        order = Order.objects.filter(item_count__gt=0).first()
+        self.assertEqual(order.item_count, sum(item.quantity for item in order.orderitem_set.all()))
+        self.assertEqual(sum(Customer.objects.values_list('orders_count', flat=True)), 10)
+        self.assertFalse(Product.objects.filter(search_terms__isnull=True).exists())
+
+        stdout = StringIO()
+        call_command('benchmark_store', '--repeat', '1', '--label', 'seeded', stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual((report['label'], report['rows']['store.Product']), ('seeded', 20))
+        self.assertEqual(len(report['results']), 11)
+        self.assertEqual(report['results']['tags.get_tags_for_many.warm']['queries'], 0)
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.collection = Collection.objects.create(title='Lamps')
+        cls.products = [
+            Product.objects.create(title=f'Lamp {index}', slug='lamp', description='', unit_price=10,
+                                   inventory=1, collection=cls.collection)
+            for index in range(5)
+        ]
+
+    def test_parse_int(self):
+        self.assertEqual(api.parse_int('', 'limit', 50), 50)
+        self.assertEqual(api.parse_int('7', 'limit', 50, 1, 100), 7)
+        for value, kwargs, message in [
+            ('x', {}, 'after must be an integer.'),
+            ('-1', {}, 'after must be at least 0.'),
+            ('0', {'minimum': 1, 'maximum': 100}, 'after must be between 1 and 100.'),
+            ('101', {'minimum': 1, 'maximum': 100}, 'after must be between 1 and 100.'),
+        ]:
+            with self.subTest(value=value, kwargs=kwargs):
+                with self.assertRaisesMessage(api.InvalidParameter, message):
+                    api.parse_int(value, 'after', **kwargs)
+
+    def test_parse_fields(self):
+        self.assertEqual(api.parse_fields('title, id', api.PRODUCT_FIELDS), ['id', 'title'])
+        self.assertEqual(api.parse_fields('', api.COLLECTION_FIELDS), api.COLLECTION_FIELDS)
+        with self.assertRaisesMessage(api.InvalidParameter, 'Unknown fields: nope.'):
+            api.parse_fields('id,nope', api.PRODUCT_FIELDS)
+
+    def test_invalid_parameters_are_bad_requests(self):
+        for query in [{'limit': '0'}, {'limit': '501'}, {'after': '-1'}, {'fields': 'nope'}]:
+            with self.subTest(query=query):
+                response = self.client.get('/store/api/products/', query)
+                self.assertEqual(response.status_code, 400)
+
+    def test_keyset_pages(self):
+        ids = []
+        url = '/store/api/products/?limit=2&fields=id,title'
+        while url:
+            data = self.client.get(url).json()
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(ids, [product.pk for product in self.products])
+
+    def test_unchanged_page_is_not_modified(self):
+        response = self.client.get('/store/api/products/')
+        response = self.client.get('/store/api/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_product(self):
+        product = self.products[0]
+        response = self.client.get(f'/store/api/products/{product.pk}/', {'fields': 'id,collection'})
+        self.assertEqual(response.json(), {'id': product.pk, 'collection': self.collection.pk})
+        self.assertEqual(self.client.get('/store/api/products/0/').status_code, 404)
+
+    def test_product_deleted_while_building_the_response(self):
+        with mock.patch.object(api, 'product_rows', return_value=[]):
+            response = self.client.get(f'/store/api/products/{self.products[0].pk}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class CartTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        cls.first, cls.second = [
+            Product.objects.create(title=f'Lamp {index}', slug='lamp', description='', unit_price=10,
+                                   inventory=1, collection=collection)
+            for index in range(2)
+        ]
+
+    def items(self, cart):
+        return dict(CartItem.objects.filter(cart=cart).values_list('product_id', 'quantity'))
+
+    def test_add_items(self):
+        cart = Cart.objects.create()
+        carts.add_items(cart.pk, {self.first.pk: 1})
+        carts.add_items(cart.pk, {self.first.pk: 2, self.second.pk: 1})
+        self.assertEqual(self.items(cart), {self.first.pk: 3, self.second.pk: 1})
+        with self.assertRaises(ValueError):
+            carts.add_items(cart.pk, {self.first.pk: 0})
+        with self.assertRaises(Cart.DoesNotExist):
+            carts.add_items(0, {self.first.pk: 1})
+
+    def test_merge_carts(self):
+        target, source, other = Cart.objects.create(), Cart.objects.create(), Cart.objects.create()
+        carts.add_items(target.pk, {self.first.pk: 1})
+        carts.add_items(source.pk, {self.first.pk: 2, self.second.pk: 1})
+        carts.add_items(other.pk, {self.second.pk: 4})
+        carts.merge_carts(target.pk, [source.pk, other.pk, target.pk])
+        self.assertEqual(self.items(target), {self.first.pk: 3, self.second.pk: 5})
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [target.pk])
+
+    def test_quantities_are_capped(self):
+        target, source = Cart.objects.create(), Cart.objects.create()
+        carts.add_items(target.pk, {self.first.pk: 30000})
+        carts.add_items(source.pk, {self.first.pk: 30000, self.second.pk: 30000})
+        carts.add_items(source.pk, {self.second.pk: 30000})
+        carts.merge_carts(target.pk, [source.pk])
+        self.assertEqual(self.items(target), {self.first.pk: carts.MAX_QUANTITY, self.second.pk: carts.MAX_QUANTITY})
+
+    def test_purge_carts_by_last_activity(self):
+        long_ago = timezone.now() - timedelta(days=60)
+        idle, busy = Cart.objects.create(), Cart.objects.create()
+        carts.add_items(idle.pk, {self.first.pk: 1})
+        carts.add_items(busy.pk, {self.first.pk: 1})
+        Cart.objects.update(created_at=long_ago, updated_at=long_ago)
+        carts.add_items(busy.pk, {self.second.pk: 1})
+
+        deleted = sum(carts.purge_carts(timezone.now() - timedelta(days=30), batch_size=1))
+        self.assertEqual(deleted, 1)
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [busy.pk])
+        self.assertFalse(CartItem.objects.filter(cart=idle.pk).exists())
+
+    def test_item_changes_touch_the_cart(self):
+        long_ago = timezone.now() - timedelta(days=60)
+        cart = Cart.objects.create()
+        carts.add_items(cart.pk, {self.first.pk: 1, self.second.pk: 1})
+        for change in [
+            lambda: CartItem.objects.filter(cart=cart, product=self.first).get().save(),
+            lambda: carts.remove_items(cart.pk, [self.second.pk]),
+        ]:
+            Cart.objects.update(updated_at=long_ago)
+            change()
+            self.assertGreater(Cart.objects.get(pk=cart.pk).updated_at, long_ago)
@@ -0,0 +1,13 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('catalog/cache-stats/', views.catalog_cache_stats, name='catalog_cache_stats'),
+    path('catalog/products/<int:pk>/', views.product_detail, name='catalog_product'),
+    path('catalog/collections/<int:pk>/products/', views.collection_products,
+         name='catalog_collection_products'),
+    path('api/products/', views.api_products, name='api_products'),
+    path('api/products/<int:pk>/', views.api_product, name='api_product'),
+    path('api/collections/', views.api_collections, name='api_collections'),
+    path('api/collections/<int:pk>/', views.api_collection, name='api_collection'),
+]
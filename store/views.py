@@ -1,3 +1,143 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.http import require_safe
+from storeuz.async_db import db_sync_to_async
+from . import api, catalog
+from .models import Collection, Product
+from .pricing import effective_prices
 
-# Create your views here.
+
+@staff_member_required
+def catalog_cache_stats(request):
+    return JsonResponse(catalog.stats.snapshot())
+
+
+def product_to_dict(product, price):
+    return {
+        'id': product.id,
+        'title': product.title,
+        'slug': product.slug,
+        'description': product.description,
+        'unit_price': product.unit_price,
+        'effective_price': price,
+        'inventory': product.inventory,
+        'last_update': product.last_update,
+        'collection': {'id': product.collection.id, 'title': product.collection.title},
+        'promotions': [
+            {'id': promotion.id, 'description': promotion.description, 'discount': promotion.discount}
+            for promotion in product.promotions.all()
+        ],
+    }
+
+
+@db_sync_to_async
+def _load_product(pk):
+    product = catalog.get_product(pk)
+    if product is None:
+        return None
+    return product_to_dict(product, effective_prices([pk]).get(pk))
+
+
+@db_sync_to_async
+def _load_collection_products(pk):
+    collection = catalog.get_collection(pk)
+    if collection is None:
+        return None
+    products = catalog.get_collection_products(pk)
+    prices = effective_prices([product.pk for product in products])
+    return {
+        'id': collection.id,
+        'title': collection.title,
+        'products': [product_to_dict(product, prices.get(product.pk)) for product in products],
+    }
+
+
+async def product_detail(request, pk):
+    data = await _load_product(pk)
+    if data is None:
+        raise Http404('No product matches the given query.')
+    return JsonResponse(data)
+
+
+async def collection_products(request, pk):
+    data = await _load_collection_products(pk)
+    if data is None:
+        raise Http404('No collection matches the given query.')
+    return JsonResponse(data)
+
+
+def api_view(view):
+    """GET/HEAD only, with api.InvalidParameter answered as 400."""
+    @require_safe
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except api.InvalidParameter as error:
+            return HttpResponseBadRequest(str(error))
+    return wrapper
+
+
+@api_view
+def api_products(request):
+    fields = api.parse_fields(request.GET.get('fields'), api.PRODUCT_FIELDS, api.PRODUCT_DEFAULT_FIELDS)
+    after = api.parse_int(request.GET.get('after'), 'after')
+    limit = api.parse_int(request.GET.get('limit'), 'limit', api.DEFAULT_LIMIT, 1, api.MAX_LIMIT)
+    collection_id = api.parse_int(request.GET.get('collection'), 'collection')
+
+    products = Product.objects.all()
+    if collection_id is not None:
+        products = products.filter(collection_id=collection_id)
+    page, etag, last_modified = api.page_validators(products, after, limit)
+    product_ids = [pk for pk, _ in page]
+
+    return api.conditional_json_response(
+        request, api.make_etag(fields, etag), last_modified,
+        lambda: {
+            'results': api.product_rows(product_ids, fields),
+            'next': api.next_url(request, product_ids[-1]) if len(page) == limit else None,
+        },
+    )
+
+
+@api_view
+def api_product(request, pk):
+    fields = api.parse_fields(request.GET.get('fields'), api.PRODUCT_FIELDS, api.PRODUCT_DEFAULT_FIELDS)
+    last_update = Product.objects.filter(pk=pk).values_list('last_update', flat=True).first()
+    if last_update is None:
+        raise Http404('No product matches the given query.')
+
+    def build():
+        rows = api.product_rows([pk], fields)
+        if not rows:
+            # Deleted since the validator query.
+            raise Http404('No product matches the given query.')
+        return rows[0]
+
+    return api.conditional_json_response(request, api.make_etag(fields, pk, last_update), last_update, build)
+
+
+@api_view
+def api_collections(request):
+    fields = api.parse_fields(request.GET.get('fields'), api.COLLECTION_FIELDS)
+    after = api.parse_int(request.GET.get('after'), 'after')
+    limit = api.parse_int(request.GET.get('limit'), 'limit', api.DEFAULT_LIMIT, 1, api.MAX_LIMIT)
+
+    collections = Collection.objects.order_by('pk')
+    if after is not None:
+        collections = collections.filter(pk__gt=after)
+    # Collections have no modification time, the few narrow rows are the validator.
+    rows, last_id = api.collection_rows(collections[:limit], fields)
+    data = {
+        'results': rows,
+        'next': api.next_url(request, last_id) if len(rows) == limit else None,
+    }
+    return api.conditional_json_response(request, api.make_etag(data), None, lambda: data)
+
+
+@api_view
+def api_collection(request, pk):
+    fields = api.parse_fields(request.GET.get('fields'), api.COLLECTION_FIELDS)
+    rows, _ = api.collection_rows(Collection.objects.filter(pk=pk), fields)
+    if not rows:
+        raise Http404('No collection matches the given query.')
+    return api.conditional_json_response(request, api.make_etag(rows), None, lambda: rows[0])
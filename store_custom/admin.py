@@ -1,8 +1,16 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.template.response import TemplateResponse
 from store.admin import ProductAdmin
 from store.models import Product
+from tags.bulk import tag_objects, untag_objects
 from tags.models import TaggedItem
+from likes.models import LikeCounter
 from django.contrib.contenttypes.admin import GenericTabularInline
+from .forms import BulkTagForm
 
 
 class TagItemInline(GenericTabularInline):
@@ -12,6 +20,50 @@ class TagItemInline(GenericTabularInline):
 
 class CustomProductAdmin(ProductAdmin):
     inlines = [TagItemInline]
+    list_display = ProductAdmin.list_display + ['likes_count']
+    actions = ProductAdmin.actions + ['add_tag', 'remove_tag']
+
+    @admin.display(ordering='likes_count')
+    def likes_count(self, product):
+        return product.likes_count
+
+    def get_queryset(self, request):
+        likes = LikeCounter.objects.filter(
+            content_type=ContentType.objects.get_for_model(Product),
+            object_id=OuterRef('pk'),
+        )
+        return super().get_queryset(request).annotate(
+            likes_count=Coalesce(Subquery(likes.values('count')[:1]), 0)
+        )
+
+    @admin.action(description='Add tag')
+    def add_tag(self, request, queryset):
+        return self.bulk_tag(request, queryset, 'add_tag', 'Add tag', tag_objects, 'tagged')
+
+    @admin.action(description='Remove tag')
+    def remove_tag(self, request, queryset):
+        return self.bulk_tag(request, queryset, 'remove_tag', 'Remove tag', untag_objects, 'untagged')
+
+    def bulk_tag(self, request, queryset, action, title, apply, verb):
+        form = BulkTagForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            tag = form.cleaned_data['tag']
+            count = apply(queryset, tag)
+            self.message_user(request, f'{count} products were {verb} "{tag}".')
+            return None
+
+        # Same form page as adjust_inventory, with a tag to pick instead.
+        return TemplateResponse(request, 'admin/store/product/adjust_inventory.html', {
+            **self.admin_site.each_context(request),
+            'title': title,
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            'action': action,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        })
 
 admin.site.unregister(Product)
 admin.site.register(Product, CustomProductAdmin)
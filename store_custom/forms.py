@@ -0,0 +1,6 @@
+from django import forms
+from tags.models import Tag
+
+
+class BulkTagForm(forms.Form):
+    tag = forms.ModelChoiceField(queryset=Tag.objects.order_by('label'))
@@ -0,0 +1,39 @@
+"""
+Database access from async views.
+
+Django 4.0 has no async ORM, so async views hand their queries to a
+dedicated thread pool. The pool size caps how many requests of one ASGI
+process can wait on the database at once, and with it the number of
+connections the process opens, independently of how many requests are
+in flight on the event loop.
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from .metrics import record_queries
+
+DB_THREADS = getattr(settings, 'ASYNC_DB_THREADS', 16)
+
+executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='async-db')
+
+
+def db_sync_to_async(func):
+    """
+    Like sync_to_async(), but runs func in the database thread pool instead
+    of the single thread Django uses for thread sensitive code. The pool
+    threads never see request_started or request_finished, so connections
+    past CONN_MAX_AGE or in an unusable state are closed around every call.
+    Queries count towards the calling request's metrics.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            with record_queries():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=executor)
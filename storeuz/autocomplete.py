@@ -0,0 +1,66 @@
+import hashlib
+from django.conf import settings
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse
+
+CACHE_TIMEOUT = getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 30)
+CACHE_MAX_TERM_LENGTH = getattr(settings, 'AUTOCOMPLETE_CACHE_MAX_TERM_LENGTH', 3)
+
+
+class FastAutocompleteJsonView(AutocompleteJsonView):
+    """
+    The admin's autocomplete view for ModelAdmins that set
+    autocomplete_text_fields. Only the id and those fields are read, joined
+    by spaces as the option text, one extra row is fetched instead of
+    counting the matches, and pages for short terms are cached for
+    AUTOCOMPLETE_CACHE_TIMEOUT seconds. Other ModelAdmins get the stock view.
+    """
+
+    def get(self, request, *args, **kwargs):
+        (
+            self.term,
+            self.model_admin,
+            self.source_field,
+            to_field_name,
+        ) = self.process_request(request)
+
+        if not self.has_perm(request):
+            raise PermissionDenied
+
+        text_fields = getattr(self.model_admin, 'autocomplete_text_fields', None)
+        if not text_fields:
+            return super().get(request, *args, **kwargs)
+
+        try:
+            page = int(request.GET.get('page', 1))
+        except ValueError:
+            raise Http404('Invalid page.')
+        if page < 1:
+            raise Http404('Invalid page.')
+
+        cache_key = None
+        if len(self.term) <= CACHE_MAX_TERM_LENGTH:
+            term = hashlib.md5(self.term.casefold().encode()).hexdigest()
+            opts = self.source_field.model._meta
+            cache_key = f'autocomplete:{opts.label_lower}:{self.source_field.name}:{page}:{term}'
+            data = cache.get(cache_key)
+            if data is not None:
+                return JsonResponse(data)
+
+        start = (page - 1) * self.paginate_by
+        rows = list(
+            self.get_queryset()
+                .values_list(to_field_name, *text_fields)[start:start + self.paginate_by + 1]
+        )
+        data = {
+            'results': [
+                {'id': str(row[0]), 'text': ' '.join(str(value) for value in row[1:])}
+                for row in rows[:self.paginate_by]
+            ],
+            'pagination': {'more': len(rows) > self.paginate_by},
+        }
+        if cache_key:
+            cache.set(cache_key, data, CACHE_TIMEOUT)
+        return JsonResponse(data)
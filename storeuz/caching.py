@@ -0,0 +1,175 @@
+"""
+Response and fragment caching keyed by model versions.
+
+Every model of VERSIONED_MODELS has a version number in the cache,
+bumped by the receivers connected in connect_receivers() once a save or
+delete of one of its rows commits. Cached views and template fragments
+include the versions of the models they are built from, so a write
+invalidates them without anybody having to know which keys to delete.
+Bulk operations skip the signals and call bump_model_versions()
+themselves, and BULK_VERSIONED_MODELS, which are deleted in bulk, get no
+post_delete receiver, which would turn off Django's fast delete for them.
+
+@cache_view(Product, Tag, timeout=60, stale=300) caches whole GET
+responses. Once an entry is out of date, because timeout passed or a
+version changed, it is served for up to `stale` more seconds while a
+single request renders it again, so a popular page keeps being served
+from the cache only. Fragments use the {% cache %} tag, varied on
+model_version() passed in by the view.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import Counter
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from .routers import use_primary
+
+VERSIONED_MODELS = getattr(settings, 'VERSIONED_MODELS', [])
+BULK_VERSIONED_MODELS = getattr(settings, 'BULK_VERSIONED_MODELS', [])
+TIMEOUT = getattr(settings, 'VIEW_CACHE_TIMEOUT', 60)
+STALE_TIMEOUT = getattr(settings, 'VIEW_CACHE_STALE_TIMEOUT', 300)
+LOCK_TIMEOUT = 30
+
+
+class CacheStats:
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts.get('hits', 0) + counts.get('misses', 0)
+        counts['hit_ratio'] = round(counts.get('hits', 0) / lookups, 4) if lookups else None
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+def _version_key(model):
+    return f'model-version:{model._meta.label_lower}'
+
+
+def model_version(*models):
+    """Combined version of models, changes whenever a row of any of them does."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock, see store.catalog._versions().
+            cache.add(key, time.time_ns() // 1000, None)
+            versions[key] = cache.get(key)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def _bump(models):
+    for model in models:
+        key = _version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns() // 1000, None)
+
+
+def bump_model_versions(*models, using=None):
+    """
+    Bump the versions once the current transaction commits, so that no
+    reader can cache rows it still sees from before the write under the
+    new version.
+    """
+    transaction.on_commit(lambda: _bump(models), using=using)
+
+
+def bump_saved_model_version(sender, using, **kwargs):
+    bump_model_versions(sender, using=using)
+
+
+def bump_related_model_versions(sender, instance, action, model, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_model_versions(sender, type(instance), model, using=using)
+
+
+def connect_receivers():
+    """Connect the version receivers to the versioned models, once the apps are loaded."""
+    for label in [*VERSIONED_MODELS, *BULK_VERSIONED_MODELS]:
+        model = apps.get_model(label)
+        post_save.connect(bump_saved_model_version, sender=model)
+        if label in VERSIONED_MODELS:
+            post_delete.connect(bump_saved_model_version, sender=model)
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(bump_related_model_versions, sender=field.remote_field.through)
+
+
+def _store(request, key, version, timeout, stale, response):
+    # Pages that set cookies or carry a CSRF token belong to one client.
+    if (response.status_code == 200 and not response.streaming and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')):
+        cache.set(key, (version, time.time() + timeout, response), timeout + stale)
+        stats.incr('stores')
+    return response
+
+
+def _render(view, request, args, kwargs, key, version, timeout, stale):
+    # A replica may not have the write that changed the version yet.
+    with use_primary():
+        response = view(request, *args, **kwargs)
+    if getattr(response, 'is_rendered', True):
+        return _store(request, key, version, timeout, stale, response)
+    response.add_post_render_callback(lambda rendered: _store(request, key, version, timeout, stale, rendered))
+    return response
+
+
+def cache_view(*models, timeout=TIMEOUT, stale=STALE_TIMEOUT):
+    """
+    Cache the GET and HEAD responses of a view that depends on the given
+    models only, not on the user, per URL including the query string.
+    """
+    def decorator(view):
+        prefix = f'view:{view.__module__}.{view.__qualname__}'
+
+        @functools.wraps(view)
+        def cached_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+            key = f'{prefix}:{url}'
+            version = model_version(*models)
+            entry = cache.get(key)
+            if entry is None:
+                stats.incr('misses')
+                return _render(view, request, args, kwargs, key, version, timeout, stale)
+
+            cached_version, fresh_until, response = entry
+            if cached_version == version and time.time() < fresh_until:
+                stats.incr('hits')
+                return response
+
+            # Out of date: one request renders it again, the others get the stale copy.
+            lock_key = f'{key}:lock'
+            if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+                stats.incr('stale_hits')
+                return response
+            stats.incr('revalidations')
+            try:
+                return _render(view, request, args, kwargs, key, version, timeout, stale)
+            finally:
+                cache.delete(lock_key)
+
+        return cached_view
+    return decorator
@@ -0,0 +1,6 @@
+from django.db.backends.mysql import base
+from storeuz.db.backends.pooling import PoolingMixin
+
+
+class DatabaseWrapper(PoolingMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,86 @@
+"""
+Connection handling shared by the storeuz.db.backends wrappers of the
+stock MySQL, PostgreSQL and SQLite backends.
+
+CONN_HEALTH_CHECKS (built into Django from 4.1): a persistent connection
+is pinged before its first use in every request, and replaced when the
+server went away, instead of failing the request.
+
+POOL: {'MAX_SIZE': 10, 'TIMEOUT': 5, 'MAX_LIFETIME': None} makes closing a
+connection return it to the process-wide storeuz.db.pool instead.
+"""
+from .. import pool as pooling
+
+
+def ping(raw):
+    try:
+        cursor = raw.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+class PoolingMixin:
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self._pool = None
+
+    @property
+    def health_checks_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pooled(self):
+        in_memory = getattr(self, 'is_in_memory_db', lambda: False)()
+        return bool(self.settings_dict.get('POOL')) and not in_memory
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        if not self.pooled:
+            pooling.stats.incr(self.alias, 'created')
+            return connect(conn_params)
+        self._pool = pooling.get_pool(self.alias, self.settings_dict)
+        return self._pool.acquire(
+            lambda: connect(conn_params),
+            check=ping if self.health_checks_enabled else None,
+        )
+
+    def connect(self):
+        super().connect()
+        # A fresh or freshly checked out connection needs no health check.
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if (self.connection is not None and self.health_checks_enabled
+                and not self.health_check_done and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                pooling.stats.incr(self.alias, 'reconnects')
+                self.errors_occurred = True
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Called at the start and end of every request.
+        self.health_check_done = False
+
+    def _close(self):
+        if self._pool is None or self.connection is None:
+            return super()._close()
+
+        raw = self.connection
+        discard = self.in_atomic_block or self.errors_occurred
+        if not discard and not self.autocommit:
+            try:
+                raw.rollback()
+            except Exception:
+                discard = True
+        pool, self._pool = self._pool, None
+        pool.release(raw, discard=discard)
@@ -0,0 +1,6 @@
+from django.db.backends.sqlite3 import base
+from storeuz.db.backends.pooling import PoolingMixin
+
+
+class DatabaseWrapper(PoolingMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,177 @@
+"""
+In-process database connection pool shared by the threads of a process.
+
+Django keeps one connection per thread and alias. With a pool, closing
+that connection at the end of a request hands the underlying DB-API
+connection back here instead of closing it, and the next connect() of any
+thread takes it out again, so a process never opens more than MAX_SIZE
+connections and rarely opens a new one.
+"""
+import threading
+import time
+from collections import Counter, deque
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionStats:
+    """Counters per database alias, served at /__metrics__/connections/."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def incr(self, alias, name, amount=1):
+        with self._lock:
+            self._counts.setdefault(alias, Counter())[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            counts = {alias: dict(counter) for alias, counter in self._counts.items()}
+        for pool in list(pools.values()):
+            counts.setdefault(pool.alias, {}).update(pool.gauges())
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = ConnectionStats()
+
+
+class ConnectionPool:
+
+    def __init__(self, alias, max_size=10, timeout=5, max_lifetime=None):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self._idle = deque()
+        self._born = {}
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, connect, check=None):
+        """
+        An idle connection, or a new one from connect() while the pool is
+        below MAX_SIZE, otherwise wait up to TIMEOUT for one to be released.
+        Idle connections past MAX_LIFETIME or failing check() are replaced.
+        """
+        stats.incr(self.alias, 'checkouts')
+        start = time.monotonic()
+        while True:
+            raw = self._checkout(start)
+            if raw is None:
+                try:
+                    raw = connect()
+                except BaseException:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._born[id(raw)] = time.monotonic()
+                stats.incr(self.alias, 'created')
+                return raw
+
+            if self.max_lifetime is not None and time.monotonic() - self._born.get(id(raw), 0) > self.max_lifetime:
+                self._close(raw, 'recycled')
+            elif check is not None and not check(raw):
+                self._close(raw, 'reconnects')
+            else:
+                return raw
+
+    def _checkout(self, start):
+        """An idle connection, or None after reserving room for a new one."""
+        with self._condition:
+            waited = False
+            while not self._idle and self._size >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    stats.incr(self.alias, 'timeouts')
+                    raise PoolTimeout(
+                        f'No connection to {self.alias!r} became free within {self.timeout}s '
+                        f'({self.max_size} in use).'
+                    )
+                if not waited:
+                    stats.incr(self.alias, 'waits')
+                    waited = True
+                self._condition.wait(remaining)
+            if waited:
+                stats.incr(self.alias, 'wait_ms', round((time.monotonic() - start) * 1000))
+
+            if self._idle:
+                # Most recently used first, the others may expire unused.
+                return self._idle.pop()
+            self._size += 1
+            return None
+
+    def release(self, raw, discard=False):
+        if discard:
+            self._close(raw, 'discarded')
+            return
+        with self._condition:
+            self._idle.append(raw)
+            self._condition.notify()
+
+    def _close(self, raw, reason):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._born.pop(id(raw), None)
+            self._condition.notify()
+        stats.incr(self.alias, reason)
+
+    def close_idle(self):
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for raw in idle:
+            self._close(raw, 'closed')
+
+    def gauges(self):
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+            }
+
+
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """The pool for a database, one per alias and server per process."""
+    key = (alias, settings_dict['HOST'], settings_dict['PORT'], str(settings_dict['NAME']))
+    pool = pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = pools.get(key)
+            if pool is None:
+                options = settings_dict['POOL']
+                pool = pools[key] = ConnectionPool(
+                    alias,
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 5),
+                    max_lifetime=options.get('MAX_LIFETIME'),
+                )
+    return pool
+
+
+def close_pools():
+    """Close all idle pooled connections and forget the pools."""
+    with _pools_lock:
+        closing = list(pools.values())
+        pools.clear()
+    for pool in closing:
+        pool.close_idle()
@@ -0,0 +1,82 @@
+"""
+Batch loading of GenericForeignKey targets.
+
+Reading item.content_object costs one query per item, and reading
+item.content_type another one, as the ContentType cache is not used by
+the foreign key. resolve_content_objects() fills both for a list of items
+with one in_bulk() query per content type, taking the content types from
+the ContentType cache.
+"""
+from collections import defaultdict
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models.query import ModelIterable
+
+
+def generic_foreign_key(model, name=None):
+    for field in model._meta.private_fields:
+        if isinstance(field, GenericForeignKey) and name in (None, field.name):
+            return field
+    raise ValueError(f'{model.__name__} has no generic foreign key {name or ""}'.rstrip())
+
+
+def resolve_content_objects(items, name=None):
+    """
+    Load the targets of the generic foreign key `name` (the model's only
+    one by default) of all items, returns items. Items whose target no
+    longer exists get None.
+    """
+    items = list(items)
+    if not items:
+        return items
+
+    gfk = generic_foreign_key(type(items[0]), name)
+    content_type_field = type(items[0])._meta.get_field(gfk.ct_field)
+    ids = defaultdict(set)
+    for item in items:
+        content_type_id = getattr(item, content_type_field.attname)
+        if content_type_id is not None:
+            ids[content_type_id].add(getattr(item, gfk.fk_field))
+
+    using = items[0]._state.db
+    content_types = {}
+    targets = {}
+    for content_type_id, object_ids in ids.items():
+        content_type = ContentType.objects.db_manager(using).get_for_id(content_type_id)
+        content_types[content_type_id] = content_type
+        model = content_type.model_class()
+        if model is None:
+            continue
+        for pk, obj in model._base_manager.using(using).in_bulk(object_ids).items():
+            targets[content_type_id, pk] = obj
+
+    for item in items:
+        content_type_id = getattr(item, content_type_field.attname)
+        if content_type_id is None:
+            continue
+        content_type_field.set_cached_value(item, content_types[content_type_id])
+        gfk.set_cached_value(item, targets.get((content_type_id, getattr(item, gfk.fk_field))))
+    return items
+
+
+class GenericRelationQuerySet(models.QuerySet):
+    """QuerySet with with_content_objects(), for models with a generic foreign key."""
+    _with_content_objects = False
+
+    def with_content_objects(self):
+        """Resolve the content objects of the results in bulk when they are fetched."""
+        clone = self._chain()
+        clone._with_content_objects = True
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._with_content_objects = self._with_content_objects
+        return clone
+
+    def _fetch_all(self):
+        fetching = self._result_cache is None
+        super()._fetch_all()
+        if fetching and self._with_content_objects and self._iterable_class is ModelIterable:
+            resolve_content_objects(self._result_cache)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.db import connections
+
+_current_recorder = ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    """
+    Execute wrapper that counts and times every query of a request and
+    remembers how often the same statement with the same params was run.
+    Queries may come from several threads at once, see record_queries().
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.duration += duration
+                self.count += 1
+                self.statements[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values())
+
+
+@contextmanager
+def record_queries(recorder=None):
+    """
+    Record the queries of this thread's connections into recorder, by
+    default into the one of the current context. The context is copied into
+    the threads of storeuz.async_db, which record into the recorder of the
+    request that called them this way.
+    """
+    recorder = recorder or _current_recorder.get()
+    if recorder is None:
+        yield None
+        return
+
+    token = _current_recorder.set(recorder)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                if recorder not in connection.execute_wrappers:
+                    stack.enter_context(connection.execute_wrapper(recorder))
+            yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class RequestHistogram:
+    """Rolling window of the latest samples per URL name."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, url_name, wall_ms, sql_ms, queries, duplicates):
+        with self._lock:
+            self._samples[url_name].append((round(wall_ms, 3), round(sql_ms, 3), queries, duplicates))
+            self._totals[url_name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            totals = dict(self._totals)
+
+        summary = {}
+        for name, samples in sorted(snapshot.items()):
+            columns = list(zip(*samples))
+            summary[name] = {
+                'requests': totals[name],
+                'window': len(samples),
+                **{
+                    metric: {
+                        'p50': percentile(values, 0.50),
+                        'p95': percentile(values, 0.95),
+                        'p99': percentile(values, 0.99),
+                    }
+                    for metric, values in [
+                        ('wall_ms', sorted(columns[0])),
+                        ('sql_ms', sorted(columns[1])),
+                        ('queries', sorted(columns[2])),
+                    ]
+                },
+                'requests_with_duplicates': sum(1 for duplicates in columns[3] if duplicates),
+            }
+        return summary
+
+
+histogram = RequestHistogram()
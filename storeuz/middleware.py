@@ -0,0 +1,132 @@
+import asyncio
+import random
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+from . import routers
+from .metrics import QueryRecorder, histogram, record_queries
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, query count, SQL time and duplicate queries for a
+    sample of requests. Results go to response headers and to the in-process
+    histogram served by storeuz.views.request_metrics.
+
+    Handles sync and async requests, so async views stay on the event loop.
+    Queries of async views in storeuz.async_db threads are counted. For
+    streaming responses the histogram also covers the queries and time
+    spent producing the content, the headers are sent before that and so
+    only carry the response time up to the first byte.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 0)
+        self.headers = getattr(settings, 'REQUEST_METRICS_HEADERS', True)
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        histogram.window = getattr(settings, 'REQUEST_METRICS_WINDOW', histogram.window)
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Tells the handler that __call__ returns a coroutine.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with record_queries(recorder):
+            response = self.get_response(request)
+        return self.record(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with record_queries(recorder):
+            response = await self.get_response(request)
+        return self.record(request, response, recorder, start)
+
+    def record(self, request, response, recorder, start):
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        url_name = match.view_name if match else 'unresolved'
+        if response.streaming:
+            response.streaming_content = self.record_streaming(
+                response.streaming_content, recorder, start, url_name,
+            )
+            if self.headers:
+                response['X-Response-Time-Ms'] = f'{wall_ms:.2f}'
+            return response
+
+        sql_ms = recorder.duration * 1000
+        histogram.record(url_name, wall_ms, sql_ms, recorder.count, recorder.duplicates)
+        if self.headers:
+            response['X-DB-Queries'] = str(recorder.count)
+            response['X-DB-Duplicate-Queries'] = str(recorder.duplicates)
+            response['X-DB-Time-Ms'] = f'{sql_ms:.2f}'
+            response['X-Response-Time-Ms'] = f'{wall_ms:.2f}'
+        return response
+
+    def record_streaming(self, content, recorder, start, url_name):
+        # Chunks may be produced in different threads, the queries of each
+        # are recorded separately.
+        chunks = iter(content)
+        end = object()
+        try:
+            while True:
+                with record_queries(recorder):
+                    chunk = next(chunks, end)
+                if chunk is end:
+                    return
+                yield chunk
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            histogram.record(url_name, wall_ms, recorder.duration * 1000, recorder.count, recorder.duplicates)
+
+
+@sync_and_async_middleware
+def database_routing_middleware(get_response):
+    """
+    Tracks whether a request wrote to the primary, see storeuz.routers.
+    Works for sync and async views alike, so it never forces an async
+    view into a thread.
+    """
+    if not routers.REPLICAS:
+        raise MiddlewareNotUsed
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = routers.start_request(request)
+            try:
+                response = await get_response(request)
+            finally:
+                wrote = routers.finish_request(token)
+            if wrote:
+                routers.pin_to_primary(response)
+            return response
+    else:
+        def middleware(request):
+            token = routers.start_request(request)
+            try:
+                response = get_response(request)
+            finally:
+                wrote = routers.finish_request(token)
+            if wrote:
+                routers.pin_to_primary(response)
+            return response
+
+    return middleware
@@ -0,0 +1,104 @@
+"""
+Primary/replica database routing.
+
+Inside a request, reads of the store, tags, likes and analytics models go to a
+random replica from REPLICA_DATABASES, unless the request has to see its
+own writes:
+
+- once it writes, the rest of the request reads from the primary,
+- so does everything inside a transaction on the primary,
+- and for REPLICA_LAG_SECONDS after a write, the client carries a cookie
+  that pins its following requests to the primary, so it never reads
+  data older than what it just wrote from a replica that lags behind.
+
+Outside of requests (management commands, shell) there is no routing
+state and everything uses the primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ROUTED_APPS = {'store', 'tags', 'likes', 'analytics'}
+REPLICAS = list(getattr(settings, 'REPLICA_DATABASES', []))
+REPLICA_LAG_SECONDS = getattr(settings, 'REPLICA_LAG_SECONDS', 5)
+PIN_COOKIE = 'storeuz_primary'
+
+
+class RequestRouting:
+    __slots__ = ['sticky', 'wrote', 'forced']
+
+    def __init__(self, sticky=False):
+        self.sticky = sticky
+        self.wrote = False
+        self.forced = False
+
+    @property
+    def primary(self):
+        return self.sticky or self.wrote or self.forced
+
+
+_routing = ContextVar('storeuz_db_routing', default=None)
+
+
+def start_request(request):
+    """Begin routing reads of request, returns the token for finish_request()."""
+    return _routing.set(RequestRouting(sticky=PIN_COOKIE in request.COOKIES))
+
+
+def finish_request(token):
+    """Stop routing for the request, returns whether it wrote to the primary."""
+    routing = _routing.get()
+    _routing.reset(token)
+    return routing.wrote
+
+
+def pin_to_primary(response):
+    """Send the client's requests to the primary until replicas have caught up."""
+    response.set_cookie(PIN_COOKIE, '1', max_age=REPLICA_LAG_SECONDS, httponly=True, samesite='Lax')
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, e.g. to fill a shared cache."""
+    routing = _routing.get()
+    if routing is None:
+        yield
+        return
+    forced = routing.forced
+    routing.forced = True
+    try:
+        yield
+    finally:
+        routing.forced = forced
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not REPLICAS or model._meta.app_label not in ROUTED_APPS:
+            return None
+        routing = _routing.get()
+        if routing is None or routing.primary or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS:
+            routing = _routing.get()
+            if routing is not None:
+                routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        if db in REPLICAS:
+            return False
+        return None
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,12 +39,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    "debug_toolbar",
     "playground",
     "store",
     "store_custom",
     "tags",
     "likes",
+    "analytics",
 ]
 
 INTERNAL_IPS = [
@@ -51,7 +52,8 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    'storeuz.middleware.RequestMetricsMiddleware',
+    'storeuz.middleware.database_routing_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +63,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# debug_toolbar is for local development only, production profiling goes
+# through RequestMetricsMiddleware.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Fraction of requests RequestMetricsMiddleware records, 0 disables it.
+# Per-view percentiles are served to staff at /__metrics__/.
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('STOREUZ_METRICS_SAMPLE_RATE', 1.0 if DEBUG else 0.0))
+REQUEST_METRICS_HEADERS = True
+REQUEST_METRICS_WINDOW = 1000
+
 ROOT_URLCONF = 'storeuz.urls'
 
 TEMPLATES = [
@@ -81,13 +95,20 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'storeuz.wsgi.application'
 
+# Threads (and so database connections) per ASGI process that async views
+# use for their queries, see storeuz.async_db.
+ASYNC_DB_THREADS = int(os.environ.get('STOREUZ_ASYNC_DB_THREADS', 16))
+
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# The storeuz.db.backends engines are the stock backends plus
+# CONN_HEALTH_CHECKS and an optional connection pool, see
+# storeuz.db.backends.pooling.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'storeuz.db.backends.mysql',
         'NAME': 'storeuz',
         'HOST': 'localhost',
         'USER': 'root',
@@ -95,6 +116,127 @@ DATABASES = {
     }
 }
 
+# Local benchmarking and seeding run against SQLite:
+# STOREUZ_DB=sqlite [STOREUZ_SQLITE_NAME=path] python manage.py ...
+if os.environ.get('STOREUZ_DB') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'storeuz.db.backends.sqlite3',
+            'NAME': os.environ.get('STOREUZ_SQLITE_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Connections stay open between requests for CONN_MAX_AGE seconds and are
+# pinged before their first query in a request. With STOREUZ_DB_POOL_SIZE
+# set, connections are instead handed back to an in-process pool of that
+# size at the end of every request. Pool and reconnect counters are served
+# to staff at /__metrics__/connections/.
+DATABASES['default'].update({
+    'CONN_MAX_AGE': int(os.environ.get('STOREUZ_CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': True,
+})
+if os.environ.get('STOREUZ_DB_POOL_SIZE'):
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.environ['STOREUZ_DB_POOL_SIZE']),
+            'TIMEOUT': 5,
+            'MAX_LIFETIME': 1800,
+        },
+    })
+
+# Read replicas of the primary, store/tags/likes reads in requests go to
+# them through storeuz.routers.PrimaryReplicaRouter. MySQL replicas are
+# listed in STOREUZ_REPLICA_HOSTS (comma separated), locally a second
+# SQLite file in STOREUZ_SQLITE_REPLICA_NAME stands in for a replica and
+# is refreshed from the primary by the sync_sqlite_replica command.
+REPLICA_DATABASES = []
+if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    replica_names = [os.environ.get('STOREUZ_SQLITE_REPLICA_NAME')]
+    replica_key = 'NAME'
+else:
+    replica_names = os.environ.get('STOREUZ_REPLICA_HOSTS', '').split(',')
+    replica_key = 'HOST'
+for index, name in enumerate(filter(None, replica_names), 1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        replica_key: name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['storeuz.routers.PrimaryReplicaRouter']
+
+# How long after a write a client keeps reading from the primary, should
+# cover the worst replication lag.
+REPLICA_LAG_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+# LocMemCache evicts the least recently used entries once MAX_ENTRIES is
+# reached, CULL_FREQUENCY=10 drops the oldest tenth at a time.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'storeuz',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'CULL_FREQUENCY': 10,
+        },
+    }
+}
+
+CATALOG_CACHE_TIMEOUT = 300
+
+# Views cached with storeuz.caching.cache_view() are fresh for
+# VIEW_CACHE_TIMEOUT seconds or until a model they depend on changes, then
+# served stale for up to VIEW_CACHE_STALE_TIMEOUT while one request renders
+# them again. Saving or deleting a row of VERSIONED_MODELS invalidates them.
+# BULK_VERSIONED_MODELS are only versioned by their saves, the code that
+# deletes or rewrites them in bulk bumps their version itself. Only list
+# models a cached view or fragment depends on, the post_delete receiver
+# turns off Django's fast delete for them.
+VIEW_CACHE_TIMEOUT = 60
+VIEW_CACHE_STALE_TIMEOUT = 300
+VERSIONED_MODELS = [
+    'store.Collection',
+    'store.Product',
+    'store.Promotion',
+    'store.Customer',
+    'store.Address',
+    'tags.Tag',
+    'tags.TaggedItem',
+]
+BULK_VERSIONED_MODELS = [
+    'store.ProductSearchTerm',
+    'store.Cart',
+    'store.CartItem',
+    'likes.LikeCounter',
+]
+
+# Admin autocomplete pages for terms up to this length (the common, broad
+# prefixes) are cached for a few seconds, see storeuz.autocomplete.
+AUTOCOMPLETE_CACHE_TIMEOUT = 30
+AUTOCOMPLETE_CACHE_MAX_TERM_LENGTH = 3
+
+# Models whose tags tags.views.object_tags serves.
+TAGGABLE_MODELS = ['store.Product']
+
+# Days before the previous run that refresh_sales_rollups recomputes, to
+# catch orders completed after they were placed. Run it e.g. every 10 minutes.
+ANALYTICS_ROLLUP_LOOKBACK_DAYS = 3
+
+# Lifetime spend on completed orders from which a customer qualifies for
+# silver and gold membership, everyone else is bronze. The
+# refresh_customer_summaries command promotes customers, it never moves
+# anybody down.
+MEMBERSHIP_SILVER_SPEND = 10000
+MEMBERSHIP_GOLD_SPEND = 25000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
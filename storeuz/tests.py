@@ -0,0 +1,385 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from likes.models import LikedItem
+from store.models import Collection, Customer, Order, Product
+from tags.models import Tag, TaggedItem
+from . import routers
+from .async_db import db_sync_to_async
+from .caching import cache_view, model_version
+from .db import pool
+from .db.backends.sqlite3.base import DatabaseWrapper as PooledSQLiteWrapper
+from .generic import resolve_content_objects
+from .metrics import histogram
+from .middleware import RequestMetricsMiddleware, database_routing_middleware
+
+
+def load_tags():
+    return list(Tag.objects.all())
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1, REQUEST_METRICS_HEADERS=True)
+class RequestMetricsMiddlewareTests(TransactionTestCase):
+    # Async views query in storeuz.async_db threads, which cannot see the
+    # rows of an open test transaction.
+
+    def setUp(self):
+        histogram.reset()
+        self.request = RequestFactory().get('/')
+
+    def test_sync_view(self):
+        def view(request):
+            load_tags()
+            load_tags()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        response = middleware(self.request)
+        self.assertEqual(response['X-DB-Queries'], '2')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '1')
+
+    def test_async_view_stays_async(self):
+        async def view(request):
+            await db_sync_to_async(load_tags)()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        # The handler only wraps middleware that is not a coroutine function.
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(self.request)
+        self.assertEqual(response['X-DB-Queries'], '1')
+        self.assertEqual(histogram.summary()['unresolved']['requests'], 1)
+
+    def test_streaming_queries_are_recorded_when_exhausted(self):
+        def content():
+            for _ in range(3):
+                load_tags()
+                yield b'tags\n'
+
+        response = RequestMetricsMiddleware(lambda request: StreamingHttpResponse(content()))(self.request)
+        self.assertNotIn('X-DB-Queries', response)
+        self.assertEqual(histogram.summary(), {})
+        self.assertEqual(b''.join(response.streaming_content), b'tags\n' * 3)
+        self.assertEqual(histogram.summary()['unresolved']['queries']['p50'], 3)
+
+
+class CacheViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.rendered = 0
+
+        @cache_view(Tag)
+        def view(request):
+            self.rendered += 1
+            return HttpResponse(', '.join(Tag.objects.order_by('pk').values_list('label', flat=True)))
+        self.view = view
+
+    def get(self, path='/tags/'):
+        return self.view(RequestFactory().get(path)).content
+
+    def test_cached_until_a_model_changes(self):
+        self.assertEqual(self.get(), b'')
+        self.assertEqual(self.get(), b'')
+        self.assertEqual(self.rendered, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(label='red')
+        self.assertEqual(self.get(), b'red')
+        self.assertEqual(self.rendered, 2)
+
+    def test_cached_per_url(self):
+        self.get('/tags/?page=1')
+        self.get('/tags/?page=2')
+        self.assertEqual(self.rendered, 2)
+
+    def test_unversioned_models_are_not_bumped(self):
+        version = model_version(Order, LikedItem)
+        customer = Customer.objects.create(first_name='Liz', last_name='Taylor', email='liz@example.com', phone='1')
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(customer=customer).delete()
+        self.assertEqual(model_version(Order, LikedItem), version)
+
+
+class ResolveContentObjectsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.collection = Collection.objects.create(title='Lamps')
+        cls.products = [
+            Product.objects.create(title=f'Lamp {index}', slug='lamp', description='', unit_price=10,
+                                   inventory=1, collection=cls.collection)
+            for index in range(3)
+        ]
+        tag = Tag.objects.create(label='red')
+        for obj in [*cls.products, cls.collection]:
+            TaggedItem.objects.create(tag=tag, content_type=ContentType.objects.get_for_model(obj),
+                                      object_id=obj.pk)
+        TaggedItem.objects.create(tag=tag, content_type=ContentType.objects.get_for_model(Product),
+                                  object_id=cls.products[-1].pk + 100)
+
+    def setUp(self):
+        # Warm the ContentType cache, as a running process would have.
+        ContentType.objects.get_for_models(Product, Collection)
+
+    def test_one_query_per_content_type(self):
+        with self.assertNumQueries(3):
+            items = list(TaggedItem.objects.order_by('pk').with_content_objects())
+            targets = [item.content_object for item in items]
+            content_types = {item.content_type.model for item in items}
+        self.assertEqual(targets, [*self.products, self.collection, None])
+        self.assertEqual(content_types, {'product', 'collection'})
+
+    def test_resolve_a_list(self):
+        items = list(TaggedItem.objects.order_by('-pk')[1:3])
+        with self.assertNumQueries(2):
+            self.assertEqual(resolve_content_objects(items), items)
+            self.assertEqual([item.content_object for item in items], [self.collection, self.products[-1]])
+        self.assertEqual(resolve_content_objects([]), [])
+
+    def test_values_are_not_resolved(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(len(TaggedItem.objects.with_content_objects().values('pk')), 5)
+
+
+class RoutingTests(TransactionTestCase):
+    # Outside of TestCase's transaction, in which every read goes to the primary.
+    replica = 'replica1'
+
+    def setUp(self):
+        patcher = mock.patch.object(routers, 'REPLICAS', [self.replica])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return database_routing_middleware(view)(request)
+
+    def read_db(self):
+        return Tag.objects.all().db
+
+    def test_reads_go_to_a_replica(self):
+        databases = []
+
+        def view(request):
+            databases.append(self.read_db())
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertEqual(databases, [self.replica])
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        databases = []
+
+        def view(request):
+            databases.append(self.read_db())
+            Tag.objects.create(label='red')
+            databases.append(self.read_db())
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertEqual(databases, [self.replica, 'default'])
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], routers.REPLICA_LAG_SECONDS)
+
+    def test_reads_in_a_transaction_go_to_the_primary(self):
+        databases = []
+
+        def view(request):
+            with transaction.atomic():
+                databases.append(self.read_db())
+            databases.append(self.read_db())
+            return HttpResponse()
+
+        self.request(view)
+        self.assertEqual(databases, ['default', self.replica])
+
+    def test_pinned_clients_read_from_the_primary(self):
+        databases = []
+
+        def view(request):
+            databases.append(self.read_db())
+            return HttpResponse()
+
+        response = self.request(view, cookies={routers.PIN_COOKIE: '1'})
+        self.assertEqual(databases, ['default'])
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_use_primary(self):
+        databases = []
+
+        def view(request):
+            with routers.use_primary():
+                databases.append(self.read_db())
+            databases.append(self.read_db())
+            return HttpResponse()
+
+        self.request(view)
+        self.assertEqual(databases, ['default', self.replica])
+
+    def test_outside_requests_everything_uses_the_primary(self):
+        self.assertEqual(self.read_db(), 'default')
+        with routers.use_primary():
+            self.assertEqual(self.read_db(), 'default')
+
+
+@skipUnless(settings.REPLICA_DATABASES, 'Needs a replica, e.g. STOREUZ_SQLITE_REPLICA_NAME with STOREUZ_DB=sqlite.')
+class ReplicaQueryTests(TransactionTestCase):
+    # The test replica mirrors the test database of the primary.
+    databases = {'default', *settings.REPLICA_DATABASES}
+
+    def test_queries_run_on_the_replica_connection(self):
+        Tag.objects.create(label='red')
+        replica = settings.REPLICA_DATABASES[0]
+        labels = {}
+
+        def view(request):
+            labels['before'] = list(Tag.objects.values_list('label', flat=True))
+            Tag.objects.create(label='blue')
+            labels['after'] = list(Tag.objects.order_by('pk').values_list('label', flat=True))
+            return HttpResponse()
+
+        with mock.patch.object(routers, 'REPLICAS', [replica]), \
+                CaptureQueriesContext(connections[replica]) as replica_queries, \
+                CaptureQueriesContext(connections['default']) as primary_queries:
+            database_routing_middleware(view)(RequestFactory().get('/'))
+        self.assertEqual(labels, {'before': ['red'], 'after': ['red', 'blue']})
+        self.assertEqual(len(replica_queries), 1)
+        self.assertIn('"tags_tag"."label"', replica_queries[0]['sql'])
+        # The receivers of the write query the primary too.
+        self.assertIn('"tags_tag"."label"', primary_queries[-1]['sql'])
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        pool.stats.reset()
+        self.created = []
+
+    def connect(self):
+        raw = FakeConnection()
+        self.created.append(raw)
+        return raw
+
+    def test_idle_connections_are_reused(self):
+        connections_pool = pool.ConnectionPool('test', max_size=2)
+        raw = connections_pool.acquire(self.connect)
+        connections_pool.release(raw)
+        self.assertIs(connections_pool.acquire(self.connect), raw)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(connections_pool.gauges(), {'max_size': 2, 'size': 1, 'idle': 0, 'in_use': 1})
+
+    def test_exhausted_pool_times_out(self):
+        connections_pool = pool.ConnectionPool('test', max_size=1, timeout=0.05)
+        connections_pool.acquire(self.connect)
+        with self.assertRaises(pool.PoolTimeout):
+            connections_pool.acquire(self.connect)
+        self.assertEqual(pool.stats.snapshot()['test']['timeouts'], 1)
+
+    def test_exhausted_pool_waits_for_a_release(self):
+        connections_pool = pool.ConnectionPool('test', max_size=1, timeout=5)
+        raw = connections_pool.acquire(self.connect)
+        release = threading.Timer(0.05, connections_pool.release, [raw])
+        release.start()
+        self.addCleanup(release.join)
+        self.assertIs(connections_pool.acquire(self.connect), raw)
+        self.assertEqual(pool.stats.snapshot()['test']['waits'], 1)
+
+    def test_failed_connect_frees_its_slot(self):
+        connections_pool = pool.ConnectionPool('test', max_size=1, timeout=0.05)
+        with self.assertRaises(OSError):
+            connections_pool.acquire(mock.Mock(side_effect=OSError))
+        self.assertIsNotNone(connections_pool.acquire(self.connect))
+
+    def test_old_connections_are_recycled(self):
+        connections_pool = pool.ConnectionPool('test', max_size=1, max_lifetime=60)
+        old = connections_pool.acquire(self.connect)
+        connections_pool.release(old)
+        connections_pool._born[id(old)] = time.monotonic() - 61
+        new = connections_pool.acquire(self.connect)
+        self.assertIsNot(new, old)
+        self.assertTrue(old.closed)
+        self.assertEqual(pool.stats.snapshot()['test']['recycled'], 1)
+
+    def test_broken_connections_are_replaced(self):
+        connections_pool = pool.ConnectionPool('test', max_size=1)
+        broken = connections_pool.acquire(self.connect)
+        connections_pool.release(broken)
+        new = connections_pool.acquire(self.connect, check=lambda raw: raw is not broken)
+        self.assertIsNot(new, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.stats.snapshot()['test']['reconnects'], 1)
+
+    def test_discarded_connections_are_closed(self):
+        connections_pool = pool.ConnectionPool('test', max_size=1)
+        raw = connections_pool.acquire(self.connect)
+        connections_pool.release(raw, discard=True)
+        self.assertTrue(raw.closed)
+        self.assertEqual(connections_pool.gauges()['size'], 0)
+
+
+class PoolingMixinTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(pool.close_pools)
+        self.settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'storeuz.db.backends.sqlite3',
+            'NAME': os.path.join(directory.name, 'pool.sqlite3'),
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 0.05},
+        }
+
+    def wrapper(self):
+        wrapper = PooledSQLiteWrapper(dict(self.settings_dict), alias='pooled')
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def test_close_returns_the_connection_to_the_pool(self):
+        first = self.wrapper()
+        raw = first.connection
+        first.close()
+        self.assertEqual(first._pool, None)
+
+        second = self.wrapper()
+        self.assertIs(second.connection, raw)
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        # The pool only has room for the connection the second wrapper holds.
+        with self.assertRaises(pool.PoolTimeout):
+            self.wrapper()
+
+    def test_connections_with_errors_are_discarded(self):
+        first = self.wrapper()
+        raw = first.connection
+        first.errors_occurred = True
+        first.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            raw.execute('SELECT 1')
+        self.assertIsNot(self.wrapper().connection, raw)
@@ -13,15 +13,29 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
+from .autocomplete import FastAutocompleteJsonView
+from .views import connection_metrics, request_metrics, view_cache_metrics
 
 admin.site.site_header = 'Storeuz Admin'
 admin.site.index_title = 'Admin'
 
 urlpatterns = [
     path('jet/', include('jet.urls', 'jet')),
+    # Shadows the admin's own autocomplete view, which the widgets reverse to.
+    path('admin/autocomplete/',
+         admin.site.admin_view(FastAutocompleteJsonView.as_view(admin_site=admin.site)),
+         name='autocomplete'),
     path('admin/', admin.site.urls),
-    path('__debug__/', include('debug_toolbar.urls')),
+    path('__metrics__/', request_metrics, name='request_metrics'),
+    path('__metrics__/connections/', connection_metrics, name='connection_metrics'),
+    path('__metrics__/view-cache/', view_cache_metrics, name='view_cache_metrics'),
+    path('store/', include('store.urls')),
+    path('tags/', include('tags.urls')),
     path('', include('playground.urls'))
 ]
+
+if settings.DEBUG:
+    urlpatterns.append(path('__debug__/', include('debug_toolbar.urls')))
@@ -0,0 +1,20 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from .caching import stats as view_cache_stats
+from .db.pool import stats as connection_stats
+from .metrics import histogram
+
+
+@staff_member_required
+def request_metrics(request):
+    return JsonResponse(histogram.summary())
+
+
+@staff_member_required
+def connection_metrics(request):
+    return JsonResponse(connection_stats.snapshot())
+
+
+@staff_member_required
+def view_cache_metrics(request):
+    return JsonResponse(view_cache_stats.snapshot())
@@ -0,0 +1,91 @@
+"""
+Tagging and untagging many objects at once.
+
+tag_objects() inserts only the missing TaggedItem rows with bulk_create()
+and untag_objects() deletes with one DELETE, instead of saving or deleting
+every item. Neither sends post_save or post_delete, so the tag cache and
+the model versions are updated here, and tags.signals.objects_retagged
+tells the owners of the objects (see store.signals.handlers).
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from storeuz.caching import bump_model_versions
+from .cache import tag_cache
+from .models import TaggedItem
+from .signals import objects_retagged
+
+BATCH_SIZE = 1000
+
+
+def _retagged(queryset, content_type, object_ids):
+    if not object_ids:
+        return
+    objects_retagged.send(sender=queryset.model, content_type=content_type, object_ids=object_ids)
+
+    def invalidate():
+        for object_id in object_ids:
+            tag_cache.invalidate(content_type.id, object_id)
+        bump_model_versions(TaggedItem)
+    transaction.on_commit(invalidate)
+
+
+def _insert(tag, content_type, object_ids):
+    """Insert the items of object_ids that are still missing, returns the ids inserted."""
+    items = TaggedItem.objects.filter(tag=tag, content_type=content_type)
+    while object_ids:
+        try:
+            with transaction.atomic():
+                TaggedItem.objects.bulk_create(
+                    TaggedItem(tag=tag, content_type=content_type, object_id=object_id)
+                    for object_id in object_ids
+                )
+            return object_ids
+        except IntegrityError:
+            # Another request tagged some of them meanwhile, the unique
+            # constraint rejected the batch. A locking read sees its rows.
+            tagged = set(
+                items.select_for_update()
+                     .filter(object_id__in=object_ids)
+                     .values_list('object_id', flat=True)
+            )
+            if not tagged:
+                raise
+            object_ids = [object_id for object_id in object_ids if object_id not in tagged]
+    return object_ids
+
+
+def tag_objects(queryset, tag, batch_size=BATCH_SIZE):
+    """Attach tag to every object in queryset that lacks it, returns the number tagged."""
+    content_type = ContentType.objects.get_for_model(queryset.model)
+    queryset = queryset.order_by()
+
+    with transaction.atomic():
+        tagged = set(
+            TaggedItem.objects
+                .filter(tag=tag, content_type=content_type, object_id__in=queryset.values('pk'))
+                .values_list('object_id', flat=True)
+        )
+        missing = [pk for pk in queryset.values_list('pk', flat=True) if pk not in tagged]
+        inserted = []
+        for start in range(0, len(missing), batch_size):
+            inserted += _insert(tag, content_type, missing[start:start + batch_size])
+        _retagged(queryset, content_type, inserted)
+    return len(inserted)
+
+
+def untag_objects(queryset, tag):
+    """Detach tag from every object in queryset, returns the number untagged."""
+    content_type = ContentType.objects.get_for_model(queryset.model)
+    items = TaggedItem.objects.filter(
+        tag=tag,
+        content_type=content_type,
+        object_id__in=queryset.order_by().values('pk'),
+    )
+
+    with transaction.atomic():
+        # Locked, so that exactly these are deleted.
+        object_ids = list(items.select_for_update().values_list('object_id', flat=True))
+        # One DELETE without loading the items or sending post_delete.
+        items._raw_delete(items.db)
+        _retagged(queryset, content_type, object_ids)
+    return len(object_ids)
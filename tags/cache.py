@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+class TagCache:
+    """
+    Process-local LRU cache of tags keyed by (content_type_id, object_id).
+
+    Entries expire after `timeout` seconds so that processes which did not
+    receive the invalidating signal eventually catch up.
+    """
+
+    def __init__(self, max_entries=10000, timeout=300):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get_many(self, content_type_id, object_ids):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for object_id in object_ids:
+                key = (content_type_id, object_id)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, tags = entry
+                if expires_at < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[object_id] = list(tags)
+        return found
+
+    def set_many(self, content_type_id, tags_by_id, generation):
+        expires_at = time.monotonic() + self.timeout
+        with self._lock:
+            # Something was invalidated while the caller was querying,
+            # so its results may already be stale.
+            if generation != self._generation:
+                return
+            for object_id, tags in tags_by_id.items():
+                key = (content_type_id, object_id)
+                self._entries[key] = (expires_at, tuple(tags))
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, content_type_id, object_id):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop((content_type_id, object_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+tag_cache = TagCache(
+    max_entries=getattr(settings, 'TAGS_CACHE_MAX_ENTRIES', 10000),
+    timeout=getattr(settings, 'TAGS_CACHE_TIMEOUT', 300),
+)
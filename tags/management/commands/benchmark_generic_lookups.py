@@ -0,0 +1,177 @@
+import random
+import time
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.apps import apps
+from django.db import connection
+from django.db.migrations.operations import RemoveConstraint, RemoveIndex
+from django.db.migrations.state import ProjectState
+from django.db.models import UniqueConstraint
+from likes.models import LikedItem
+from store.models import Product, Collection, Customer
+from tags.models import Tag, TaggedItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Times (content_type, object_id) lookups on TaggedItem and LikedItem '
+        'with and without the composite index (and the unique constraints '
+        'that start with the same columns).'
+    )
+
+    CONTENT_MODELS = [Product, Collection, Customer]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=0,
+                            help='Seed rows into each table until it has at least this many.')
+        parser.add_argument('--objects', type=int, default=10000,
+                            help='Number of distinct object ids per content type when seeding.')
+        parser.add_argument('--lookups', type=int, default=500)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options['seed'])
+        content_type_ids = [
+            content_type.id for content_type in
+            ContentType.objects.get_for_models(*self.CONTENT_MODELS).values()
+        ]
+
+        if options['rows']:
+            self.seed_tagged_items(rng, content_type_ids, options)
+            self.seed_liked_items(rng, content_type_ids, options)
+
+        lookups = [
+            (rng.choice(content_type_ids), rng.randint(1, options['objects']))
+            for _ in range(options['lookups'])
+        ]
+
+        for model in [TaggedItem, LikedItem]:
+            self.benchmark(model, lookups)
+
+    def seed_tagged_items(self, rng, content_type_ids, options):
+        missing = options['rows'] - TaggedItem.objects.count()
+        if missing <= 0:
+            return
+
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not tag_ids:
+            Tag.objects.bulk_create(Tag(label=f'bench-{i}') for i in range(50))
+            tag_ids = list(Tag.objects.values_list('id', flat=True))
+
+        self.stdout.write(f'Seeding {missing} tagged items...')
+        while missing > 0:
+            size = min(missing, options['batch_size'])
+            # Duplicates are skipped by unique_tagged_item.
+            TaggedItem.objects.bulk_create(
+                [TaggedItem(tag_id=rng.choice(tag_ids),
+                            content_type_id=rng.choice(content_type_ids),
+                            object_id=rng.randint(1, options['objects']))
+                 for _ in range(size)],
+                ignore_conflicts=True,
+            )
+            missing = options['rows'] - TaggedItem.objects.count()
+
+    def seed_liked_items(self, rng, content_type_ids, options):
+        missing = options['rows'] - LikedItem.objects.count()
+        if missing <= 0:
+            return
+
+        # Every user can like an object only once, so make sure there are
+        # enough (user, object) combinations to seed the requested rows.
+        users_needed = missing // (options['objects'] * len(content_type_ids)) + 100
+        existing = set(User.objects.filter(username__startswith='bench-user-')
+                       .values_list('username', flat=True))
+        User.objects.bulk_create(
+            User(username=f'bench-user-{i}')
+            for i in range(users_needed)
+            if f'bench-user-{i}' not in existing
+        )
+        user_ids = list(User.objects.filter(username__startswith='bench-user-')
+                        .values_list('id', flat=True))
+
+        self.stdout.write(f'Seeding {missing} liked items...')
+        while missing > 0:
+            size = min(missing, options['batch_size'])
+            likes = {
+                (rng.choice(user_ids),
+                 rng.choice(content_type_ids),
+                 rng.randint(1, options['objects']))
+                for _ in range(size)
+            }
+            LikedItem.objects.bulk_create(
+                [LikedItem(user_id=user_id, content_type_id=content_type_id, object_id=object_id)
+                 for user_id, content_type_id, object_id in likes],
+                ignore_conflicts=True,
+            )
+            missing = options['rows'] - LikedItem.objects.count()
+
+    def benchmark(self, model, lookups):
+        fields = ['content_type', 'object_id']
+        index = next(index for index in model._meta.indexes if index.fields == fields)
+        # A unique constraint starting with the same columns serves the
+        # lookups as well, so "before" runs without it too.
+        constraints = [
+            constraint for constraint in model._meta.constraints
+            if isinstance(constraint, UniqueConstraint) and list(constraint.fields[:2]) == fields
+        ]
+        total_rows = model.objects.count()
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{model._meta.label} ({total_rows} rows, {len(lookups)} lookups)'
+        ))
+
+        # Timed in the order after, before, before, after, keeping the best
+        # run of each, so that neither profits from caches warmed by the other.
+        self.time_lookups(model, lookups)
+        runs = {'after': [self.time_lookups(model, lookups)], 'before': []}
+        restore = self.migrate(model, [
+            *[RemoveConstraint(model._meta.model_name, constraint.name) for constraint in constraints],
+            RemoveIndex(model._meta.model_name, index.name),
+        ])
+        try:
+            runs['before'] += [self.time_lookups(model, lookups) for _ in range(2)]
+        finally:
+            restore()
+        runs['after'].append(self.time_lookups(model, lookups))
+
+        for label in ['before', 'after']:
+            elapsed, plan = min(runs[label])
+            self.stdout.write(
+                f'  {label:<6} {elapsed * 1000:10.2f} ms total '
+                f'{elapsed * 1e6 / len(lookups):10.1f} us/lookup'
+            )
+            self.stdout.write(f'         plan: {plan}')
+
+    def migrate(self, model, operations):
+        """
+        Apply migration operations to the database only, returns a function
+        that reverts them. Run as migrations, SQLite rebuilds the table
+        without the removed constraints rather than from the model.
+        """
+        app_label = model._meta.app_label
+        states = [ProjectState.from_apps(apps)]
+        with connection.schema_editor() as schema_editor:
+            for operation in operations:
+                states.append(states[-1].clone())
+                operation.state_forwards(app_label, states[-1])
+                operation.database_forwards(app_label, schema_editor, states[-2], states[-1])
+
+        def revert():
+            with connection.schema_editor() as schema_editor:
+                for operation, before, after in reversed(list(zip(operations, states, states[1:]))):
+                    operation.database_backwards(app_label, schema_editor, after, before)
+        return revert
+
+    def time_lookups(self, model, lookups):
+        content_type_id, object_id = lookups[0]
+        plan = model.objects \
+            .filter(content_type_id=content_type_id, object_id=object_id) \
+            .explain()
+
+        start = time.perf_counter()
+        for content_type_id, object_id in lookups:
+            list(model.objects.filter(content_type_id=content_type_id, object_id=object_id))
+        elapsed = time.perf_counter() - start
+
+        return elapsed, ' '.join(plan.split())
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.5 on 2026-10-18 07:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_tagged_items(apps, schema_editor):
+    TaggedItem = apps.get_model('tags', 'TaggedItem')
+    duplicates = TaggedItem.objects \
+        .values('tag', 'content_type', 'object_id') \
+        .annotate(keep_id=Min('id'), items=Count('id')) \
+        .filter(items__gt=1)
+    for duplicate in duplicates:
+        TaggedItem.objects \
+            .filter(tag=duplicate['tag'],
+                    content_type=duplicate['content_type'],
+                    object_id=duplicate['object_id']) \
+            .exclude(id=duplicate['keep_id']) \
+            .delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0003_taggeditem_tags_tagged_content_eaa81e_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_tagged_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='taggeditem',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id', 'tag'), name='unique_tagged_item'),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from storeuz.generic import GenericRelationQuerySet
+from storeuz.routers import use_primary
+from .cache import tag_cache
 
 
-class TaggedItemManager(models.Manager):
+class TaggedItemManager(models.Manager.from_queryset(GenericRelationQuerySet)):
+    BATCH_SIZE = 500
 
     def get_tags_for(self, obj_type, obj_id):
         content_type = ContentType.objects.get_for_model(obj_type)
@@ -13,6 +17,37 @@ class TaggedItemManager(models.Manager):
                 .filter(content_type=content_type,
                         object_id=obj_id)
 
+    def get_tags_for_many(self, obj_type, obj_ids):
+        """
+        Return {object_id: [Tag, ...]} for all given ids of obj_type.
+        Cached ids are served from the process-local tag cache, the rest
+        are loaded with one query per BATCH_SIZE ids.
+        """
+        content_type = ContentType.objects.get_for_model(obj_type)
+        obj_ids = set(obj_ids)
+
+        result = tag_cache.get_many(content_type.id, obj_ids)
+        missing = sorted(obj_ids - result.keys())
+
+        for start in range(0, len(missing), self.BATCH_SIZE):
+            batch = missing[start:start + self.BATCH_SIZE]
+            generation = tag_cache.generation
+            fetched = {obj_id: [] for obj_id in batch}
+            items = self.get_queryset() \
+                .select_related('tag') \
+                .filter(content_type=content_type, object_id__in=batch) \
+                .order_by('id')
+            # Cached rows come from the primary, a lagging replica could
+            # cache tags that were just invalidated.
+            with use_primary():
+                for item in items:
+                    fetched[item.object_id].append(item.tag)
+
+            tag_cache.set_many(content_type.id, fetched, generation)
+            result.update(fetched)
+
+        return result
+
 
 class Tag(models.Model):
     label = models.CharField(max_length=255)
@@ -28,4 +63,15 @@ class TaggedItem(models.Model):
 
     content_type = models.ForeignKey(to=ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey()
\ No newline at end of file
+    content_object = GenericForeignKey()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id', 'tag'],
+                name='unique_tagged_item',
+            ),
+        ]
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by tags.bulk after tagging or untagging many objects of the sender
+# model at once, with content_type and object_ids, instead of the
+# post_save/post_delete of every TaggedItem.
+objects_retagged = Signal()
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from tags.cache import tag_cache
+from tags.models import Tag, TaggedItem
+
+
+@receiver(pre_save, sender=TaggedItem)
+def remember_tagged_object(sender, instance, **kwargs):
+    # An item moved to another object changes the tags of both.
+    instance._previous_key = None
+    if not instance._state.adding:
+        instance._previous_key = TaggedItem.objects \
+            .filter(pk=instance.pk) \
+            .values_list('content_type_id', 'object_id') \
+            .first()
+
+
+@receiver([post_save, post_delete], sender=TaggedItem)
+def invalidate_tagged_item(sender, instance, using, **kwargs):
+    keys = {(instance.content_type_id, instance.object_id), getattr(instance, '_previous_key', None)} - {None}
+
+    def invalidate():
+        for content_type_id, object_id in keys:
+            tag_cache.invalidate(content_type_id, object_id)
+
+    # Readers cache what they see, so not before the change is visible.
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    # A renamed or deleted tag may be cached under any object.
+    tag_cache.clear()
@@ -1,3 +1,184 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock, skipUnless
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from likes.models import LikedItem
+from store.models import Collection, Product
+from . import bulk, views
+from .cache import tag_cache
+from .models import Tag, TaggedItem
+from .signals import objects_retagged
 
-# Create your tests here.
+
+class StoreTestData:
+
+    @classmethod
+    def setUpTestData(cls):
+        collection = Collection.objects.create(title='Lamps')
+        cls.products = [
+            Product.objects.create(title=f'Lamp {index}', slug='lamp', description='', unit_price=10,
+                                   inventory=1, collection=collection)
+            for index in range(3)
+        ]
+        cls.red = Tag.objects.create(label='red')
+        cls.blue = Tag.objects.create(label='blue')
+
+    def setUp(self):
+        tag_cache.clear()
+
+    def tag(self, obj, tag):
+        return TaggedItem.objects.create(tag=tag, content_type=ContentType.objects.get_for_model(obj),
+                                         object_id=obj.pk)
+
+
+class ObjectTagsViewTests(StoreTestData, TransactionTestCase):
+    # The view reads in a database thread, which cannot see the rows of an
+    # open test transaction.
+
+    def setUp(self):
+        self.setUpTestData()
+        super().setUp()
+
+    def test_tags_by_object_id(self):
+        first, second, _ = self.products
+        self.tag(first, self.red)
+        self.tag(first, self.blue)
+        response = self.client.get('/tags/store/product/', {'ids': f'{first.pk},{second.pk}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            str(first.pk): [{'id': self.red.pk, 'label': 'red'}, {'id': self.blue.pk, 'label': 'blue'}],
+            str(second.pk): [],
+        })
+
+    def test_bad_ids(self):
+        self.assertEqual(self.client.get('/tags/store/product/', {'ids': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/tags/store/product/').status_code, 400)
+
+    def test_models_that_are_not_taggable(self):
+        for path in ['/tags/auth/user/', '/tags/store/customer/', '/tags/store/nosuchmodel/', '/tags/nosuchapp/x/']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path, {'ids': '1'}).status_code, 404)
+
+    def test_stale_content_type(self):
+        ContentType.objects.create(app_label='store', model='removedmodel')
+        with mock.patch.object(views, 'TAGGABLE_MODELS', {'store.product', 'store.removedmodel'}):
+            self.assertEqual(self.client.get('/tags/store/removedmodel/', {'ids': '1'}).status_code, 404)
+
+
+class BulkTaggingTests(StoreTestData, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.retagged = []
+        objects_retagged.connect(self.receive, sender=Product)
+        self.addCleanup(objects_retagged.disconnect, self.receive, sender=Product)
+
+    def receive(self, sender, object_ids, **kwargs):
+        self.retagged.append(sorted(object_ids))
+
+    def tagged(self, tag):
+        return sorted(TaggedItem.objects.filter(tag=tag).values_list('object_id', flat=True))
+
+    def test_tag_objects_adds_the_missing_items(self):
+        first, second, third = self.products
+        self.tag(first, self.red)
+        self.assertEqual(bulk.tag_objects(Product.objects.all(), self.red), 2)
+        self.assertEqual(self.tagged(self.red), [first.pk, second.pk, third.pk])
+        self.assertEqual(self.retagged, [[second.pk, third.pk]])
+        self.assertEqual(bulk.tag_objects(Product.objects.all(), self.red), 0)
+        self.assertEqual(self.retagged, [[second.pk, third.pk]])
+
+    def test_items_tagged_concurrently_are_not_counted(self):
+        first, second, third = self.products
+        content_type = ContentType.objects.get_for_model(Product)
+        # As if another request tagged the second product after the read.
+        self.tag(second, self.red)
+        inserted = bulk._insert(self.red, content_type, [first.pk, second.pk, third.pk])
+        self.assertEqual(inserted, [first.pk, third.pk])
+        self.assertEqual(self.tagged(self.red), [first.pk, second.pk, third.pk])
+
+    def test_untag_objects(self):
+        first, second, _ = self.products
+        self.tag(first, self.red)
+        self.tag(second, self.red)
+        self.tag(second, self.blue)
+        self.assertEqual(bulk.untag_objects(Product.objects.filter(pk__in=[first.pk, second.pk]), self.red), 2)
+        self.assertEqual(self.tagged(self.red), [])
+        self.assertEqual(self.tagged(self.blue), [second.pk])
+        self.assertEqual(self.retagged, [[first.pk, second.pk]])
+
+    def test_untag_objects_in_one_delete(self):
+        for product in self.products:
+            self.tag(product, self.red)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(bulk.untag_objects(Product.objects.all(), self.red), 3)
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE FROM "tags_taggeditem"')]
+        self.assertEqual(len(deletes), 1)
+        # The tag cache, the catalog and the search index, once each.
+        self.assertEqual(len(callbacks), 3)
+
+    def test_tag_cache_is_invalidated_on_commit(self):
+        first = self.products[0]
+        self.assertEqual(TaggedItem.objects.get_tags_for_many(Product, [first.pk]), {first.pk: []})
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.tag_objects(Product.objects.filter(pk=first.pk), self.red)
+        self.assertEqual(TaggedItem.objects.get_tags_for_many(Product, [first.pk]), {first.pk: [self.red]})
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.untag_objects(Product.objects.filter(pk=first.pk), self.red)
+        self.assertEqual(TaggedItem.objects.get_tags_for_many(Product, [first.pk]), {first.pk: []})
+
+
+class TaggedItemCacheTests(StoreTestData, TestCase):
+
+    def tags(self, *products):
+        tags = TaggedItem.objects.get_tags_for_many(Product, [product.pk for product in products])
+        return [tags[product.pk] for product in products]
+
+    def test_saved_and_deleted_items_invalidate_on_commit(self):
+        first = self.products[0]
+        self.assertEqual(self.tags(first), [[]])
+        with self.captureOnCommitCallbacks(execute=True):
+            item = self.tag(first, self.red)
+            self.assertEqual(self.tags(first), [[]])
+        self.assertEqual(self.tags(first), [[self.red]])
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertEqual(self.tags(first), [[]])
+
+    def test_moved_item_invalidates_both_objects(self):
+        first, second, _ = self.products
+        item = self.tag(first, self.red)
+        self.assertEqual(self.tags(first, second), [[self.red], []])
+        item = TaggedItem.objects.get(pk=item.pk)
+        item.object_id = second.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assertEqual(self.tags(first, second), [[], [self.red]])
+
+
+class GenericLookupBenchmarkTests(TransactionTestCase):
+    # The command drops and recreates indexes, which SQLite does not allow
+    # inside the test transaction.
+
+    def constraints(self, model):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, model._meta.db_table))
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+    def test_lookups_search_both_columns_of_an_index(self):
+        for model in [TaggedItem, LikedItem]:
+            plan = model.objects.filter(content_type_id=1, object_id=1).explain()
+            self.assertIn('INDEX', plan)
+            self.assertIn('(content_type_id=? AND object_id=?)', plan)
+
+    def test_indexes_are_restored(self):
+        before = {model: self.constraints(model) for model in [TaggedItem, LikedItem]}
+        stdout = StringIO()
+        call_command('benchmark_generic_lookups', '--rows', '50', '--objects', '20', '--lookups', '10',
+                     stdout=stdout)
+        self.assertEqual({model: self.constraints(model) for model in [TaggedItem, LikedItem]}, before)
+        self.assertEqual(TaggedItem.objects.count(), 50)
+        self.assertEqual(stdout.getvalue().count('plan:'), 4)
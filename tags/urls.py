@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('<str:app_label>/<str:model_name>/', views.object_tags, name='object_tags'),
+]
@@ -1,3 +1,42 @@
-from django.shortcuts import render
+from django.apps import apps
+from django.conf import settings
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from storeuz.async_db import db_sync_to_async
+from .models import TaggedItem
 
-# Create your views here.
+MAX_IDS = 500
+TAGGABLE_MODELS = {label.lower() for label in getattr(settings, 'TAGGABLE_MODELS', [])}
+
+
+def _taggable_model(app_label, model_name):
+    """The model, if its tags may be served, else None."""
+    if f'{app_label}.{model_name}'.lower() not in TAGGABLE_MODELS:
+        return None
+    try:
+        return apps.get_model(app_label, model_name)
+    except LookupError:
+        return None
+
+
+@db_sync_to_async
+def _load_tags(model, obj_ids):
+    tags = TaggedItem.objects.get_tags_for_many(model, obj_ids)
+    return {
+        str(obj_id): [{'id': tag.id, 'label': tag.label} for tag in tags[obj_id]]
+        for obj_id in sorted(tags)
+    }
+
+
+async def object_tags(request, app_label, model_name):
+    """Tags of ?ids=1,2,3 of the given model, keyed by object id."""
+    model = _taggable_model(app_label, model_name)
+    if model is None:
+        raise Http404('Unknown model.')
+    try:
+        obj_ids = {int(obj_id) for obj_id in request.GET.get('ids', '').split(',') if obj_id}
+    except ValueError:
+        return HttpResponseBadRequest('ids must be a comma separated list of integers.')
+    if not obj_ids or len(obj_ids) > MAX_IDS:
+        return HttpResponseBadRequest(f'Pass between 1 and {MAX_IDS} ids.')
+
+    return JsonResponse(await _load_tags(model, obj_ids))